@@ -0,0 +1,226 @@
+"""Keep the message history within a token budget before each model call.
+
+Recent turns are sent verbatim. Older tool outputs are truncated, and the
+oldest turns are folded into a running summary once the history is over
+budget. Both changes are written back to the graph state, so every message is
+truncated or summarized once rather than on every step.
+"""
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AnyMessage,
+    BaseMessage,
+    HumanMessage,
+    RemoveMessage,
+    ToolMessage,
+)
+
+from react_agent import prompts
+from react_agent.utils import get_message_text, load_chat_model
+
+Summarizer = Callable[[str, Sequence[AnyMessage]], Awaitable[str]]
+
+# Rough characters per token, good enough for budgeting across providers
+CHARS_PER_TOKEN = 4
+# Characters of each folded message kept in the default summary
+DIGEST_CHARS = 200
+
+
+@dataclass
+class Compaction:
+    """The result of compacting a message history."""
+
+    messages: List[AnyMessage]
+    """Messages to send to the model."""
+
+    summary: str = ""
+    """Summary of the messages folded out of the history so far."""
+
+    updates: List[AnyMessage] = field(default_factory=list)
+    """State updates: truncated replacements and removals of folded messages."""
+
+
+def estimate_tokens(messages: Sequence[BaseMessage], text: str = "") -> int:
+    """Estimate the tokens of some messages plus extra text.
+
+    Args:
+        messages (Sequence[BaseMessage]): Messages to count.
+        text (str): Additional text, such as a summary, to count.
+    """
+    chars = len(text) + sum(
+        len(get_message_text(m)) + len(str(m.additional_kwargs or "")) for m in messages
+    )
+    # A few tokens of per-message overhead
+    return chars // CHARS_PER_TOKEN + 3 * len(messages)
+
+
+def truncate_tool_output(message: ToolMessage, max_chars: int) -> Optional[ToolMessage]:
+    """Shorten a tool output to at most `max_chars`, keeping its id.
+
+    Returns:
+        The shortened copy, or None if the output already fits.
+    """
+    text = get_message_text(message)
+    if len(text) <= max_chars:
+        return None
+    marker = f"\n... [{len(text)} characters, truncated]"
+    head = text[: max(0, max_chars - len(marker))]
+    return message.model_copy(update={"content": head + marker})
+
+
+def split_turns(messages: Sequence[AnyMessage]) -> List[List[AnyMessage]]:
+    """Group messages into turns, each starting at a human message.
+
+    Tool calls stay in the same turn as their results, so dropping whole turns
+    never separates them.
+    """
+    turns: List[List[AnyMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+async def digest_messages(summary: str, messages: Sequence[AnyMessage]) -> str:
+    """Extend a summary with one short line per message, without a model call."""
+    lines = [summary] if summary else []
+    for message in messages:
+        if isinstance(message, AIMessage) and message.tool_calls:
+            calls = ", ".join(f"{call['name']}({call['args']})" for call in message.tool_calls)
+            text = f"assistant called {calls}"
+        elif isinstance(message, ToolMessage):
+            text = f"{message.name or 'tool'} returned: {get_message_text(message)}"
+        else:
+            text = f"{message.type}: {get_message_text(message)}"
+        text = " ".join(text.split())
+        lines.append(text if len(text) <= DIGEST_CHARS else text[: DIGEST_CHARS - 3] + "...")
+    return "\n".join(lines)
+
+
+def model_summarizer(model: BaseChatModel) -> Summarizer:
+    """Create a summarizer that asks a chat model to extend the summary.
+
+    Args:
+        model (BaseChatModel): The model writing the summary.
+    """
+
+    async def summarize(summary: str, messages: Sequence[AnyMessage]) -> str:
+        transcript = "\n".join(
+            f"{m.type}: {get_message_text(m)[: prompts.SUMMARY_MESSAGE_CHARS]}"
+            for m in messages
+        )
+        response = await model.ainvoke(
+            [
+                {"role": "system", "content": prompts.SUMMARY_PROMPT},
+                {
+                    "role": "user",
+                    "content": f"Summary so far:\n{summary or '(none)'}\n\n"
+                    f"New messages:\n{transcript}",
+                },
+            ]
+        )
+        return get_message_text(response)
+
+    return summarize
+
+
+@lru_cache(maxsize=8)
+def load_model_summarizer(fully_specified_name: str) -> Summarizer:
+    """Load a summary model once per name and wrap it in a summarizer.
+
+    Args:
+        fully_specified_name (str): The summary model, in the form provider/model.
+    """
+    return model_summarizer(load_chat_model(fully_specified_name))
+
+
+def _cap_summary(summary: str, max_tokens: int) -> str:
+    """Drop the oldest summary lines beyond a token limit."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(summary) <= max_chars:
+        return summary
+    return summary[-max_chars:].split("\n", 1)[-1]
+
+
+async def compact_messages(
+    messages: Sequence[AnyMessage],
+    summary: str = "",
+    *,
+    max_tokens: int,
+    keep_recent_turns: int = 2,
+    max_tool_output_chars: int = 4000,
+    summarize: Summarizer = digest_messages,
+) -> Compaction:
+    """Fit a message history into a token budget.
+
+    In order, until the history fits: truncate tool outputs outside the recent
+    turns, fold the oldest turns into the summary, then truncate tool outputs
+    of the recent turns except those answering the latest tool calls.
+
+    Args:
+        messages (Sequence[AnyMessage]): The full message history.
+        summary (str): Summary of the messages folded out earlier.
+        max_tokens (int): Token budget for the messages and the summary.
+        keep_recent_turns (int): Number of latest turns never folded or truncated
+            unless nothing else fits.
+        max_tool_output_chars (int): Length older tool outputs are truncated to.
+        summarize (Summarizer): Extends the summary with newly folded messages.
+
+    Returns:
+        Compaction: The messages to send, the new summary and the state updates.
+    """
+    turns = split_turns(messages)
+    split = max(len(turns) - keep_recent_turns, 0)
+    older, recent = turns[:split], turns[split:]
+    # Truncated copies keyed by the identity of the message they replace
+    replaced: Dict[int, AnyMessage] = {}
+
+    def current(turn: List[AnyMessage]) -> List[AnyMessage]:
+        return [replaced.get(id(m), m) for m in turn]
+
+    def total() -> int:
+        return estimate_tokens([m for turn in older + recent for m in current(turn)], summary)
+
+    if total() <= max_tokens:
+        return Compaction(messages=list(messages), summary=summary)
+
+    for turn in older:
+        for message in turn:
+            if isinstance(message, ToolMessage):
+                shortened = truncate_tool_output(message, max_tool_output_chars)
+                if shortened is not None:
+                    replaced[id(message)] = shortened
+
+    folded: List[AnyMessage] = []
+    while older and total() > max_tokens:
+        folded.extend(current(older.pop(0)))
+    if folded:
+        summary = _cap_summary(await summarize(summary, folded), max_tokens // 4)
+
+    if total() > max_tokens and recent:
+        # Results of the latest tool calls are what the model is about to read
+        latest = recent[-1]
+        answered = len(latest)
+        while answered and isinstance(latest[answered - 1], ToolMessage):
+            answered -= 1
+        for message in [m for turn in recent[:-1] for m in turn] + latest[:answered]:
+            if isinstance(message, ToolMessage):
+                shortened = truncate_tool_output(message, max_tool_output_chars)
+                if shortened is not None:
+                    replaced[id(message)] = shortened
+
+    # Messages without ids are not in a graph state, so there is nothing to update
+    kept = [m for turn in older + recent for m in current(turn)]
+    updates: List[AnyMessage] = [RemoveMessage(id=m.id) for m in folded if m.id]
+    updates.extend(m for m in kept if m.id and any(m is r for r in replaced.values()))
+    return Compaction(
+        messages=kept,
+        summary=summary,
+        updates=updates,
+    )
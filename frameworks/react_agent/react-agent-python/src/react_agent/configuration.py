@@ -3,7 +3,8 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field, fields
-from typing import Annotated, Optional
+from functools import lru_cache
+from typing import Annotated, FrozenSet, Optional
 
 from langchain_core.runnables import RunnableConfig, ensure_config
 
@@ -37,6 +38,38 @@ class Configuration:
         },
     )
 
+    max_history_tokens: int = field(
+        default=24000,
+        metadata={
+            "description": "Token budget for the message history sent on each model call. "
+            "Older messages are truncated or summarized to fit; 0 sends the full history."
+        },
+    )
+
+    keep_recent_turns: int = field(
+        default=2,
+        metadata={
+            "description": "Number of latest conversation turns, each starting at a user message, "
+            "that are kept verbatim while older ones are compacted."
+        },
+    )
+
+    max_tool_output_chars: int = field(
+        default=4000,
+        metadata={
+            "description": "Length that older tool outputs, such as large sql_db_query results, "
+            "are truncated to when the history is over budget."
+        },
+    )
+
+    summary_model: Optional[str] = field(
+        default=None,
+        metadata={
+            "description": "Model that summarizes messages folded out of the history, in the form "
+            "provider/model-name. By default a short digest is built without a model call."
+        },
+    )
+
     @classmethod
     def from_runnable_config(
         cls, config: Optional[RunnableConfig] = None
@@ -44,5 +77,11 @@ class Configuration:
         """Create a Configuration instance from a RunnableConfig object."""
         config = ensure_config(config)
         configurable = config.get("configurable") or {}
-        _fields = {f.name for f in fields(cls) if f.init}
+        _fields = _init_field_names(cls)
         return cls(**{k: v for k, v in configurable.items() if k in _fields})
+
+
+@lru_cache(maxsize=None)
+def _init_field_names(cls: type) -> FrozenSet[str]:
+    """Names of the fields a configuration class accepts, computed once per class."""
+    return frozenset(f.name for f in fields(cls) if f.init)
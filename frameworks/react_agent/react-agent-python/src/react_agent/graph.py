@@ -4,24 +4,58 @@ Works with a chat model with tool calling support.
 """
 
 from datetime import datetime, timezone
-from typing import Dict, List, Literal, cast
+from typing import Any, Dict, Literal, cast
 
 from langchain_core.messages import AIMessage
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph
 from langgraph.prebuilt import ToolNode
 
+from react_agent import prompts
+from react_agent.compaction import (
+    Compaction,
+    compact_messages,
+    digest_messages,
+    load_model_summarizer,
+)
 from react_agent.configuration import Configuration
 from react_agent.state import InputState, State
 from react_agent.tools import TOOLS
-from react_agent.utils import load_chat_model
+from react_agent.utils import load_bound_chat_model
 
 # Define the function that calls the model
 
 
+async def compact_history(state: State, configuration: Configuration) -> Compaction:
+    """Fit the message history into the configured token budget.
+
+    Args:
+        state (State): The current state of the conversation.
+        configuration (Configuration): The agent configuration.
+
+    Returns:
+        Compaction: The messages to send and the state updates that keep them compacted.
+    """
+    if configuration.max_history_tokens <= 0:
+        return Compaction(messages=list(state.messages), summary=state.summary)
+    summarize = (
+        load_model_summarizer(configuration.summary_model)
+        if configuration.summary_model
+        else digest_messages
+    )
+    return await compact_messages(
+        state.messages,
+        state.summary,
+        max_tokens=configuration.max_history_tokens,
+        keep_recent_turns=configuration.keep_recent_turns,
+        max_tool_output_chars=configuration.max_tool_output_chars,
+        summarize=summarize,
+    )
+
+
 async def call_model(
     state: State, config: RunnableConfig
-) -> Dict[str, List[AIMessage]]:
+) -> Dict[str, Any]:
     """Call the LLM powering our "agent".
 
     This function prepares the prompt, initializes the model, and processes the response.
@@ -36,34 +70,37 @@ async def call_model(
     configuration = Configuration.from_runnable_config(config)
 
     # Initialize the model with tool binding. Change the model or add more tools here.
-    model = load_chat_model(configuration.model).bind_tools(TOOLS)
+    # The bound model is cached, so later steps reuse it.
+    model = load_bound_chat_model(configuration.model, TOOLS)
 
     # Format the system prompt. Customize this to change the agent's behavior.
     system_message = configuration.system_prompt.format(
         system_time=datetime.now(tz=timezone.utc).isoformat()
     )
 
+    # Keep the history within budget; compacted messages are written back to the state
+    # so they are not truncated or summarized again on the next step
+    compaction = await compact_history(state, configuration)
+    if compaction.summary:
+        system_message += prompts.SUMMARY_SECTION.format(summary=compaction.summary)
+
     # Get the model's response
     response = cast(
         AIMessage,
         await model.ainvoke(
-            [{"role": "system", "content": system_message}, *state.messages], config
+            [{"role": "system", "content": system_message}, *compaction.messages], config
         ),
     )
 
     # Handle the case when it's the last step and the model still wants to use a tool
     if state.is_last_step and response.tool_calls:
-        return {
-            "messages": [
-                AIMessage(
-                    id=response.id,
-                    content="Sorry, I could not find an answer to your question in the specified number of steps.",
-                )
-            ]
-        }
+        response = AIMessage(
+            id=response.id,
+            content="Sorry, I could not find an answer to your question in the specified number of steps.",
+        )
 
     # Return the model's response as a list to be added to existing messages
-    return {"messages": [response]}
+    return {"messages": [*compaction.updates, response], "summary": compaction.summary}
 
 
 # Define a new graph
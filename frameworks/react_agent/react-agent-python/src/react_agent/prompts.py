@@ -11,3 +11,16 @@ You can interact with a PostgreSQL database to answer questions about data. When
 Only use SELECT queries for safety. Never use INSERT, UPDATE, DELETE, or other modifying statements.
 
 System time: {system_time}"""
+
+
+SUMMARY_SECTION = """
+
+Summary of the earlier conversation, whose messages are no longer shown:
+{summary}"""
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and a SQL assistant.
+
+Extend the summary so far with the new messages. Keep the user's questions, the tables and queries used, and the key results and numbers. Drop raw result rows that are not needed to answer later questions. Reply with the updated summary only."""
+
+# Characters of each message shown to the summary model
+SUMMARY_MESSAGE_CHARS = 4000
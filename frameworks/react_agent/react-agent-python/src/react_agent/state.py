@@ -53,6 +53,14 @@ class State(InputState):
     It is set to 'True' when the step count reaches recursion_limit - 1.
     """
 
+    summary: str = field(default="")
+    """
+    Running summary of the messages compacted out of `messages`.
+
+    Extended, never rebuilt, when older turns are folded to keep the history within
+    the configured token budget (see `react_agent.compaction`).
+    """
+
     # Additional attributes can be added here as needed.
     # Common examples include:
     # retrieved_documents: List[Document] = field(default_factory=list)
@@ -9,10 +9,8 @@ import sys
 
 # Import shared environment utilities
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../../..')))
-from shared.utils.env import load_env
+from shared.utils import get_settings
 
-# Load environment variables from both root and local .env files
-load_env()
 
 def create_sql_tools(db: SQLDatabase, llm: Optional[BaseLanguageModel] = None) -> List[Dict[str, Any]]:
     """Create SQL tools for the agent.
@@ -26,7 +24,8 @@ def create_sql_tools(db: SQLDatabase, llm: Optional[BaseLanguageModel] = None) -
     """
     # Create default LLM if none provided
     if llm is None:
-        api_key = os.getenv("OPENAI_API_KEY")
+        # Loads the root and local .env files on first use
+        api_key = get_settings().openai_api_key
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable is required for SQL tools")
         llm = ChatOpenAI(
@@ -40,6 +39,5 @@ def create_sql_tools(db: SQLDatabase, llm: Optional[BaseLanguageModel] = None) -
 
 def get_sql_tools() -> List[Dict[str, Any]]:
     """Get SQL tools with database connection from environment variables."""
-    db_url = f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
-    db = SQLDatabase.from_uri(db_url)
+    db = SQLDatabase.from_uri(get_settings().database_url())
     return create_sql_tools(db) 
\ No newline at end of file
@@ -1,8 +1,19 @@
 """Utility & helper functions."""
 
+import threading
+from typing import Any, Dict, Sequence, Tuple
+
 from langchain.chat_models import init_chat_model
-from langchain_core.language_models import BaseChatModel
+from langchain_core.language_models import BaseChatModel, LanguageModelInput
 from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable
+
+# Bound models keyed by model name and tool identities; the tools are kept so the ids stay valid
+_BOUND_MODELS: Dict[
+    Tuple[str, Tuple[int, ...]],
+    Tuple[Tuple[Any, ...], Runnable[LanguageModelInput, BaseMessage]],
+] = {}
+_BOUND_MODELS_LOCK = threading.Lock()
 
 
 def get_message_text(msg: BaseMessage) -> str:
@@ -25,3 +36,33 @@ def load_chat_model(fully_specified_name: str) -> BaseChatModel:
     """
     provider, model = fully_specified_name.split("/", maxsplit=1)
     return init_chat_model(model, model_provider=provider)
+
+
+def load_bound_chat_model(
+    fully_specified_name: str, tools: Sequence[Any]
+) -> Runnable[LanguageModelInput, BaseMessage]:
+    """Load a chat model with tools bound, reusing it for the same model and tools.
+
+    Building the provider client and converting the tool schemas happens once
+    per model name and tool set instead of on every graph step.
+
+    Args:
+        fully_specified_name (str): String in the format 'provider/model'.
+        tools (Sequence[Any]): Tools to bind, compared by identity.
+    """
+    tools = tuple(tools)
+    key = (fully_specified_name, tuple(id(tool) for tool in tools))
+    cached = _BOUND_MODELS.get(key)
+    if cached is None:
+        with _BOUND_MODELS_LOCK:
+            cached = _BOUND_MODELS.get(key)
+            if cached is None:
+                model = load_chat_model(fully_specified_name).bind_tools(tools)
+                cached = _BOUND_MODELS[key] = (tools, model)
+    return cached[1]
+
+
+def clear_model_cache() -> None:
+    """Forget every bound model, e.g. after provider credentials change."""
+    with _BOUND_MODELS_LOCK:
+        _BOUND_MODELS.clear()
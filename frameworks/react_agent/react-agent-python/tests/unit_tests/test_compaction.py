@@ -0,0 +1,146 @@
+from typing import Any, List
+
+import pytest
+from langchain_core.messages import (
+    AIMessage,
+    AnyMessage,
+    HumanMessage,
+    RemoveMessage,
+    ToolMessage,
+)
+from langgraph.graph import add_messages
+
+from react_agent import compaction, graph
+from react_agent.compaction import compact_messages, estimate_tokens, split_turns
+from react_agent.state import State
+
+pytestmark = pytest.mark.asyncio
+
+
+def sql_turn(index: int, rows: int = 500) -> List[AnyMessage]:
+    return [
+        HumanMessage(id=f"h{index}", content=f"Question {index}?"),
+        AIMessage(
+            id=f"a{index}",
+            content="",
+            tool_calls=[
+                {"name": "sql_db_query", "args": {"query": "SELECT 1"}, "id": f"c{index}"}
+            ],
+        ),
+        ToolMessage(
+            id=f"t{index}",
+            name="sql_db_query",
+            tool_call_id=f"c{index}",
+            content=str([(row, "customer", 10.0) for row in range(rows)]),
+        ),
+        AIMessage(id=f"r{index}", content=f"Answer {index}."),
+    ]
+
+
+async def test_small_history_is_untouched() -> None:
+    messages = sql_turn(0, rows=2)
+    compaction = await compact_messages(messages, max_tokens=10_000)
+    assert compaction.messages == messages
+    assert compaction.updates == []
+
+
+async def test_older_tool_outputs_are_truncated_first() -> None:
+    messages = sql_turn(0) + sql_turn(1) + sql_turn(2)
+    budget = estimate_tokens(messages) - 100
+    compaction = await compact_messages(
+        messages, max_tokens=budget, keep_recent_turns=2, max_tool_output_chars=500
+    )
+    assert len(compaction.messages) == len(messages)
+    assert compaction.summary == ""
+    # Only the tool output of the oldest turn is shortened, in place of the original
+    (update,) = compaction.updates
+    assert update.id == "t0" and len(update.content) <= 500
+    assert compaction.messages[2] is update
+    assert compaction.messages[6].content == messages[6].content
+
+
+async def test_oldest_turns_are_summarized_incrementally() -> None:
+    calls = []
+
+    async def summarize(summary: str, messages: List[AnyMessage]) -> str:
+        calls.append([m.id for m in messages])
+        return (summary + "\n" if summary else "") + f"{len(messages)} messages"
+
+    messages = [m for index in range(4) for m in sql_turn(index)]
+    budget = estimate_tokens(messages[8:]) + 50
+    compaction = await compact_messages(
+        messages, max_tokens=budget, keep_recent_turns=2, summarize=summarize
+    )
+    assert calls == [["h0", "a0", "t0", "r0", "h1", "a1", "t1", "r1"]]
+    assert compaction.summary == "8 messages"
+    assert [m.id for m in compaction.messages] == [m.id for m in messages[8:]]
+    removed = [m.id for m in compaction.updates if isinstance(m, RemoveMessage)]
+    assert removed == [m.id for m in messages[:8]]
+    assert estimate_tokens(compaction.messages, compaction.summary) <= budget
+
+    # Applying the updates leaves nothing to fold on the next step
+    history = add_messages(messages, compaction.updates)
+    again = await compact_messages(
+        history, compaction.summary, max_tokens=budget, summarize=summarize
+    )
+    assert len(calls) == 1
+    assert again.updates == []
+
+
+async def test_latest_tool_results_are_kept() -> None:
+    messages = sql_turn(0)[:3]
+    compaction = await compact_messages(
+        messages, max_tokens=10, keep_recent_turns=1, max_tool_output_chars=100
+    )
+    assert compaction.messages[-1].content == messages[-1].content
+
+
+async def test_turns_keep_tool_calls_with_results() -> None:
+    turns = split_turns([AIMessage(content="hi"), *sql_turn(0), *sql_turn(1)])
+    assert [len(turn) for turn in turns] == [1, 4, 4]
+
+
+class RecordingModel:
+    def __init__(self) -> None:
+        self.sent: List[Any] = []
+
+    async def ainvoke(self, messages: List[Any], config: Any = None) -> AIMessage:
+        self.sent.append(messages)
+        return AIMessage(id="final", content="Done.")
+
+
+async def test_call_model_writes_compaction_back(monkeypatch) -> None:
+    model = RecordingModel()
+    monkeypatch.setattr(graph, "load_bound_chat_model", lambda name, tools: model)
+    messages = [m for index in range(4) for m in sql_turn(index)]
+    messages.append(HumanMessage(id="h4", content="And now?"))
+    state = State(messages=messages)
+
+    update = await graph.call_model(
+        state, {"configurable": {"max_history_tokens": 2000, "keep_recent_turns": 1}}
+    )
+    assert update["summary"].startswith("human: Question 0?")
+    assert update["messages"][-1].content == "Done."
+    system, *sent = model.sent[0]
+    assert "Question 0?" in system["content"]
+    # Turns are folded oldest first, just until the rest fits
+    assert [m.id for m in sent][-1] == "h4"
+    assert "h0" not in [m.id for m in sent]
+    assert any(isinstance(m, RemoveMessage) for m in update["messages"])
+
+
+async def test_summary_model_is_loaded_once(monkeypatch) -> None:
+    loaded: List[str] = []
+
+    def load(name: str) -> RecordingModel:
+        loaded.append(name)
+        return RecordingModel()
+
+    monkeypatch.setattr(compaction, "load_chat_model", load)
+    compaction.load_model_summarizer.cache_clear()
+    summarize = compaction.load_model_summarizer("openai/gpt-4o-mini")
+    assert compaction.load_model_summarizer("openai/gpt-4o-mini") is summarize
+    assert compaction.load_model_summarizer("openai/gpt-4o") is not summarize
+    assert loaded == ["openai/gpt-4o-mini", "openai/gpt-4o"]
+    assert await summarize("", [HumanMessage(content="Question?")]) == "Done."
+    compaction.load_model_summarizer.cache_clear()
@@ -3,3 +3,10 @@ from react_agent.configuration import Configuration
 
 def test_configuration_empty() -> None:
     Configuration.from_runnable_config({})
+
+
+def test_configuration_ignores_unknown_keys() -> None:
+    config = Configuration.from_runnable_config(
+        {"configurable": {"model": "openai/gpt-4o", "thread_id": "1"}}
+    )
+    assert config.model == "openai/gpt-4o"
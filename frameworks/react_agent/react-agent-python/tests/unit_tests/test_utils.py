@@ -0,0 +1,33 @@
+from typing import Any, List, Sequence
+
+from react_agent import utils
+
+
+class StubChatModel:
+    def __init__(self) -> None:
+        self.bound: List[Sequence[Any]] = []
+
+    def bind_tools(self, tools: Sequence[Any]) -> Any:
+        self.bound.append(tools)
+        return ("bound", tuple(tools))
+
+
+def test_bound_model_is_reused(monkeypatch) -> None:
+    loaded: List[str] = []
+
+    def load(name: str) -> StubChatModel:
+        loaded.append(name)
+        return StubChatModel()
+
+    monkeypatch.setattr(utils, "load_chat_model", load)
+    utils.clear_model_cache()
+    tools = [object(), object()]
+
+    first = utils.load_bound_chat_model("openai/gpt-4o", tools)
+    assert utils.load_bound_chat_model("openai/gpt-4o", list(tools)) is first
+    assert utils.load_bound_chat_model("openai/gpt-4o", tools[:1]) is not first
+    assert utils.load_bound_chat_model("openai/gpt-4o-mini", tools) is not first
+    assert loaded == ["openai/gpt-4o", "openai/gpt-4o", "openai/gpt-4o-mini"]
+
+    utils.clear_model_cache()
+    assert utils.load_bound_chat_model("openai/gpt-4o", tools) is not first
@@ -1,5 +1,26 @@
 """Database utilities for AI agent projects."""
 
-from .connection import get_connection
+from .autotune import AdaptiveQueuePool, AsyncAdaptiveQueuePool, ConnectionBudget, PoolAutotuner
+from .connection import (
+    adispose_all,
+    dispose_all,
+    get_async_connection,
+    get_connection,
+    registered_engines,
+)
+from .guard import GuardedQuery, QueryGuard, QueryRejected
 
-__all__ = ["get_connection"]
\ No newline at end of file
+__all__ = [
+    "get_connection",
+    "get_async_connection",
+    "dispose_all",
+    "adispose_all",
+    "registered_engines",
+    "AdaptiveQueuePool",
+    "AsyncAdaptiveQueuePool",
+    "ConnectionBudget",
+    "PoolAutotuner",
+    "GuardedQuery",
+    "QueryGuard",
+    "QueryRejected",
+]
\ No newline at end of file
@@ -0,0 +1,346 @@
+"""Adaptive connection pool sizing driven by observed checkout waits."""
+
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from sqlalchemy import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, QueuePool
+from sqlalchemy.util import greenlet_spawn
+from sqlalchemy.util.queue import Empty
+
+from shared.observability import PoolMetrics, instrument_pool, pool_metrics
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+class _AdaptivePoolMixin:
+    """
+    Resizing and checkout timing for QueuePool.
+
+    ``pool_size`` stays the number of idle connections kept for reuse, while the
+    cap on open connections (``pool_size + max_overflow``) can be moved at
+    runtime. The cap never goes below ``pool_size``, since a negative overflow
+    would mean "unlimited" to QueuePool.
+
+    When the engine is instrumented, each checkout's wait and any timeout are
+    recorded in its pool metrics, which the autotuner sizes the pool from.
+    """
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        metrics = pool_metrics(self)
+        if metrics is None:
+            return super()._do_get()
+        started = time.perf_counter()
+        try:
+            connection_record = super()._do_get()
+        except PoolTimeoutError:
+            metrics.observe_checkout(started)
+            raise
+        metrics.observe_checkout(started, connection_record)
+        return connection_record
+
+    def capacity(self) -> int:
+        """Most connections the pool will open at once."""
+        return self._pool.maxsize + self._max_overflow
+
+    def resize(self, capacity: int) -> int:
+        """
+        Move the cap on open connections.
+
+        Connections above a lowered cap are closed as they are checked in.
+
+        Args:
+            capacity: New cap, raised to ``pool_size`` if lower
+
+        Returns:
+            The cap in effect
+        """
+        self._max_overflow = max(capacity - self._pool.maxsize, 0)
+        return self.capacity()
+
+    def close_idle(self, keep: int = 0) -> int:
+        """
+        Close idle connections beyond ``keep``; they are reopened on demand.
+
+        Args:
+            keep: Idle connections to leave open
+
+        Returns:
+            Number of connections closed
+        """
+        closed = 0
+        while self._pool.qsize() > keep:
+            try:
+                record = self._pool.get(False)
+            except Empty:
+                break
+            record.close()
+            self._dec_overflow()
+            closed += 1
+        return closed
+
+
+class AdaptiveQueuePool(_AdaptivePoolMixin, QueuePool):
+    """QueuePool whose cap on open connections can change at runtime and whose checkout waits are timed."""
+
+
+class AsyncAdaptiveQueuePool(_AdaptivePoolMixin, AsyncAdaptedQueuePool):
+    """Async engine variant of AdaptiveQueuePool."""
+
+
+class ConnectionBudget:
+    """
+    Database connection budget shared by the worker processes of one host.
+
+    Each process claims the pool capacity it wants in a JSON file guarded by
+    ``flock``; claims of processes that have exited are dropped. A process is
+    granted what it asks for as long as all claims together stay within
+    ``limit``, but never less than the minimum it asks for.
+    """
+
+    def __init__(self, limit: int, path: Optional[Union[str, Path]] = None):
+        """
+        Initialize the budget.
+
+        Args:
+            limit: Connections all processes together may open
+            path: Claims file (defaults to ``sql-connection-budget.json`` in the temp dir)
+        """
+        if fcntl is None:
+            raise RuntimeError("ConnectionBudget requires fcntl file locking (POSIX)")
+        self.limit = limit
+        self.path = Path(path or Path(tempfile.gettempdir()) / "sql-connection-budget.json")
+
+    def _update(self, pid: int, wanted: Optional[int], minimum: int) -> int:
+        self.path.touch(exist_ok=True)
+        with open(self.path, "r+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                claims: Dict[str, int] = json.loads(f.read() or "{}")
+            except ValueError:
+                claims = {}
+            claims = {owner: claim for owner, claim in claims.items() if _alive(int(owner))}
+            claims.pop(str(pid), None)
+            granted = 0
+            if wanted is not None:
+                granted = max(min(wanted, self.limit - sum(claims.values())), minimum)
+                claims[str(pid)] = granted
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps(claims))
+            return granted
+
+    def reserve(self, wanted: int, minimum: int = 0) -> int:
+        """
+        Replace this process's claim.
+
+        Args:
+            wanted: Capacity this process would like
+            minimum: Capacity granted even when the budget is exhausted
+
+        Returns:
+            The capacity granted
+        """
+        return self._update(os.getpid(), wanted, minimum)
+
+    def release(self) -> None:
+        """Drop this process's claim."""
+        self._update(os.getpid(), None, 0)
+
+    def claimed(self) -> int:
+        """Total capacity currently claimed by live processes."""
+        if not self.path.exists():
+            return 0
+        with open(self.path) as f:
+            fcntl.flock(f, fcntl.LOCK_SH)
+            try:
+                claims = json.loads(f.read() or "{}")
+            except ValueError:
+                return 0
+        return sum(claim for owner, claim in claims.items() if _alive(int(owner)))
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class PoolAutotuner:
+    """
+    Grows and shrinks an engine's pool from its checkout metrics.
+
+    Every ``interval`` seconds the tuner looks at the checkouts since the last
+    tick. If their mean wait exceeded ``wait_threshold`` or a checkout timed
+    out, the cap on open connections grows by ``step`` toward ``max_size``,
+    within the shared ``budget``. After ``idle_after`` seconds without waits or
+    a saturated pool, the cap shrinks by ``step`` toward ``min_size`` and idle
+    connections beyond ``min_idle`` are closed, handing capacity back to the
+    budget.
+
+    The engine must use ``AdaptiveQueuePool`` (or ``AsyncAdaptiveQueuePool``)
+    as its ``poolclass``.
+    """
+
+    def __init__(
+        self,
+        engine: Any,
+        max_size: int = 20,
+        min_size: Optional[int] = None,
+        wait_threshold: float = 0.05,
+        step: int = 2,
+        idle_after: float = 300.0,
+        min_idle: int = 1,
+        interval: float = 5.0,
+        budget: Optional[ConnectionBudget] = None,
+    ):
+        """
+        Initialize the tuner and claim the pool's starting capacity from the budget.
+
+        Args:
+            engine: SQLAlchemy Engine or AsyncEngine with an adaptive pool
+            max_size: Highest cap on open connections
+            min_size: Lowest cap (defaults to the pool's ``pool_size``)
+            wait_threshold: Mean checkout wait in seconds that triggers growth
+            step: Connections added or removed per adjustment
+            idle_after: Quiet seconds before the pool shrinks
+            min_idle: Idle connections left open when shrinking
+            interval: Seconds between ticks when running in the background
+            budget: Optional budget shared with other processes
+
+        Raises:
+            TypeError: If the engine's pool cannot be resized
+        """
+        self.engine: Engine = getattr(engine, "sync_engine", engine)
+        if not isinstance(self.engine.pool, _AdaptivePoolMixin):
+            raise TypeError(
+                "PoolAutotuner needs an engine created with "
+                "poolclass=AdaptiveQueuePool or AsyncAdaptiveQueuePool"
+            )
+        self.min_size = min_size if min_size is not None else self.engine.pool.size()
+        self.max_size = max(max_size, self.min_size)
+        self.wait_threshold = wait_threshold
+        self.step = step
+        self.idle_after = idle_after
+        self.min_idle = min_idle
+        self.interval = interval
+        self.budget = budget
+        self.metrics: PoolMetrics = instrument_pool(self.engine)
+        self.grows = 0
+        self.shrinks = 0
+
+        self._busy_at = time.monotonic()
+        self._waits = self._wait_totals()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        capacity = min(self.pool.capacity(), self.max_size)
+        if budget is not None:
+            capacity = budget.reserve(capacity, minimum=self.min_size)
+        self.pool.resize(capacity)
+
+    @property
+    def pool(self) -> _AdaptivePoolMixin:
+        # engine.dispose() replaces the pool, so always look it up
+        return self.engine.pool
+
+    def _wait_totals(self) -> Dict[str, float]:
+        registry, name = self.metrics.registry, self.metrics.name
+        waits = registry.histogram_summary("db.pool.checkout_wait", pool=name)
+        return {
+            "count": waits["count"],
+            "sum": waits["sum"],
+            "timeouts": registry.counter_value("db.pool.timeouts", pool=name),
+        }
+
+    def _claim(self, wanted: int, minimum: int) -> int:
+        if self.budget is None:
+            return wanted
+        return self.budget.reserve(wanted, minimum=minimum)
+
+    def tick(self, now: Optional[float] = None) -> int:
+        """
+        Make one sizing decision.
+
+        Args:
+            now: Monotonic time of the decision, for tests
+
+        Returns:
+            The pool's cap on open connections afterwards
+        """
+        now = time.monotonic() if now is None else now
+        pool = self.pool
+        totals = self._wait_totals()
+        checkouts = totals["count"] - self._waits["count"]
+        mean_wait = (totals["sum"] - self._waits["sum"]) / checkouts if checkouts else 0.0
+        timed_out = totals["timeouts"] > self._waits["timeouts"]
+        self._waits = totals
+
+        capacity = pool.capacity()
+        starved = timed_out or mean_wait > self.wait_threshold
+        if starved or pool.checkedout() >= capacity:
+            self._busy_at = now
+
+        if starved and capacity < self.max_size:
+            granted = self._claim(min(capacity + self.step, self.max_size), minimum=capacity)
+            if granted > capacity:
+                self.grows += 1
+                return pool.resize(granted)
+        elif now - self._busy_at >= self.idle_after:
+            # Each quiet period steps down once, so a lull between bursts does
+            # not throw away the whole pool
+            self._busy_at = now
+            pool.close_idle(keep=self.min_idle)
+            target = max(capacity - self.step, self.min_size, pool.checkedout())
+            if target < capacity:
+                self.shrinks += 1
+                self._claim(target, minimum=target)
+                return pool.resize(target)
+        return capacity
+
+    def start(self) -> "PoolAutotuner":
+        """Tick in a daemon thread until ``stop()``; for engines with a sync pool."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="pool-autotuner", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.tick()
+
+    async def run_async(self) -> None:
+        """
+        Tick on the running event loop until ``stop()``; for async engines.
+
+        Ticks run on the loop because asyncio pools may only be touched there.
+        """
+        self._stop.clear()
+        while not self._stop.is_set():
+            await asyncio.sleep(self.interval)
+            if not self._stop.is_set():
+                # Closing asyncio driver connections needs SQLAlchemy's greenlet context
+                await greenlet_spawn(self.tick)
+
+    def stop(self) -> None:
+        """Stop ticking and hand this process's capacity back to the budget."""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        if self.budget is not None:
+            self.budget.release()
@@ -1,32 +1,204 @@
 """Database connection utilities."""
 
 import os
-from typing import Optional
+import threading
+from typing import Any, Dict, Hashable, List, Optional, Tuple, Union
 from urllib.parse import quote_plus
 
 from sqlalchemy import create_engine, Engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 
+# Process-wide engines keyed by URL and engine options
+_ENGINES: Dict[Tuple[Hashable, ...], Union[Engine, AsyncEngine]] = {}
+_LOCK = threading.Lock()
 
-def get_connection(connection_str: Optional[str] = None) -> Engine:
+
+def _freeze(value: Any) -> Hashable:
+    """Turn engine options into a hashable registry key."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(item) for item in value)
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def _uses_queue_pool(db_url: str) -> bool:
+    """Whether SQLAlchemy gives this URL a sized pool; in-memory SQLite has none."""
+    url = make_url(db_url)
+    return not (url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"))
+
+
+def _resolve_url(connection_str: Optional[str]) -> str:
+    """Get the connection string, falling back to SQL_DB_CONNECTION."""
+    db_url = connection_str or os.getenv("SQL_DB_CONNECTION")
+
+    if not db_url:
+        raise ValueError(
+            "No database connection string provided. "
+            "Set SQL_DB_CONNECTION environment variable or provide connection_str."
+        )
+    return db_url
+
+
+def _engine_options(
+    db_url: str,
+    pool_size: int,
+    max_overflow: int,
+    pool_recycle: int,
+    pool_pre_ping: bool,
+    engine_kwargs: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Combine the pool settings and extra keyword arguments for an engine."""
+    options: Dict[str, Any] = {"pool_recycle": pool_recycle, "pool_pre_ping": pool_pre_ping}
+    if _uses_queue_pool(db_url):
+        options.update(pool_size=pool_size, max_overflow=max_overflow)
+    options.update(engine_kwargs)
+    return options
+
+
+def get_connection(
+    connection_str: Optional[str] = None,
+    pool_size: int = 5,
+    max_overflow: int = 10,
+    pool_recycle: int = 1800,
+    pool_pre_ping: bool = True,
+    **engine_kwargs: Any,
+) -> Engine:
     """
-    Create a SQLAlchemy engine from a connection string.
-    
+    Get the pooled SQLAlchemy engine for a connection string.
+
+    Engines are created once per process for each combination of URL and
+    options, so calling this per request reuses the same pool.
+
     Args:
         connection_str: Database connection string (defaults to env var SQL_DB_CONNECTION)
-        
+        pool_size: Connections kept open in the pool
+        max_overflow: Extra connections allowed above pool_size under load
+        pool_recycle: Seconds after which a connection is replaced, -1 to never recycle
+        pool_pre_ping: Whether to test connections before handing them out
+        **engine_kwargs: Further keyword arguments for create_engine
+
     Returns:
         SQLAlchemy engine
-        
+
     Raises:
         ValueError: If no connection string provided and SQL_DB_CONNECTION not set
     """
-    db_url = connection_str or os.getenv("SQL_DB_CONNECTION")
-    
-    if not db_url:
-        raise ValueError(
-            "No database connection string provided. "
-            "Set SQL_DB_CONNECTION environment variable or provide connection_str."
-        )
-    
-    engine = create_engine(db_url)
-    return engine
\ No newline at end of file
+    db_url = _resolve_url(connection_str)
+    options = _engine_options(
+        db_url, pool_size, max_overflow, pool_recycle, pool_pre_ping, engine_kwargs
+    )
+
+    key = (db_url, _freeze(options))
+    with _LOCK:
+        engine = _ENGINES.get(key)
+        if engine is None:
+            engine = create_engine(db_url, **options)
+            _ENGINES[key] = engine
+    return engine
+
+
+def get_async_connection(
+    connection_str: Optional[str] = None,
+    pool_size: int = 5,
+    max_overflow: int = 10,
+    pool_recycle: int = 1800,
+    pool_pre_ping: bool = True,
+    **engine_kwargs: Any,
+) -> AsyncEngine:
+    """
+    Get the pooled async SQLAlchemy engine for a connection string.
+
+    Like get_connection, but for async drivers such as asyncpg. The engine is
+    registered alongside the sync engines, so dispose_all and the fork hook
+    cover it too.
+
+    Args:
+        connection_str: Async connection string (defaults to env var SQL_DB_CONNECTION)
+        pool_size: Connections kept open in the pool
+        max_overflow: Extra connections allowed above pool_size under load
+        pool_recycle: Seconds after which a connection is replaced, -1 to never recycle
+        pool_pre_ping: Whether to test connections before handing them out
+        **engine_kwargs: Further keyword arguments for create_async_engine
+
+    Returns:
+        Async SQLAlchemy engine
+
+    Raises:
+        ValueError: If no connection string provided and SQL_DB_CONNECTION not set
+    """
+    db_url = _resolve_url(connection_str)
+    options = _engine_options(
+        db_url, pool_size, max_overflow, pool_recycle, pool_pre_ping, engine_kwargs
+    )
+
+    key = ("async", db_url, _freeze(options))
+    with _LOCK:
+        engine = _ENGINES.get(key)
+        if engine is None:
+            engine = create_async_engine(db_url, **options)
+            _ENGINES[key] = engine
+    return engine
+
+
+def registered_engines() -> List[Union[Engine, AsyncEngine]]:
+    """Get every engine created through get_connection or get_async_connection."""
+    with _LOCK:
+        return list(_ENGINES.values())
+
+
+def _dispose(engines: List[Union[Engine, AsyncEngine]], close: bool) -> None:
+    """Dispose engine pools; async connections are only ever discarded here."""
+    for engine in engines:
+        if isinstance(engine, AsyncEngine):
+            # Closing an async connection needs the event loop it was opened on
+            engine.sync_engine.dispose(close=False)
+        else:
+            engine.dispose(close=close)
+
+
+def dispose_all(close: bool = True) -> None:
+    """
+    Dispose the pools of every registered engine.
+
+    The engines stay registered and open new connections on next use. In a
+    forked worker pass ``close=False`` so the parent's connections are dropped
+    without being closed; this runs automatically after ``os.fork()``. Async
+    engines are always disposed without closing, as that needs their event
+    loop; await adispose_all from that loop to close them.
+
+    Args:
+        close: Whether to close pooled connections rather than just discard them
+    """
+    _dispose(registered_engines(), close)
+
+
+async def adispose_all() -> None:
+    """Dispose and close the pools of every registered engine, async ones included."""
+    for engine in registered_engines():
+        if isinstance(engine, AsyncEngine):
+            await engine.dispose()
+        else:
+            engine.dispose()
+
+
+def _reset_after_fork() -> None:
+    """
+    Drop the parent's pooled connections in a forked child.
+
+    The lock is re-created rather than taken, since another thread of the
+    parent may have held it at fork time, and nothing is closed, since the
+    connections still belong to the parent.
+    """
+    global _LOCK
+    _LOCK = threading.Lock()
+    _dispose(list(_ENGINES.values()), close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,226 @@
+"""Pre-execution safety checks for generated SQL."""
+
+import json
+import re
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import Connection, text
+
+_QUOTED = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+
+
+class QueryRejected(ValueError):
+    """Raised when a query fails a guard check.
+
+    The ``reason`` is written so it can be fed back to the LLM that generated
+    the query.
+    """
+
+    def __init__(self, reason: str, cost: Optional[float] = None, rows: Optional[float] = None):
+        super().__init__(f"Query rejected: {reason}")
+        self.reason = reason
+        self.cost = cost
+        self.rows = rows
+
+
+class GuardedQuery(BaseModel):
+    """A query that passed the guard, possibly rewritten."""
+
+    query: str
+    limit_added: bool = False
+    cost: Optional[float] = None
+    rows: Optional[float] = None
+
+
+def _code_only(query: str) -> str:
+    """Blank out comments, string literals and quoted identifiers in a query."""
+    query = re.sub(r"/\*.*?\*/", " ", query, flags=re.S)
+    query = re.sub(r"--[^\n]*", " ", query)
+    return _QUOTED.sub(lambda match: " " * len(match.group(0)), query)
+
+
+def _top_level(query: str) -> str:
+    """Keep only the parts of a query outside any parentheses."""
+    depth = 0
+    kept = []
+    for char in _code_only(query):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth = max(depth - 1, 0)
+        elif depth == 0:
+            kept.append(char)
+    return "".join(kept)
+
+
+def strip_statement(query: str) -> str:
+    """
+    Remove trailing whitespace and semicolons and check for a single read query.
+
+    Args:
+        query: SQL text
+
+    Returns:
+        The query without its trailing semicolon
+
+    Raises:
+        QueryRejected: If the text holds several statements or is not a SELECT
+    """
+    query = query.strip().rstrip(";").strip()
+    code = _code_only(query)
+    if ";" in code:
+        raise QueryRejected("Only a single statement is allowed; remove the extra statements.")
+    if not re.match(r"\s*(\(\s*)*(select|with)\b", code, flags=re.I):
+        raise QueryRejected("Only SELECT queries are allowed.")
+    return query
+
+
+def has_limit(query: str) -> bool:
+    """Check whether the outermost query already limits its rows."""
+    return re.search(r"\b(limit|fetch\s+(first|next))\b", _top_level(query), flags=re.I) is not None
+
+
+def inject_limit(query: str, limit: int) -> Tuple[str, bool]:
+    """
+    Append a LIMIT to a query whose outermost level has none.
+
+    Args:
+        query: A single SELECT without a trailing semicolon
+        limit: Row limit to add
+
+    Returns:
+        The query and whether a LIMIT was added
+    """
+    if has_limit(query):
+        return query, False
+    # A newline keeps a trailing line comment from swallowing the LIMIT
+    return f"{query}\nLIMIT {int(limit)}", True
+
+
+class QueryGuard:
+    """
+    Checks generated SELECTs before they run.
+
+    A query must be a single SELECT. Queries without a LIMIT get ``default_limit``
+    appended. On PostgreSQL the query is then planned with ``EXPLAIN``: plans
+    costlier than ``max_cost`` are rejected and plans estimating more than
+    ``max_rows`` rows are wrapped in an outer LIMIT. Queries run in a read-only
+    transaction with a ``statement_timeout``. Other dialects only get the
+    statement check and the LIMIT. Streamed queries are read in batches, so
+    they get neither the default LIMIT nor the row cap.
+    """
+
+    def __init__(
+        self,
+        max_cost: float = 1_000_000.0,
+        max_rows: int = 10_000,
+        default_limit: int = 1_000,
+        statement_timeout_ms: int = 30_000,
+    ):
+        """
+        Initialize the guard.
+
+        Args:
+            max_cost: Highest planner cost estimate allowed to run
+            max_rows: Highest estimated row count before the result is capped
+            default_limit: LIMIT added to queries that have none
+            statement_timeout_ms: Per-query timeout in milliseconds, 0 disables it
+        """
+        self.max_cost = max_cost
+        self.max_rows = max_rows
+        self.default_limit = default_limit
+        self.statement_timeout_ms = statement_timeout_ms
+
+    def check(
+        self,
+        query: str,
+        explain: Optional[Callable[[str], Any]] = None,
+        stream: bool = False,
+    ) -> GuardedQuery:
+        """
+        Check and rewrite a query, planning it through the given callable.
+
+        Args:
+            query: Generated SQL
+            explain: Optional callable running an SQL statement and returning the
+                ``EXPLAIN (FORMAT JSON)`` output; cost checks are skipped without it
+            stream: Whether the rows are streamed, leaving row caps to the reader
+
+        Returns:
+            The query to execute
+
+        Raises:
+            QueryRejected: If the query is not a single SELECT, cannot be planned
+                or is estimated to cost more than ``max_cost``
+        """
+        query, limit_added = strip_statement(query), False
+        if not stream:
+            query, limit_added = inject_limit(query, self.default_limit)
+        if explain is None:
+            return GuardedQuery(query=query, limit_added=limit_added)
+
+        try:
+            output = explain(f"EXPLAIN (FORMAT JSON) {query}")
+            if isinstance(output, str):
+                output = json.loads(output)
+            plan: Dict[str, Any] = output[0]["Plan"]
+            cost = float(plan["Total Cost"])
+            rows = float(plan["Plan Rows"])
+        except Exception as e:
+            message = str(e).splitlines()[0] if str(e) else type(e).__name__
+            raise QueryRejected(f"The query could not be planned: {message}") from e
+
+        if cost > self.max_cost:
+            raise QueryRejected(
+                f"The estimated cost {cost:.0f} exceeds the limit of {self.max_cost:.0f}. "
+                "Add selective filters, join on keys instead of cross joining, "
+                "or aggregate before joining.",
+                cost=cost,
+                rows=rows,
+            )
+        if rows > self.max_rows and not stream:
+            query = f"SELECT * FROM (\n{query}\n) AS guarded LIMIT {int(self.max_rows)}"
+            rows = float(self.max_rows)
+        return GuardedQuery(query=query, limit_added=limit_added, cost=cost, rows=rows)
+
+    def prepare(
+        self,
+        conn: Connection,
+        query: str,
+        parameters: Optional[Dict[str, Any]] = None,
+        stream: bool = False,
+    ) -> GuardedQuery:
+        """
+        Make the connection's transaction read-only and timed, then check a query.
+
+        The settings are transaction-local, so the query must run on the same
+        connection before its transaction ends.
+
+        Args:
+            conn: Connection the query will run on
+            query: Generated SQL
+            parameters: Query parameters, needed to plan parameterized queries
+            stream: Whether the rows are streamed, leaving row caps to the reader
+
+        Returns:
+            The query to execute
+
+        Raises:
+            QueryRejected: If the query fails a check
+        """
+        if conn.dialect.name != "postgresql":
+            return self.check(query, stream=stream)
+
+        conn.execute(
+            text(
+                "SELECT set_config('transaction_read_only', 'on', true), "
+                "set_config('statement_timeout', :timeout, true)"
+            ),
+            {"timeout": str(int(self.statement_timeout_ms))},
+        )
+        return self.check(
+            query,
+            lambda statement: conn.execute(text(statement), parameters or {}).scalar(),
+            stream=stream,
+        )
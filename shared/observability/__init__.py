@@ -1,5 +1,35 @@
 """Observability utilities for AI agent projects."""
 
+from .metrics import MetricsRegistry, get_metrics, percentile
+from .pool import PoolMetrics, PoolSnapshot, instrument_pool, pool_metrics, pool_snapshot
 from .setup import setup_openlit
+from .tracing import (
+    Span,
+    annotate,
+    collect_spans,
+    current_span,
+    record_tokens,
+    stage,
+    stage_summary,
+    token_usage,
+)
 
-__all__ = ["setup_openlit"]
\ No newline at end of file
+__all__ = [
+    "setup_openlit",
+    "MetricsRegistry",
+    "get_metrics",
+    "percentile",
+    "PoolMetrics",
+    "PoolSnapshot",
+    "instrument_pool",
+    "pool_metrics",
+    "pool_snapshot",
+    "Span",
+    "stage",
+    "annotate",
+    "current_span",
+    "record_tokens",
+    "token_usage",
+    "collect_spans",
+    "stage_summary",
+]
@@ -0,0 +1,211 @@
+"""In-process metrics with optional OpenTelemetry export."""
+
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+# Histograms keep this many recent observations for percentiles
+DEFAULT_RESERVOIR = 4096
+
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: Dict[str, Any]) -> _Key:
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+
+def _format_key(key: _Key) -> str:
+    name, labels = key
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{label}={value}" for label, value in labels) + "}"
+
+
+def percentile(values: Any, q: float) -> Optional[float]:
+    """
+    Get a percentile of some values by linear interpolation.
+
+    Args:
+        values: Observed values
+        q: Percentile between 0 and 100
+
+    Returns:
+        The percentile, or None without values
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class Histogram:
+    """Running totals plus a reservoir of recent observations."""
+
+    def __init__(self, reservoir: int = DEFAULT_RESERVOIR):
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.recent: Deque[float] = deque(maxlen=reservoir)
+
+    def record(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.recent.append(value)
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "p50": percentile(self.recent, 50),
+            "p99": percentile(self.recent, 99),
+        }
+
+
+class _OtelExport:
+    """Mirrors metrics into OpenTelemetry instruments when the API is installed."""
+
+    def __init__(self):
+        try:
+            from opentelemetry import metrics
+        except ImportError:
+            self.meter = None
+        else:
+            self.meter = metrics.get_meter("shared.observability")
+        self.instruments: Dict[Tuple[str, str], Any] = {}
+
+    def _instrument(self, kind: str, name: str) -> Any:
+        instrument = self.instruments.get((kind, name))
+        if instrument is None:
+            create = {
+                "counter": self.meter.create_counter,
+                "up_down": self.meter.create_up_down_counter,
+                "histogram": self.meter.create_histogram,
+            }[kind]
+            instrument = self.instruments[(kind, name)] = create(name)
+        return instrument
+
+    def add(self, kind: str, name: str, value: float, labels: Dict[str, Any]) -> None:
+        if self.meter is None:
+            return
+        instrument = self._instrument(kind, name)
+        attributes = {label: str(item) for label, item in labels.items()}
+        if kind == "histogram":
+            instrument.record(value, attributes=attributes)
+        else:
+            instrument.add(value, attributes=attributes)
+
+
+class MetricsRegistry:
+    """
+    Thread-safe counters, gauges and histograms.
+
+    Every metric is kept in process so load tests can read a ``snapshot()``.
+    When the OpenTelemetry API is installed the values are also recorded on
+    its global meter, which ``setup_openlit`` exports over OTLP; gauges are
+    exported as up-down counters.
+    """
+
+    def __init__(self, reservoir: int = DEFAULT_RESERVOIR):
+        """
+        Initialize the registry.
+
+        Args:
+            reservoir: Recent observations each histogram keeps for percentiles
+        """
+        self.reservoir = reservoir
+        self._counters: Dict[_Key, float] = {}
+        self._gauges: Dict[_Key, Dict[str, float]] = {}
+        self._histograms: Dict[_Key, Histogram] = {}
+        self._lock = threading.Lock()
+        self._export: Optional[_OtelExport] = None
+
+    def _exporter(self) -> _OtelExport:
+        if self._export is None:
+            self._export = _OtelExport()
+        return self._export
+
+    def increment(self, name: str, value: float = 1, **labels: Any) -> None:
+        """Add to a counter."""
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            exporter = self._exporter()
+        exporter.add("counter", name, value, labels)
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        """Set a gauge, remembering the highest value it reached."""
+        key = _key(name, labels)
+        with self._lock:
+            gauge = self._gauges.setdefault(key, {"value": 0, "max": value})
+            delta = value - gauge["value"]
+            gauge["value"] = value
+            gauge["max"] = max(gauge["max"], value)
+            exporter = self._exporter()
+        if delta:
+            exporter.add("up_down", name, delta, labels)
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Record a histogram observation, e.g. a duration in seconds."""
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.reservoir)
+            histogram.record(value)
+            exporter = self._exporter()
+        exporter.add("histogram", name, value, labels)
+
+    def counter_value(self, name: str, **labels: Any) -> float:
+        """Get the current value of a counter."""
+        with self._lock:
+            return self._counters.get(_key(name, labels), 0)
+
+    def gauge_value(self, name: str, **labels: Any) -> Dict[str, float]:
+        """Get the current and highest value of a gauge."""
+        with self._lock:
+            return dict(self._gauges.get(_key(name, labels), {"value": 0, "max": 0}))
+
+    def histogram_summary(self, name: str, **labels: Any) -> Dict[str, Optional[float]]:
+        """Get count, sum, min, max, p50 and p99 of a histogram."""
+        with self._lock:
+            histogram = self._histograms.get(_key(name, labels)) or Histogram(1)
+            return histogram.summary()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get every metric, keyed like ``name{label=value}``.
+
+        Returns:
+            Dict with ``counters``, ``gauges`` and ``histograms`` sections
+        """
+        with self._lock:
+            return {
+                "counters": {_format_key(key): value for key, value in self._counters.items()},
+                "gauges": {_format_key(key): dict(gauge) for key, gauge in self._gauges.items()},
+                "histograms": {
+                    _format_key(key): histogram.summary() for key, histogram in self._histograms.items()
+                },
+            }
+
+    def reset(self) -> None:
+        """Forget every metric, e.g. between load test runs."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+_REGISTRY = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Get the process-wide metrics registry."""
+    return _REGISTRY
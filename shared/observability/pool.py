@@ -0,0 +1,209 @@
+"""Connection pool metrics from SQLAlchemy pool events."""
+
+import threading
+import time
+import weakref
+from typing import Any, Optional, Union
+
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+from .metrics import MetricsRegistry, get_metrics
+
+# Keys stamped on a connection record's info dict while it connects
+_CONNECT_STARTED = "_pool_metrics_connect_started"
+_CONNECT_SECONDS = "_pool_metrics_connect_seconds"
+
+_INSTRUMENTED: "weakref.WeakKeyDictionary[Engine, PoolMetrics]" = weakref.WeakKeyDictionary()
+_POOLS: "weakref.WeakKeyDictionary[Pool, PoolMetrics]" = weakref.WeakKeyDictionary()
+_LOCK = threading.Lock()
+
+
+class PoolSnapshot(BaseModel):
+    """Point-in-time view of one engine's pool metrics; durations are in seconds."""
+
+    pool: str
+    pool_size: Optional[int] = None
+    checked_out: int = 0
+    max_checked_out: int = 0
+    overflow: int = 0
+    max_overflow: int = 0
+    checkouts: int = 0
+    checkout_wait_p50: Optional[float] = None
+    checkout_wait_p99: Optional[float] = None
+    checkout_wait_max: Optional[float] = None
+    timeouts: int = 0
+    connects: int = 0
+    connect_latency_p50: Optional[float] = None
+    connect_latency_p99: Optional[float] = None
+    invalidations: int = 0
+
+
+class PoolMetrics:
+    """
+    Records pool activity of one engine into a metrics registry.
+
+    Metrics are labelled with ``pool=<name>``:
+
+    - ``db.pool.checked_out`` / ``db.pool.overflow``: gauges of connections in
+      use and overflow connections open
+    - ``db.pool.connect_latency``: seconds to open a DBAPI connection
+    - ``db.pool.checkouts``, ``db.pool.connects`` and ``db.pool.invalidations``
+      counters
+    - ``db.pool.checkout_wait``: seconds spent waiting for a pooled connection,
+      not counting time spent opening a new one, and the ``db.pool.timeouts``
+      counter
+
+    Everything is recorded from SQLAlchemy pool events. No event fires before a
+    checkout starts waiting, so waits and timeouts are only recorded for pools
+    that time their own checkouts through ``observe_checkout``, such as
+    ``shared.db.AdaptiveQueuePool``.
+    """
+
+    def __init__(self, engine: Engine, name: str, registry: MetricsRegistry):
+        self.engine = engine
+        self.name = name
+        self.registry = registry
+        self._checked_out = 0
+        self._lock = threading.Lock()
+
+        event.listen(engine, "do_connect", self._on_do_connect)
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+        event.listen(engine, "soft_invalidate", self._on_soft_invalidate)
+        # engine.dispose() replaces the pool
+        event.listen(engine, "engine_disposed", self._on_engine_disposed)
+        _POOLS[engine.pool] = self
+
+    def observe_checkout(self, started: float, connection_record: Any = None) -> None:
+        """
+        Record how long a checkout waited for a connection.
+
+        Args:
+            started: ``time.perf_counter()`` when the checkout began
+            connection_record: The pool entry handed out, or None if the checkout timed out
+        """
+        seconds = time.perf_counter() - started
+        if connection_record is None:
+            self.registry.increment("db.pool.timeouts", pool=self.name)
+        else:
+            seconds -= connection_record.info.pop(_CONNECT_SECONDS, 0.0)
+        self.registry.observe("db.pool.checkout_wait", max(seconds, 0.0), pool=self.name)
+
+    def _record_usage(self) -> None:
+        pool = self.engine.pool
+        self.registry.set_gauge("db.pool.checked_out", self._checked_out, pool=self.name)
+        if hasattr(pool, "overflow"):
+            self.registry.set_gauge("db.pool.overflow", max(pool.overflow(), 0), pool=self.name)
+
+    def _on_do_connect(self, dialect: Any, connection_record: Any, cargs: Any, cparams: Any) -> None:
+        connection_record.info[_CONNECT_STARTED] = time.perf_counter()
+
+    def _on_connect(self, dbapi_connection: Any, connection_record: Any) -> None:
+        started = connection_record.info.pop(_CONNECT_STARTED, None)
+        self.registry.increment("db.pool.connects", pool=self.name)
+        if started is not None:
+            seconds = time.perf_counter() - started
+            connection_record.info[_CONNECT_SECONDS] = seconds
+            self.registry.observe("db.pool.connect_latency", seconds, pool=self.name)
+
+    def _on_checkout(self, dbapi_connection: Any, connection_record: Any, connection_proxy: Any) -> None:
+        # Left over when the pool does not time checkouts or a pre-ping reconnected
+        connection_record.info.pop(_CONNECT_SECONDS, None)
+        with self._lock:
+            self._checked_out += 1
+            self.registry.increment("db.pool.checkouts", pool=self.name)
+            self._record_usage()
+
+    def _on_checkin(self, dbapi_connection: Any, connection_record: Any) -> None:
+        with self._lock:
+            self._checked_out = max(self._checked_out - 1, 0)
+            self._record_usage()
+
+    def _on_invalidate(self, dbapi_connection: Any, connection_record: Any, exception: Any) -> None:
+        self.registry.increment("db.pool.invalidations", pool=self.name, kind="hard")
+
+    def _on_soft_invalidate(self, dbapi_connection: Any, connection_record: Any, exception: Any) -> None:
+        self.registry.increment("db.pool.invalidations", pool=self.name, kind="soft")
+
+    def _on_engine_disposed(self, engine: Engine) -> None:
+        with _LOCK:
+            _POOLS[engine.pool] = self
+
+    def snapshot(self) -> PoolSnapshot:
+        """Get the current pool metrics, e.g. at the end of a load test."""
+        registry, name = self.registry, self.name
+        pool = self.engine.pool
+        checked_out = registry.gauge_value("db.pool.checked_out", pool=name)
+        overflow = registry.gauge_value("db.pool.overflow", pool=name)
+        waits = registry.histogram_summary("db.pool.checkout_wait", pool=name)
+        connects = registry.histogram_summary("db.pool.connect_latency", pool=name)
+        return PoolSnapshot(
+            pool=name,
+            pool_size=pool.size() if hasattr(pool, "size") else None,
+            checked_out=checked_out["value"],
+            max_checked_out=checked_out["max"],
+            # The gauge is set before a checkin closes its overflow connection
+            overflow=max(pool.overflow(), 0) if hasattr(pool, "overflow") else overflow["value"],
+            max_overflow=overflow["max"],
+            checkouts=registry.counter_value("db.pool.checkouts", pool=name),
+            checkout_wait_p50=waits["p50"],
+            checkout_wait_p99=waits["p99"],
+            checkout_wait_max=waits["max"],
+            timeouts=registry.counter_value("db.pool.timeouts", pool=name),
+            connects=registry.counter_value("db.pool.connects", pool=name),
+            connect_latency_p50=connects["p50"],
+            connect_latency_p99=connects["p99"],
+            invalidations=(
+                registry.counter_value("db.pool.invalidations", pool=name, kind="hard")
+                + registry.counter_value("db.pool.invalidations", pool=name, kind="soft")
+            ),
+        )
+
+
+def instrument_pool(
+    engine: Any,
+    name: Optional[str] = None,
+    registry: Optional[MetricsRegistry] = None,
+) -> PoolMetrics:
+    """
+    Start recording pool metrics for an engine.
+
+    Calling it again for the same engine returns the existing instrumentation.
+
+    Args:
+        engine: SQLAlchemy Engine or AsyncEngine
+        name: Value of the ``pool`` label (defaults to the URL without password)
+        registry: Registry to record into (defaults to the process-wide one)
+
+    Returns:
+        The engine's pool metrics
+    """
+    sync_engine: Engine = getattr(engine, "sync_engine", engine)
+    with _LOCK:
+        metrics = _INSTRUMENTED.get(sync_engine)
+        if metrics is None:
+            metrics = PoolMetrics(
+                sync_engine,
+                name or sync_engine.url.render_as_string(hide_password=True),
+                registry or get_metrics(),
+            )
+            _INSTRUMENTED[sync_engine] = metrics
+    return metrics
+
+
+def pool_metrics(pool: Pool) -> Optional[PoolMetrics]:
+    """Get the metrics of the instrumented engine a pool belongs to, if any."""
+    # Called on every checkout, so a plain lookup rather than taking the lock
+    return _POOLS.get(pool)
+
+
+def pool_snapshot(engine: Any) -> Union[PoolSnapshot, None]:
+    """Get the pool metrics of an instrumented engine, or None if it is not instrumented."""
+    with _LOCK:
+        metrics = _INSTRUMENTED.get(getattr(engine, "sync_engine", engine))
+    return metrics.snapshot() if metrics else None
@@ -3,8 +3,6 @@
 import os
 from typing import Optional
 
-import openlit
-
 
 def setup_openlit(
     service_name: str, 
@@ -22,6 +20,8 @@ def setup_openlit(
     if disable:
         return
         
+    import openlit
+
     endpoint = otlp_endpoint or os.getenv("OPENLIT_ENDPOINT", "http://127.0.0.1:4318")
     
     openlit.init(
@@ -0,0 +1,210 @@
+"""Pipeline stage spans with per-stage latency, token and cache metrics."""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .metrics import MetricsRegistry, get_metrics
+
+_CURRENT: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+_COLLECTOR: ContextVar[Optional[List["Span"]]] = ContextVar("span_collector", default=None)
+
+
+class Span:
+    """One timed pipeline stage and its attributes."""
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, **attributes: Any):
+        self.name = name
+        self.parent = parent
+        self.attributes: Dict[str, Any] = dict(attributes)
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.error: Optional[str] = None
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+
+    @property
+    def cache_hit(self) -> bool:
+        return bool(self.attributes.get("cache_hit", False))
+
+    def set(self, **attributes: Any) -> None:
+        """Set attributes such as ``cache_hit`` or row counts."""
+        self.attributes.update(attributes)
+
+    def add_tokens(self, prompt: int = 0, completion: int = 0) -> None:
+        """Add LLM token usage to the stage."""
+        self.prompt_tokens += prompt
+        self.completion_tokens += completion
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "parent": self.parent.name if self.parent else None,
+            "duration": self.duration,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "error": self.error,
+            **self.attributes,
+        }
+
+    def __repr__(self) -> str:
+        return f"Span(name={self.name!r}, duration={self.duration}, attributes={self.attributes})"
+
+
+def _otel_span(name: str) -> Any:
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        return None
+    return trace.get_tracer("shared.observability").start_as_current_span(name)
+
+
+@contextmanager
+def stage(
+    name: str,
+    registry: Optional[MetricsRegistry] = None,
+    **attributes: Any,
+) -> Iterator[Span]:
+    """
+    Time a pipeline stage and record it as metrics and, if installed, an OpenTelemetry span.
+
+    Records, labelled with ``stage=<name>``: the ``stage.duration`` histogram,
+    ``stage.calls``, ``stage.cache_hits`` and ``stage.errors`` counters and the
+    ``stage.prompt_tokens`` / ``stage.completion_tokens`` counters. Code running
+    inside the stage, including on threads started with ``asyncio.to_thread``,
+    can add to it through ``annotate`` and ``record_tokens``.
+
+    Args:
+        name: Stage name, e.g. ``"sql_agent.db_execution"``
+        registry: Registry to record into (defaults to the process-wide one)
+        **attributes: Initial span attributes, e.g. ``cache_hit=False``
+
+    Yields:
+        The span, for setting attributes directly
+    """
+    span = Span(name, parent=_CURRENT.get(), **attributes)
+    token = _CURRENT.set(span)
+    otel = _otel_span(name)
+    otel_span = otel.__enter__() if otel is not None else None
+    error: Optional[BaseException] = None
+    try:
+        yield span
+    except BaseException as e:
+        error = e
+        span.error = type(e).__name__
+        raise
+    finally:
+        span.duration = time.perf_counter() - span.started
+        _CURRENT.reset(token)
+        if otel_span is not None:
+            otel_span.set_attributes({
+                "stage.prompt_tokens": span.prompt_tokens,
+                "stage.completion_tokens": span.completion_tokens,
+                **{f"stage.{key}": value for key, value in span.attributes.items()
+                   if isinstance(value, (bool, int, float, str))},
+            })
+            otel.__exit__(type(error) if error else None, error, error.__traceback__ if error else None)
+        _record(span, registry or get_metrics())
+        collector = _COLLECTOR.get()
+        if collector is not None:
+            collector.append(span)
+
+
+def _record(span: Span, registry: MetricsRegistry) -> None:
+    registry.observe("stage.duration", span.duration, stage=span.name)
+    registry.increment("stage.calls", stage=span.name)
+    if span.cache_hit:
+        registry.increment("stage.cache_hits", stage=span.name)
+    if span.error:
+        registry.increment("stage.errors", stage=span.name)
+    if span.prompt_tokens:
+        registry.increment("stage.prompt_tokens", span.prompt_tokens, stage=span.name)
+    if span.completion_tokens:
+        registry.increment("stage.completion_tokens", span.completion_tokens, stage=span.name)
+
+
+def current_span() -> Optional[Span]:
+    """Get the innermost active stage, if any."""
+    return _CURRENT.get()
+
+
+def annotate(**attributes: Any) -> None:
+    """Set attributes on the innermost active stage; does nothing outside a stage."""
+    span = _CURRENT.get()
+    if span is not None:
+        span.set(**attributes)
+
+
+def token_usage(response: Any) -> Tuple[int, int]:
+    """
+    Read prompt and completion token counts from an LLM response.
+
+    Understands LangChain's ``usage_metadata`` and the OpenAI ``token_usage``
+    in ``response_metadata``.
+
+    Args:
+        response: A chat message or similar response object
+
+    Returns:
+        Prompt and completion tokens, zeros when the response has no usage
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        return int(usage.get("input_tokens", 0)), int(usage.get("output_tokens", 0))
+    metadata = getattr(response, "response_metadata", None) or {}
+    usage = metadata.get("token_usage") or metadata.get("usage") or {}
+    return int(usage.get("prompt_tokens", 0) or 0), int(usage.get("completion_tokens", 0) or 0)
+
+
+def record_tokens(*responses: Any) -> None:
+    """Add the token usage of LLM responses to the innermost active stage."""
+    span = _CURRENT.get()
+    if span is None:
+        return
+    for response in responses:
+        if not isinstance(response, BaseException):
+            span.add_tokens(*token_usage(response))
+
+
+@contextmanager
+def collect_spans() -> Iterator[List[Span]]:
+    """
+    Collect the stages that finish inside the block, e.g. for one request or a test.
+
+    Yields:
+        List the finished spans are appended to
+    """
+    spans: List[Span] = []
+    token = _COLLECTOR.set(spans)
+    try:
+        yield spans
+    finally:
+        _COLLECTOR.reset(token)
+
+
+def stage_summary(registry: Optional[MetricsRegistry] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Summarize every recorded stage.
+
+    Args:
+        registry: Registry to read (defaults to the process-wide one)
+
+    Returns:
+        Per stage name: calls, cache hits, errors, tokens and duration
+        count/sum/min/max/p50/p99 in seconds
+    """
+    registry = registry or get_metrics()
+    prefix = "stage.calls{stage="
+    names = [key[len(prefix):-1] for key in registry.snapshot()["counters"] if key.startswith(prefix)]
+    return {
+        name: {
+            "calls": registry.counter_value("stage.calls", stage=name),
+            "cache_hits": registry.counter_value("stage.cache_hits", stage=name),
+            "errors": registry.counter_value("stage.errors", stage=name),
+            "prompt_tokens": registry.counter_value("stage.prompt_tokens", stage=name),
+            "completion_tokens": registry.counter_value("stage.completion_tokens", stage=name),
+            "duration": registry.histogram_summary("stage.duration", stage=name),
+        }
+        for name in sorted(names)
+    }
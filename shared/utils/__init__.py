@@ -1,5 +1,17 @@
 """General utilities for AI agent projects."""
 
-from .env import load_env
+from .config import load_toml, reload_toml, watch_toml
+from .env import find_project_root, load_env, on_reload, reload
+from .settings import Settings, get_settings
 
-__all__ = ["load_env"]
\ No newline at end of file
+__all__ = [
+    "load_env",
+    "find_project_root",
+    "on_reload",
+    "reload",
+    "Settings",
+    "get_settings",
+    "load_toml",
+    "reload_toml",
+    "watch_toml",
+]
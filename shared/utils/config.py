@@ -0,0 +1,116 @@
+"""Cached TOML configuration loading with reload on file change."""
+
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+ConfigCallback = Callable[[Path, Dict[str, Any]], None]
+
+# Parsed files keyed by resolved path, with the (mtime_ns, size) they were parsed at
+_CACHE: Dict[Path, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+_WATCHERS: Dict[Path, List[ConfigCallback]] = {}
+_POLLERS: Dict[Path, threading.Thread] = {}
+_LOCK = threading.RLock()
+
+
+def _parse(path: Path) -> Dict[str, Any]:
+    try:
+        import tomllib
+    except ImportError:  # Python < 3.11
+        import tomli as tomllib
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+
+def _version(path: Path) -> Tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_toml(path: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Load a TOML file, parsing it again only when it changed on disk.
+
+    Each call costs one ``stat``. The returned dict is shared by all callers
+    and must not be modified.
+
+    Args:
+        path: Path to the TOML file
+
+    Returns:
+        The parsed configuration
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+    """
+    path = Path(path).resolve()
+    version = _version(path)
+    cached = _CACHE.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    with _LOCK:
+        cached = _CACHE.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        config = _parse(path)
+        _CACHE[path] = (version, config)
+        callbacks = list(_WATCHERS.get(path, ())) if cached is not None else []
+    for callback in callbacks:
+        callback(path, config)
+    return config
+
+
+def reload_toml(path: Optional[Union[str, Path]] = None) -> None:
+    """
+    Forget parsed files so the next load parses them again.
+
+    Args:
+        path: File to forget (defaults to every file)
+    """
+    with _LOCK:
+        if path is None:
+            _CACHE.clear()
+        else:
+            _CACHE.pop(Path(path).resolve(), None)
+
+
+def watch_toml(
+    path: Union[str, Path],
+    callback: ConfigCallback,
+    interval: Optional[float] = None,
+) -> None:
+    """
+    Call a function whenever a TOML file is parsed again after a change.
+
+    Changes are noticed by the next ``load_toml`` of the file, or by a
+    background thread polling every ``interval`` seconds if one is given.
+
+    Args:
+        path: Path to the TOML file
+        callback: Called with the resolved path and the new configuration
+        interval: Optional seconds between background checks for changes
+    """
+    path = Path(path).resolve()
+    with _LOCK:
+        _WATCHERS.setdefault(path, []).append(callback)
+        # Parse now so the first change is reported as a change
+        if path not in _CACHE and path.exists():
+            _CACHE[path] = (_version(path), _parse(path))
+        if interval is not None and path not in _POLLERS:
+            poller = threading.Thread(
+                target=_poll, args=(path, interval), name=f"watch-{path.name}", daemon=True
+            )
+            _POLLERS[path] = poller
+            poller.start()
+
+
+def _poll(path: Path, interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            load_toml(path)
+        except (OSError, ValueError):
+            # Missing or half-written files are retried on the next check
+            continue
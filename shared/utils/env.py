@@ -1,43 +1,136 @@
 """Environment variable utilities."""
 
 import os
+import threading
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Union
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
 
-from dotenv import load_dotenv
+from dotenv import dotenv_values, find_dotenv
+
+# Values set from .env files; a reload may replace them unless the process changed them since
+_FROM_FILES: Dict[str, str] = {}
+_LOADED: Set[Tuple[str, Optional[str], bool]] = set()
+_RELOAD_HOOKS: List[Callable[[], None]] = []
+_LOCK = threading.RLock()
+
+
+@lru_cache(maxsize=None)
+def _find_root(start: Path, markers: Tuple[str, ...]) -> Path:
+    root = start
+    while root != root.parent:
+        if any((root / marker).exists() for marker in markers):
+            return root
+        root = root.parent
+    return root
+
+
+def find_project_root(
+    start: Optional[Union[str, Path]] = None,
+    markers: Tuple[str, ...] = (".git",),
+) -> Path:
+    """
+    Find the nearest directory containing one of the marker files.
+
+    The walk up the filesystem is cached per start directory and markers.
+
+    Args:
+        start: Directory to start from (defaults to the current directory)
+        markers: File or directory names marking the root
+
+    Returns:
+        The root directory, or the filesystem root if no marker was found
+    """
+    return _find_root(Path(start or Path.cwd()).resolve(), tuple(markers))
+
+
+def _apply(path: Path, assigned: Set[str]) -> bool:
+    """Set variables from a .env file that the process environment does not define."""
+    if not path.is_file():
+        return False
+    for key, value in dotenv_values(path).items():
+        if value is None or key in assigned:
+            continue
+        if key not in os.environ or _FROM_FILES.get(key) == os.environ[key]:
+            os.environ[key] = value
+            _FROM_FILES[key] = value
+            assigned.add(key)
+    return True
 
 
 def load_env(
-    env_path: Optional[Union[str, Path]] = None, 
+    env_path: Optional[Union[str, Path]] = None,
     project_root: bool = True
 ) -> None:
     """
     Load environment variables from .env file.
-    
+
+    Each combination of working directory and arguments is loaded once per
+    process; later calls return immediately. Variables already set in the
+    process environment take precedence over .env files, and the first file
+    loaded wins over later ones. Use ``reload()`` to re-read changed files.
+
+    Args:
+        env_path: Path to .env file (defaults to the nearest .env in the current
+            directory or one of its parents)
+        project_root: Whether to also load .env from project root
+    """
+    cwd = Path.cwd().resolve()
+    key = (str(cwd), str(env_path) if env_path else None, project_root)
+    if key in _LOADED:
+        return
+
+    with _LOCK:
+        if key in _LOADED:
+            return
+        assigned: Set[str] = set()
+        # Load project-specific .env if provided, else the nearest one up the directory tree
+        default = find_dotenv(usecwd=True)
+        if env_path or default:
+            _apply(Path(env_path or default), assigned)
+
+        # Also load from project root if requested
+        if project_root:
+            root = find_project_root(cwd)
+            # Load .env from root if found and different from current
+            if root != cwd and _apply(root / ".env", assigned):
+                print(f"Loaded environment from {root / '.env'}")
+        _LOADED.add(key)
+
+
+def on_reload(hook: Callable[[], None]) -> Callable[[], None]:
+    """
+    Register a function to call after ``reload()``, e.g. to drop derived caches.
+
+    Args:
+        hook: Function taking no arguments
+
+    Returns:
+        The hook, so this can be used as a decorator
+    """
+    with _LOCK:
+        _RELOAD_HOOKS.append(hook)
+    return hook
+
+
+def reload(
+    env_path: Optional[Union[str, Path]] = None,
+    project_root: bool = True
+) -> None:
+    """
+    Forget cached project roots and loaded files, then load the environment again.
+
+    Values that came from .env files are replaced by the files' current
+    contents; variables set by the process environment are left alone.
+
     Args:
         env_path: Path to .env file (defaults to .env in current directory)
         project_root: Whether to also load .env from project root
     """
-    # Load project-specific .env if provided
-    if env_path:
-        path = Path(env_path) if isinstance(env_path, str) else env_path
-        load_dotenv(path)
-    else:
-        # Load from current directory
-        load_dotenv()
-    
-    # Also load from project root if requested
-    if project_root:
-        # Find project root (contains .git)
-        current = Path.cwd()
-        root = current
-        
-        while root != root.parent:
-            if (root / ".git").exists():
-                break
-            root = root.parent
-            
-        # Load .env from root if found and different from current
-        if root != current and (root / ".env").exists():
-            load_dotenv(root / ".env")
-            print(f"Loaded environment from {root / '.env'}")
\ No newline at end of file
+    with _LOCK:
+        _LOADED.clear()
+        _find_root.cache_clear()
+        load_env(env_path, project_root)
+        hooks = list(_RELOAD_HOOKS)
+    for hook in hooks:
+        hook()
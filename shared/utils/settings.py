@@ -0,0 +1,88 @@
+"""Typed snapshot of the settings shared by all subprojects."""
+
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Mapping, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+from .env import find_project_root, load_env, on_reload
+
+
+class Settings(BaseModel):
+    """
+    Immutable view of the environment after the .env files are loaded.
+
+    Read it through ``get_settings()``; call ``shared.utils.reload()`` to take a
+    new snapshot after the environment or .env files change.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    app_env: str = "development"
+    project_root: Path
+    db_host: str = "localhost"
+    db_port: int = 5432
+    db_name: str = "ai_query_assistant"
+    db_user: str = "postgres"
+    db_password: str = "postgres"
+    sql_db_connection: Optional[str] = None
+    llm_provider: Optional[str] = None
+    openai_api_key: Optional[str] = None
+    openlit_endpoint: str = "http://127.0.0.1:4318"
+
+    @property
+    def is_development(self) -> bool:
+        """Whether the app runs in the development environment."""
+        return self.app_env == "development"
+
+    def database_url(self, driver: str = "") -> str:
+        """
+        Build the PostgreSQL URL from the DB_* settings.
+
+        Args:
+            driver: Optional DBAPI driver, e.g. "asyncpg"
+
+        Returns:
+            SQLAlchemy database URL
+        """
+        scheme = f"postgresql+{driver}" if driver else "postgresql"
+        return f"{scheme}://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}"
+
+    @classmethod
+    def from_environ(cls, environ: Optional[Mapping[str, str]] = None) -> "Settings":
+        """
+        Read settings from environment variables.
+
+        Args:
+            environ: Variables to read (defaults to ``os.environ``)
+
+        Returns:
+            The settings
+        """
+        environ = os.environ if environ is None else environ
+        names = {
+            "app_env": "APP_ENV",
+            "db_host": "DB_HOST",
+            "db_port": "DB_PORT",
+            "db_name": "DB_NAME",
+            "db_user": "DB_USER",
+            "db_password": "DB_PASSWORD",
+            "sql_db_connection": "SQL_DB_CONNECTION",
+            "llm_provider": "LLM_PROVIDER",
+            "openai_api_key": "OPENAI_API_KEY",
+            "openlit_endpoint": "OPENLIT_ENDPOINT",
+        }
+        values = {field: environ[name] for field, name in names.items() if environ.get(name)}
+        return cls(project_root=find_project_root(), **values)
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """Load the environment once and return the process-wide settings snapshot."""
+    load_env()
+    return Settings.from_environ()
+
+
+on_reload(get_settings.cache_clear)
@@ -19,7 +19,7 @@ import openlit
 import sys
 import os.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../..')))
-from shared.utils.env import load_env
+from shared.utils import get_settings
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
@@ -28,14 +28,14 @@ logger = logging.getLogger(__name__)
 # Disable LangSmith warnings
 os.environ["LANGCHAIN_TRACING_V2"] = "false"
 
-# Load environment variables from root and local .env files
+# Load environment variables from root and local .env files, once
 logger.info("Loading environment variables")
-load_env()
+settings = get_settings()
 
 # Initialize OpenLit with minimal configuration
 logger.info("Initializing OpenLit...")
 openlit.init(
-    otlp_endpoint=os.getenv("OPENLIT_ENDPOINT", "http://127.0.0.1:4318"),
+    otlp_endpoint=settings.openlit_endpoint,
     application_name="sql-tutorial",
     trace_content=True  # Enable content tracing for debugging
 )
@@ -44,8 +44,7 @@ openlit.init(
 def create_db():
     """Create database connection."""
     logger.debug("Creating database connection...")
-    db_url = f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
-    db = SQLDatabase.from_uri(db_url, sample_rows_in_table_info=3)
+    db = SQLDatabase.from_uri(settings.database_url(), sample_rows_in_table_info=3)
     logger.debug("Database connection created successfully")
     return db
 
@@ -57,7 +56,7 @@ def create_llm():
         llm = ChatOpenAI(
             model_name="gpt-4-turbo-preview",
             temperature=0,
-            api_key=os.getenv("OPENAI_API_KEY"),
+            api_key=settings.openai_api_key,
             verbose=True
         )
         logger.debug("LLM created successfully")
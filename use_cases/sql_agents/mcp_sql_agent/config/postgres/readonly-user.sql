@@ -20,4 +20,10 @@ GRANT EXECUTE ON ALL FUNCTIONS IN SCHEMA public TO ${READONLY_USER};
 
 -- Revoke any write permissions explicitly
 REVOKE INSERT, UPDATE, DELETE, TRUNCATE ON ALL TABLES IN SCHEMA public FROM ${READONLY_USER};
-ALTER DEFAULT PRIVILEGES IN SCHEMA public REVOKE INSERT, UPDATE, DELETE, TRUNCATE ON TABLES FROM ${READONLY_USER};
\ No newline at end of file
+ALTER DEFAULT PRIVILEGES IN SCHEMA public REVOKE INSERT, UPDATE, DELETE, TRUNCATE ON TABLES FROM ${READONLY_USER};
+
+-- Make every session read-only and bound its queries. The MCP server runs each
+-- statement on its own, so the agent cannot open a read-only transaction or
+-- SET LOCAL a timeout around a query; the role enforces both instead
+ALTER ROLE ${READONLY_USER} SET default_transaction_read_only = on;
+ALTER ROLE ${READONLY_USER} SET statement_timeout = '30s';
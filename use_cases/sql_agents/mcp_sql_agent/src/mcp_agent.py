@@ -15,9 +15,10 @@ from pathlib import Path
 # Import shared environment utilities from the repo root
 repo_root = Path(__file__).resolve().parents[4]
 sys.path.append(str(repo_root))
-from shared.utils.env import load_env
+from shared.utils import get_settings, load_env
+from shared.db.guard import QueryGuard, QueryRejected
 
-# Load environment variables
+# Load environment variables (cached, so repeated imports are free)
 load_env()
 
 # Set up logging
@@ -47,6 +48,7 @@ class MCPSQLAgent:
         grafana_mcp_url: str = "http://mcp-grafana:8080",
         model_name: str = "gpt-4",
         temperature: float = 0,
+        query_guard: Optional[QueryGuard] = None,
     ):
         """
         Initialize the MCP SQL Agent.
@@ -57,17 +59,23 @@ class MCPSQLAgent:
             grafana_mcp_url: URL for Grafana MCP server
             model_name: OpenAI model name to use
             temperature: Temperature for LLM generation
+            query_guard: Optional guard checking PostgreSQL queries before they run;
+                a default QueryGuard is used if not provided. Only its EXPLAIN
+                checks and LIMIT apply here, see query_postgres
         """
         # Connect to MCP servers
         self.postgres_mcp = MCPClient(postgres_mcp_url)
         self.snowflake_mcp = MCPClient(snowflake_mcp_url)
         self.grafana_mcp = MCPClient(grafana_mcp_url)
 
+        # Plan and limit PostgreSQL queries before they reach the server
+        self.query_guard = query_guard or QueryGuard()
+
         # Initialize LLM
         self.llm = ChatOpenAI(
             model=model_name,
             temperature=temperature,
-            api_key=os.environ.get("OPENAI_API_KEY"),
+            api_key=get_settings().openai_api_key,
         )
 
         # Create tools
@@ -78,19 +86,38 @@ class MCPSQLAgent:
 
     def _create_tools(self) -> List[BaseTool]:
         """Create tools for the agent to use."""
+        def explain_postgres(statement: str) -> Any:
+            """Run an EXPLAIN statement through the PostgreSQL MCP server."""
+            response = self.postgres_mcp.query(statement)
+            return response['rows'][0][0]
+
         # PostgreSQL query tool with read-only enforcement
         def query_postgres(query: str) -> str:
-            """Execute a read-only SQL query against PostgreSQL and return the results."""
+            """Execute a read-only SQL query against PostgreSQL and return the results.
+
+            The MCP server runs each statement on its own, so unlike
+            QueryGuard.prepare this cannot wrap the query in a read-only
+            transaction with SET LOCAL statement_timeout. Those limits come
+            from the server's database role instead, which
+            config/postgres/readonly-user.sql makes read-only with a 30 second
+            statement_timeout.
+            """
             # Enforce read-only by checking for dangerous commands
-            query = query.strip().lower()
+            lowered = query.strip().lower()
             dangerous_commands = ["insert", "update", "delete", "drop", "alter", "create", "truncate", "grant", "revoke"]
-            if any(cmd in query.lower() for cmd in dangerous_commands):
+            if any(cmd in lowered for cmd in dangerous_commands):
                 return "Error: Only SELECT queries are allowed for safety reasons."
             
             # Only allow queries that start with SELECT
-            if not query.startswith("select"):
+            if not lowered.startswith("select"):
                 return "Error: Only SELECT queries are allowed. Please rewrite your query."
                 
+            # Reject expensive plans and cap the rows before running the query
+            try:
+                query = self.query_guard.check(query, explain_postgres).query
+            except QueryRejected as e:
+                return f"Error: {e} Please rewrite your query."
+                
             try:
                 response = self.postgres_mcp.query(query)
                 df = pd.DataFrame(response['rows'], columns=response['columns'])
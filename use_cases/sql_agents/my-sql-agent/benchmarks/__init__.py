@@ -0,0 +1,5 @@
+"""
+Offline benchmarks for the query agents.
+
+Run ``python -m benchmarks.run --help`` from the my-sql-agent directory.
+"""
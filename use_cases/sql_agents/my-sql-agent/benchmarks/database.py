@@ -0,0 +1,96 @@
+"""
+Benchmark database seeded from sql/init.sql and sql/test_data.sql.
+
+PostgreSQL runs the scripts as they are. SQLite gets the same tables and data
+through a few rewrites of the PostgreSQL-only syntax; functions and triggers
+are skipped.
+"""
+import re
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import StaticPool
+
+SQL_DIR = Path(__file__).resolve().parents[1] / "sql"
+SEED_FILES = ("init.sql", "test_data.sql")
+
+# PostgreSQL syntax in the seed scripts and its SQLite equivalent
+SQLITE_REWRITES = [
+    (re.compile(r"\bSERIAL PRIMARY KEY\b"), "INTEGER PRIMARY KEY"),
+    (re.compile(r"^(DROP TABLE IF EXISTS \w+) CASCADE$"), r"\1"),
+    # Regex CHECK constraints have no SQLite counterpart
+    (re.compile(r",\s*CONSTRAINT \w+ CHECK \([^\n]*~\*[^\n]*\)"), ""),
+    (re.compile(r"\(random\(\) \* (\d+) \+ (\d+)\)::int"), r"(abs(random()) % \1 + \2)"),
+    (re.compile(r"CURRENT_DATE - INTERVAL '(\d+) (\w+)'"), r"date('now', '-\1 \2')"),
+    (re.compile(r"\bdate - (\d+)\b"), r"date(date, '-\1 days')"),
+]
+SQLITE_SKIPPED = re.compile(r"^(CREATE OR REPLACE FUNCTION|CREATE TRIGGER)\b", re.IGNORECASE)
+
+def split_statements(script: str) -> List[str]:
+    """Split a SQL script into statements, keeping dollar-quoted bodies whole."""
+    script = "\n".join(line for line in script.splitlines() if not line.strip().startswith("--"))
+    statements, current, quoted = [], [], False
+    for part in re.split(r"(\$\$|;)", script):
+        if part == "$$":
+            quoted = not quoted
+        if part == ";" and not quoted:
+            statement = "".join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+        else:
+            current.append(part)
+    statement = "".join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+def to_sqlite(statement: str) -> Optional[str]:
+    """Rewrite a seed statement for SQLite, or None if it has no SQLite counterpart."""
+    if SQLITE_SKIPPED.match(statement):
+        return None
+    for pattern, replacement in SQLITE_REWRITES:
+        statement = pattern.sub(replacement, statement)
+    return statement
+
+def seed_database(engine: Engine, sql_dir: Path = SQL_DIR) -> None:
+    """Create the sales schema and load the test data.
+
+    Args:
+        engine: PostgreSQL or SQLite engine; existing sales tables are replaced
+        sql_dir: Directory holding the seed scripts
+    """
+    sqlite = engine.dialect.name == "sqlite"
+    with engine.begin() as conn:
+        for name in SEED_FILES:
+            script = (sql_dir / name).read_text()
+            if not sqlite:
+                # Straight to the driver, which would otherwise read the % in the scripts as placeholders
+                conn.connection.cursor().execute(script)
+                continue
+            for statement in split_statements(script):
+                statement = to_sqlite(statement)
+                if statement is not None:
+                    conn.exec_driver_sql(statement)
+
+def create_benchmark_engine(url: Optional[str] = None) -> Engine:
+    """Create and seed the benchmark database.
+
+    Args:
+        url: Database URL; defaults to an in-memory SQLite database
+
+    Returns:
+        The seeded engine
+    """
+    if url is None:
+        engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+    else:
+        engine = create_engine(url, pool_size=32, max_overflow=0, pool_pre_ping=True)
+    seed_database(engine)
+    return engine
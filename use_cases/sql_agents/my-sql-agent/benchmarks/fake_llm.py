@@ -0,0 +1,209 @@
+"""
+Deterministic chat model that answers the agents' prompts with canned plans and SQL.
+"""
+import asyncio
+import json
+import math
+import random
+import re
+import time
+from typing import Any, Dict, List, Literal, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import BaseModel, Field, PrivateAttr
+
+from src.agent.sql_agent import SQL_AGENT_SYSTEM_PROMPT
+
+class LatencyModel(BaseModel):
+    """Distribution of simulated LLM response times in seconds."""
+    distribution: Literal["constant", "uniform", "normal", "lognormal"] = "lognormal"
+    median: float = Field(default=0.2, ge=0.0)
+    spread: float = Field(default=0.5, ge=0.0)
+
+    @classmethod
+    def from_spec(cls, spec: str) -> "LatencyModel":
+        """Parse a ``distribution[:median[:spread]]`` string, e.g. ``lognormal:0.2:0.5``."""
+        parts = spec.split(":")
+        values: Dict[str, Any] = {"distribution": parts[0]}
+        if len(parts) > 1:
+            values["median"] = float(parts[1])
+        if len(parts) > 2:
+            values["spread"] = float(parts[2])
+        return cls(**values)
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw one response time.
+
+        ``uniform`` varies by ``spread`` times the median either way, ``normal``
+        has a standard deviation of ``spread`` times the median and ``lognormal``
+        has ``spread`` as the sigma of the underlying normal.
+        """
+        if self.distribution == "constant":
+            return self.median
+        if self.distribution == "uniform":
+            return rng.uniform(self.median * (1 - min(self.spread, 1.0)), self.median * (1 + self.spread))
+        if self.distribution == "normal":
+            return max(0.0, rng.gauss(self.median, self.median * self.spread))
+        return self.median * math.exp(rng.gauss(0.0, self.spread))
+
+class Scenario(BaseModel):
+    """A benchmark question with the plan and SQL the fake model answers it with."""
+    question: str
+    plan: Dict[str, Any]
+    sql: str
+
+def _plan(primary: str, *steps: str) -> Dict[str, Any]:
+    """Build a plan payload whose steps are (type, description, fields) strings."""
+    operations = []
+    for step in steps:
+        operation_type, description, fields = step.split("|")
+        operations.append({
+            "operation_type": operation_type,
+            "description": description,
+            "required_fields": fields.split(",")
+        })
+    return {"primary_operation": primary, "operations": operations}
+
+# Questions over the sales schema in sql/init.sql; the SQL runs on PostgreSQL and SQLite
+DEFAULT_SCENARIOS: List[Scenario] = [
+    Scenario(
+        question="List all customers",
+        plan=_plan("data_retrieval", "data_retrieval|Fetch every customer|customer_id,name,email"),
+        sql="SELECT customer_id, name, email FROM customers ORDER BY customer_id"
+    ),
+    Scenario(
+        question="What is the total revenue per customer?",
+        plan=_plan(
+            "data_analysis",
+            "data_retrieval|Fetch sales revenue|customer_id,revenue",
+            "data_analysis|Sum revenue per customer|customer_id,revenue"
+        ),
+        sql="SELECT customer_id, SUM(revenue) AS total_revenue FROM sales "
+            "GROUP BY customer_id ORDER BY customer_id"
+    ),
+    Scenario(
+        question="Which product brings in the most money?",
+        plan=_plan(
+            "data_analysis",
+            "data_retrieval|Fetch sales per product|product_name,revenue",
+            "data_analysis|Rank products by revenue|product_name,revenue"
+        ),
+        sql="SELECT product_name, SUM(revenue) AS total_revenue FROM sales "
+            "GROUP BY product_name ORDER BY total_revenue DESC LIMIT 1"
+    ),
+    Scenario(
+        question="Plot daily revenue for each product",
+        plan=_plan(
+            "data_visualization",
+            "data_retrieval|Fetch revenue by date and product|date,product_name,revenue",
+            "data_visualization|Line chart of revenue per product|date,revenue"
+        ),
+        sql="SELECT date, product_name, SUM(revenue) AS revenue FROM sales "
+            "GROUP BY date, product_name ORDER BY date"
+    ),
+    Scenario(
+        question="How many purchases has each customer made?",
+        plan=_plan(
+            "data_analysis",
+            "data_retrieval|Fetch sales per customer|customer_id",
+            "data_analysis|Count sales per customer|customer_id"
+        ),
+        sql="SELECT c.name, COUNT(s.sale_id) AS purchases FROM customers c "
+            "JOIN sales s ON s.customer_id = c.customer_id GROUP BY c.name ORDER BY purchases DESC"
+    ),
+    Scenario(
+        question="Who are our customers that spend above the typical order value?",
+        plan=_plan(
+            "data_analysis",
+            "data_retrieval|Fetch sales amounts per customer|customer_id,sales_amount",
+            "data_analysis|Compare customer averages with the overall average|customer_id,sales_amount"
+        ),
+        sql="SELECT customer_id, AVG(sales_amount) AS average_order FROM sales GROUP BY customer_id "
+            "HAVING AVG(sales_amount) > (SELECT AVG(sales_amount) FROM sales)"
+    ),
+]
+
+_IMPLEMENTATION_QUERY = re.compile(r'For the query: "(.*)"')
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that answers planner, implementation and SQL prompts from scenarios.
+
+    Each call sleeps for a response time drawn from ``latency`` with a seeded
+    random generator and reports token usage estimated from the message sizes.
+    """
+    scenarios: List[Scenario] = Field(default_factory=lambda: list(DEFAULT_SCENARIOS))
+    latency: LatencyModel = Field(default_factory=LatencyModel)
+    seed: int = 0
+    calls: int = 0
+    _rng: Optional[random.Random] = PrivateAttr(default=None)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _delay(self) -> float:
+        """Draw the simulated response time of the next call."""
+        if self._rng is None:
+            self._rng = random.Random(self.seed)
+        self.calls += 1
+        return self.latency.sample(self._rng)
+
+    def _scenario(self, question: str) -> Scenario:
+        """Find the scenario for a question taken from a prompt."""
+        for scenario in self.scenarios:
+            if scenario.question.lower() == question.strip().lower():
+                return scenario
+        raise ValueError(f"No canned response for question: {question!r}")
+
+    def _respond(self, messages: List[BaseMessage]) -> AIMessage:
+        """Answer the prompt of whichever agent sent the messages."""
+        system = str(messages[0].content)
+        if system == SQL_AGENT_SYSTEM_PROMPT:
+            question = str(messages[-1].content).rsplit("answer this question:", 1)[1]
+            arguments = {"query": self._scenario(question).sql, "parameters": {}}
+            message = AIMessage(content="", additional_kwargs={
+                "function_call": {"name": "generate_sql", "arguments": json.dumps(arguments)}
+            })
+        elif system.startswith("You are a query planner"):
+            question = system.rsplit("EXACTLY:", 1)[1]
+            message = AIMessage(content="", additional_kwargs={
+                "function_call": {"name": "plan_query", "arguments": json.dumps(self._scenario(question).plan)}
+            })
+        else:
+            match = _IMPLEMENTATION_QUERY.search(system)
+            if match is None:
+                raise ValueError("Unrecognized prompt")
+            scenario = self._scenario(match.group(1))
+            message = AIMessage(content=f"1. Retrieve the data:\n```sql\n{scenario.sql}\n```")
+
+        # Roughly four characters per token
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4
+        completion_tokens = max(1, len(str(message.content) + json.dumps(message.additional_kwargs)) // 4)
+        message.usage_metadata = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+        return message
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        time.sleep(self._delay())
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        await asyncio.sleep(self._delay())
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
@@ -4,6 +4,7 @@
 DROP TABLE IF EXISTS sales CASCADE;
 DROP TABLE IF EXISTS customers CASCADE;
 DROP TABLE IF EXISTS products CASCADE;
+DROP TABLE IF EXISTS table_change_counters CASCADE;
 
 -- Create customers table
 CREATE TABLE customers (
@@ -69,4 +70,38 @@ CREATE TRIGGER update_customer_updated_at
 CREATE TRIGGER update_product_updated_at
     BEFORE UPDATE ON products
     FOR EACH ROW
-    EXECUTE FUNCTION update_updated_at_column(); 
\ No newline at end of file
+    EXECUTE FUNCTION update_updated_at_column(); 
+
+-- Create per-table write counters used to invalidate cached query results
+CREATE TABLE table_change_counters (
+    table_name TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+-- Create change counter trigger function
+CREATE OR REPLACE FUNCTION bump_table_change_counter()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO table_change_counters (table_name, version)
+    VALUES (TG_TABLE_NAME, 1)
+    ON CONFLICT (table_name) DO UPDATE
+        SET version = table_change_counters.version + 1;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Add change counter triggers
+CREATE TRIGGER customers_change_counter
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON customers
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_table_change_counter();
+
+CREATE TRIGGER products_change_counter
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON products
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_table_change_counter();
+
+CREATE TRIGGER sales_change_counter
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON sales
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_table_change_counter();
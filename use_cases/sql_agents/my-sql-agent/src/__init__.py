@@ -1,3 +1,8 @@
 """
 AI Query Assistant main package.
-""" 
\ No newline at end of file
+"""
+import os
+import sys
+
+# Make the repo-level shared package importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../..'))) 
\ No newline at end of file
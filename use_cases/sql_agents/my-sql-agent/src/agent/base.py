@@ -1,38 +1,23 @@
 """
 Base agent implementation for handling queries.
 """
-from typing import Dict, Optional, Tuple
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Literal, Optional, Tuple, Union
 
-from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel, ConfigDict, Field
 
-from .query_classifier import QueryPlanner, OperationType
-from ..config.llm_config import LLMConfig, create_llm
+from .query_classifier import QueryPlanner, QueryPlan, OperationType, PLANNER_RULES
+from ..config.llm_config import LLMConfig, get_llm
+from shared.observability import record_tokens, stage
 
-class QueryAgent:
-    """Basic agent for processing natural language queries."""
-    
-    def __init__(self, config: Optional[LLMConfig] = None):
-        """Initialize the agent with a language model.
-        
-        Args:
-            config: Optional LLM configuration. If not provided, loads from environment.
-        """
-        self.config = config or LLMConfig.from_env()
-        self.planner = QueryPlanner(config=self.config)
-        self.llm = create_llm(self.config)
-        
-        # Create a chat prompt template with clear system and human messages
-        self.prompt = ChatPromptTemplate.from_messages([
-            SystemMessage(content="""You are a data operations assistant that provides detailed implementation instructions.
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
 
-CONTEXT:
-For the query: "{query}"
-Primary Operation: {primary_operation}
-Required Steps:
-{operations}
+logger = logging.getLogger(__name__)
 
-YOUR TASK:
+IMPLEMENTATION_GUIDELINES = """YOUR TASK:
 Provide specific, copy-pasteable code for each operation, following these guidelines:
 
 1. DATA_RETRIEVAL Operations:
@@ -77,12 +62,296 @@ RESPONSE FORMAT:
 For each operation, provide:
 1. A brief description of what the code does
 2. The complete, runnable code block
-3. Any important notes about dependencies or assumptions"""),
+3. Any important notes about dependencies or assumptions"""
+
+# Braces in the guideline code examples are escaped so the template only sees its own variables
+IMPLEMENTATION_SYSTEM_PROMPT = """You are a data operations assistant that provides detailed implementation instructions.
+
+CONTEXT:
+For the query: "{query}"
+Primary Operation: {primary_operation}
+Required Steps:
+{operations}
+
+""" + IMPLEMENTATION_GUIDELINES.replace("{", "{{").replace("}", "}}")
+
+SINGLE_CALL_SYSTEM_PROMPT = f"""You are a data operations assistant that plans data queries and provides detailed implementation instructions in a single answer.
+
+First, plan the query.
+{PLANNER_RULES}
+Then, implement every planned step.
+
+{IMPLEMENTATION_GUIDELINES}
+
+Return the plan together with the implementation."""
+
+class QueryResult(BaseModel):
+    """A query plan together with the implementation instructions for it."""
+    model_config = ConfigDict(extra='forbid')
+    
+    plan: QueryPlan = Field(
+        description="The execution plan for the query"
+    )
+    implementation: str = Field(
+        description="Implementation details with runnable code for each planned step"
+    )
+
+class StreamTimings(BaseModel):
+    """Latency measurements for a streamed query, in seconds from the start."""
+    plan_seconds: float = Field(
+        description="Time until the plan was available"
+    )
+    first_token_seconds: Optional[float] = Field(
+        default=None,
+        description="Time until the first answer token arrived"
+    )
+    total_seconds: float = Field(
+        description="Time until the answer was complete"
+    )
+    token_count: int = Field(
+        default=0,
+        description="Number of streamed chunks"
+    )
+
+class QueryStreamEvent(BaseModel):
+    """A single event emitted while streaming a query response."""
+    kind: Literal["plan", "token", "done"] = Field(
+        description="The plan, a piece of the answer, or the end of the stream"
+    )
+    plan: Optional[QueryPlan] = None
+    token: Optional[str] = None
+    timings: Optional[StreamTimings] = None
+
+def _response_text(response: Any) -> str:
+    """Extract the text from a chat message or plain LLM completion."""
+    return str(getattr(response, "content", response)).strip()
+
+class QueryAgent:
+    """Basic agent for processing natural language queries."""
+    
+    def __init__(
+        self,
+        config: Optional[LLMConfig] = None,
+        single_call: bool = False,
+        llm: Optional["BaseChatModel"] = None
+    ):
+        """Initialize the agent with a language model.
+        
+        Args:
+            config: Optional LLM configuration. If not provided, loads from environment.
+            single_call: Whether to plan and implement a query in one structured LLM call
+                when the planner cannot plan it locally
+            llm: Optional chat model used for planning and implementation instead of
+                ones built from the config
+        """
+        # Deferred so that importing this module stays cheap
+        from langchain_core.messages import SystemMessage, HumanMessage
+        from langchain_core.prompts import ChatPromptTemplate
+        
+        self.config = config or LLMConfig.from_env()
+        self.planner = QueryPlanner(config=self.config, llm=llm)
+        self.llm = llm if llm is not None else get_llm(self.config)
+        
+        # Create a chat prompt template with clear system and human messages
+        self.prompt = ChatPromptTemplate.from_messages([
+            ("system", IMPLEMENTATION_SYSTEM_PROMPT),
             HumanMessage(content="Please provide the implementation details for each operation.")
         ])
         
         # Create the response chain
         self.chain = self.prompt | self.llm
+        
+        # Create the combined plan-and-implement chain
+        self.single_call = single_call
+        self.single_call_chain = None
+        if single_call:
+            self.single_call_prompt = ChatPromptTemplate.from_messages([
+                SystemMessage(content=SINGLE_CALL_SYSTEM_PROMPT),
+                ("human", "{query}")
+            ])
+            try:
+                self.single_call_chain = (
+                    self.single_call_prompt
+                    | self.llm.with_structured_output(QueryResult, method="function_calling")
+                )
+            except NotImplementedError:
+                logger.info(
+                    "Structured output not supported by this model, using separate plan and implementation calls"
+                )
+                self.single_call = False
+    
+    @staticmethod
+    def _implementation_inputs(query: str, plan: QueryPlan) -> Dict[str, str]:
+        """Build the implementation prompt variables for a planned query."""
+        return {
+            "query": query,
+            "primary_operation": plan.primary_operation.value.upper(),
+            "operations": "\n".join(f"- {op.operation_type.value.upper()}: {op.description}" 
+                                    for op in plan.operations)
+        }
+    
+    async def process_query_with_plan(self, query: str) -> QueryResult:
+        """Process a natural language query and return its plan with the response.
+        
+        In single-call mode a query the planner cannot plan locally is planned and
+        implemented by one structured LLM call; otherwise planning and implementation
+        are separate steps.
+        
+        Each step is timed as a ``query_agent.*`` stage in ``shared.observability``.
+        
+        Args:
+            query: The user's natural language query
+            
+        Returns:
+            QueryResult: The plan and the implementation details
+        """
+        if self.single_call:
+            with stage("query_agent.plan") as span:
+                plan = self.planner.plan_locally(query)
+                span.set(cache_hit=plan is not None)
+            if plan is None:
+                with stage("query_agent.generation", single_call=True):
+                    result = await self.single_call_chain.ainvoke({"query": query})
+                if self.planner.cache is not None:
+                    self.planner.cache.put(query, result.plan)
+                return result
+        else:
+            # First plan the query operations
+            with stage("query_agent.plan"):
+                plan = await self.planner.plan(query)
+        
+        # Process the query with knowledge of all required operations
+        with stage("query_agent.generation"):
+            response = await self.chain.ainvoke(self._implementation_inputs(query, plan))
+            record_tokens(response)
+        with stage("query_agent.post_processing"):
+            return QueryResult(plan=plan, implementation=_response_text(response))
+    
+    async def process_queries_with_plan(
+        self,
+        queries: List[str],
+        max_concurrency: int = 8
+    ) -> List[Union[QueryResult, Exception]]:
+        """Process many natural language queries with bounded concurrency.
+        
+        Queries are planned concurrently, then all implementation calls go through
+        the chain's batch API so providers with native batching can use it.
+        
+        Args:
+            queries: The user's natural language queries
+            max_concurrency: Maximum number of LLM calls in flight
+            
+        Returns:
+            List with, in input order, the result for each query or the exception
+            that query raised
+        """
+        config = {"max_concurrency": max_concurrency}
+        results: List[Union[QueryResult, Exception, None]] = [None] * len(queries)
+        
+        if self.single_call:
+            plans = [self.planner.plan_locally(query) for query in queries]
+            pending = [index for index, plan in enumerate(plans) if plan is None]
+            if pending:
+                with stage("query_agent.generation", single_call=True, batch_size=len(pending)):
+                    combined = await self.single_call_chain.abatch(
+                        [{"query": queries[index]} for index in pending],
+                        config=config,
+                        return_exceptions=True
+                    )
+                for index, result in zip(pending, combined):
+                    results[index] = result
+                    if isinstance(result, QueryResult) and self.planner.cache is not None:
+                        self.planner.cache.put(queries[index], result.plan)
+        else:
+            semaphore = asyncio.Semaphore(max_concurrency)
+            
+            async def plan_one(query: str) -> QueryPlan:
+                async with semaphore:
+                    with stage("query_agent.plan"):
+                        return await self.planner.plan(query)
+            
+            plans = await asyncio.gather(
+                *(plan_one(query) for query in queries), return_exceptions=True
+            )
+            for index, plan in enumerate(plans):
+                if isinstance(plan, Exception):
+                    results[index] = plan
+        
+        planned = [index for index, plan in enumerate(plans) if isinstance(plan, QueryPlan)]
+        responses = []
+        if planned:
+            with stage("query_agent.generation", batch_size=len(planned)):
+                responses = await self.chain.abatch(
+                    [self._implementation_inputs(queries[index], plans[index]) for index in planned],
+                    config=config,
+                    return_exceptions=True
+                )
+                record_tokens(*responses)
+        with stage("query_agent.post_processing", batch_size=len(planned)):
+            for index, response in zip(planned, responses):
+                if isinstance(response, Exception):
+                    results[index] = response
+                else:
+                    results[index] = QueryResult(
+                        plan=plans[index], implementation=_response_text(response)
+                    )
+        return results
+    
+    async def process_queries(self, queries: List[str], max_concurrency: int = 8) -> List[str]:
+        """Process many natural language queries with bounded concurrency.
+        
+        Args:
+            queries: The user's natural language queries
+            max_concurrency: Maximum number of LLM calls in flight
+            
+        Returns:
+            List[str]: The agent's responses in input order; failed queries get an
+            error message like process_query returns
+        """
+        results = await self.process_queries_with_plan(queries, max_concurrency)
+        return [
+            result.implementation if isinstance(result, QueryResult)
+            else f"Error processing query: {str(result)}"
+            for result in results
+        ]
+    
+    async def astream_query(self, query: str) -> AsyncIterator[QueryStreamEvent]:
+        """Stream the response to a natural language query.
+        
+        Yields a "plan" event as soon as the plan is known, a "token" event for
+        each chunk of the answer as it arrives, and a final "done" event carrying
+        the time-to-plan and time-to-first-token measurements.
+        
+        Args:
+            query: The user's natural language query
+            
+        Yields:
+            QueryStreamEvent: The plan, answer tokens and final timings
+        """
+        start = time.perf_counter()
+        with stage("query_agent.plan"):
+            plan = await self.planner.plan(query)
+        plan_seconds = time.perf_counter() - start
+        yield QueryStreamEvent(kind="plan", plan=plan)
+        
+        first_token_seconds = None
+        token_count = 0
+        async for chunk in self.chain.astream(self._implementation_inputs(query, plan)):
+            token = str(getattr(chunk, "content", chunk))
+            if not token:
+                continue
+            if first_token_seconds is None:
+                first_token_seconds = time.perf_counter() - start
+            token_count += 1
+            yield QueryStreamEvent(kind="token", token=token)
+        
+        timings = StreamTimings(
+            plan_seconds=plan_seconds,
+            first_token_seconds=first_token_seconds,
+            total_seconds=time.perf_counter() - start,
+            token_count=token_count
+        )
+        yield QueryStreamEvent(kind="done", timings=timings)
     
     async def process_query(self, query: str) -> str:
         """Process a natural language query.
@@ -94,17 +363,8 @@ For each operation, provide:
             str: The agent's response
         """
         try:
-            # First plan the query operations
-            plan = await self.planner.plan(query)
-            
-            # Process the query with knowledge of all required operations
-            response = await self.chain.ainvoke({
-                "query": query,
-                "primary_operation": plan.primary_operation.value.upper(),
-                "operations": "\n".join(f"- {op.operation_type.value.upper()}: {op.description}" 
-                                      for op in plan.operations)
-            })
-            return str(response).strip()
+            result = await self.process_query_with_plan(query)
+            return result.implementation
         except Exception as e:
             print(f"Error processing query: {str(e)}")
-            return f"Error processing query: {str(e)}" 
\ No newline at end of file
+            return f"Error processing query: {str(e)}"
@@ -0,0 +1,208 @@
+"""
+Index over curated question/SQL examples for direct serving and few-shot selection.
+"""
+import heapq
+import math
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from pydantic import BaseModel, Field
+
+from .examples import EXAMPLE_QUERIES
+from .plan_cache import normalize_query
+from ..db.schema_index import tokenize
+
+# Posting lists at most this long always generate candidates, however many examples exist
+MIN_CANDIDATE_POSTINGS = 64
+
+# Words that invert a question's meaning; "t" is what normalization leaves of "n't"
+NEGATIONS = frozenset({"not", "no", "except", "without", "excluding", "exclude", "t"})
+
+# Words a rephrasing may add or drop without changing what the SQL has to return
+FILLER_WORDS = frozenset({
+    "a", "an", "the", "me", "us", "i", "we", "you", "please", "can", "could", "would",
+    "want", "to", "give", "show", "list", "get", "display", "find", "fetch", "return",
+    "what", "which", "is", "are", "of", "all", "every", "each",
+})
+
+class ExampleQuery(BaseModel):
+    """A vetted natural language question and the SQL answering it."""
+    question: str = Field(
+        description="The natural language question"
+    )
+    query: str = Field(
+        description="SQL answering the question"
+    )
+    expected_columns: List[str] = Field(
+        default_factory=list,
+        description="Columns the query returns"
+    )
+
+class ExampleMatch(BaseModel):
+    """An example and its similarity to a question."""
+    example: ExampleQuery
+    score: float = Field(
+        description="Cosine similarity between 0 and 1"
+    )
+
+def _terms(normalized: str) -> Set[str]:
+    """Search terms of a normalized question, with plain words singularized."""
+    return {tokenize(word)[0] if word.isalpha() else word for word in normalized.split()}
+
+def _literals(tokens: Iterable[str]) -> Set[str]:
+    """Tokens that change a question's meaning, such as numbers and relative dates."""
+    return {token for token in tokens if any(char.isdigit() for char in token) or token.startswith("this_")}
+
+class ExampleIndex:
+    """Finds curated examples by exact and fuzzy question match.
+
+    Questions are normalized like plan cache keys, so exact lookups are a dict
+    access. Fuzzy lookups use IDF-weighted cosine similarity, scoring only the
+    examples that share one of the question's rarer tokens through an inverted
+    index; that keeps lookups under a millisecond for thousands of examples.
+    A fuzzy match is served directly only above ``near_exact_threshold``, when
+    the question's numbers and date phrases are the same as the example's and
+    when the question adds no negation or other meaningful words.
+    """
+
+    def __init__(self, examples: Iterable[ExampleQuery] = (), near_exact_threshold: float = 0.9):
+        """Initialize the index.
+
+        Args:
+            examples: Examples to index
+            near_exact_threshold: Lowest similarity at which an example's SQL is
+                served without calling the LLM
+        """
+        self.near_exact_threshold = near_exact_threshold
+        self._examples: List[ExampleQuery] = []
+        self._tokens: List[Set[str]] = []
+        self._exact: Dict[str, int] = {}
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        self._norms: Optional[List[float]] = None
+        self._lock = threading.Lock()
+        for example in examples:
+            self.add(example)
+
+    @classmethod
+    def from_dict(cls, examples: Optional[Dict[str, Dict[str, Any]]] = None, **kwargs: Any) -> "ExampleIndex":
+        """Build an index from a mapping shaped like ``EXAMPLE_QUERIES``.
+
+        Args:
+            examples: Question to ``{"query": ..., "expected_columns": ...}`` mapping;
+                defaults to ``EXAMPLE_QUERIES``
+            **kwargs: Passed on to the constructor
+
+        Returns:
+            ExampleIndex: The index
+        """
+        examples = EXAMPLE_QUERIES if examples is None else examples
+        return cls(
+            (
+                ExampleQuery(
+                    question=question,
+                    query=" ".join(entry["query"].split()),
+                    expected_columns=entry.get("expected_columns", [])
+                )
+                for question, entry in examples.items()
+            ),
+            **kwargs
+        )
+
+    def add(self, example: ExampleQuery) -> None:
+        """Add an example, replacing any with the same normalized question."""
+        key = normalize_query(example.question)
+        tokens = _terms(key)
+        with self._lock:
+            if key in self._exact:
+                self._examples[self._exact[key]] = example
+                return
+            position = len(self._examples)
+            self._examples.append(example)
+            self._tokens.append(tokens)
+            self._exact[key] = position
+            for token in tokens:
+                self._postings[token].append(position)
+            # Document frequencies changed, so every norm is stale
+            self._norms = None
+
+    def __len__(self) -> int:
+        return len(self._examples)
+
+    def _idf(self, token: str) -> float:
+        return math.log(1 + len(self._examples) / len(self._postings[token]))
+
+    def _example_norms(self) -> List[float]:
+        if self._norms is None:
+            self._norms = [
+                math.sqrt(sum(self._idf(token) ** 2 for token in tokens)) or 1.0
+                for tokens in self._tokens
+            ]
+        return self._norms
+
+    def search(self, question: str, top_k: int = 3) -> List[ExampleMatch]:
+        """Find the examples most similar to a question.
+
+        Args:
+            question: The natural language question
+            top_k: Maximum number of examples to return
+
+        Returns:
+            List[ExampleMatch]: Matches with a positive score, best first
+        """
+        tokens = _terms(normalize_query(question))
+        with self._lock:
+            known = [token for token in tokens if token in self._postings]
+            if not known:
+                return []
+            norms = self._example_norms()
+            weights = {token: self._idf(token) ** 2 for token in known}
+            # Words no example uses still count against the similarity
+            unseen = (len(tokens) - len(known)) * math.log(1 + len(self._examples)) ** 2
+            query_norm = math.sqrt(sum(weights.values()) + unseen)
+
+            # Candidates come from the rarer tokens only; an example sharing just
+            # common words like "show" or "the" could not score well anyway
+            known.sort(key=lambda token: len(self._postings[token]))
+            limit = max(MIN_CANDIDATE_POSTINGS, len(self._examples) // 20)
+            rare = [token for token in known if len(self._postings[token]) <= limit] or known[:1]
+            candidates = set().union(*(self._postings[token] for token in rare))
+
+            scored = []
+            for position in candidates:
+                example_tokens = self._tokens[position]
+                dot = sum(weight for token, weight in weights.items() if token in example_tokens)
+                scored.append((dot / (norms[position] * query_norm), position))
+            best = heapq.nsmallest(top_k, scored, key=lambda item: (-item[0], item[1]))
+            return [
+                ExampleMatch(example=self._examples[position], score=min(score, 1.0))
+                for score, position in best
+            ]
+
+    def match(self, question: str) -> Optional[ExampleQuery]:
+        """Find an example whose SQL can answer the question as is.
+
+        Args:
+            question: The natural language question
+
+        Returns:
+            Optional[ExampleQuery]: The exact or near-exact example, if any
+        """
+        key = normalize_query(question)
+        with self._lock:
+            position = self._exact.get(key)
+            if position is not None:
+                return self._examples[position]
+
+        matches = self.search(question, top_k=1)
+        if not matches or matches[0].score < self.near_exact_threshold:
+            return None
+        candidate = matches[0].example
+        candidate_key = normalize_query(candidate.question)
+        if _literals(key.split()) != _literals(candidate_key.split()):
+            return None
+        # Similarity ignores words like "not"; words added or dropped could change the answer
+        changed = _terms(key) ^ _terms(candidate_key)
+        if changed & NEGATIONS or changed - FILLER_WORDS:
+            return None
+        return candidate
@@ -0,0 +1,155 @@
+"""
+Cache for query plans keyed on a normalized form of the query text.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+from .query_classifier import QueryPlan
+from ..utils.cache import CacheStats, SQLiteStore
+
+_NUMBER_WORDS = {
+    "one": "1", "two": "2", "three": "3", "four": "4", "five": "5", "six": "6",
+    "seven": "7", "eight": "8", "nine": "9", "ten": "10", "eleven": "11", "twelve": "12",
+}
+
+_PERIOD = r"(day|week|month|quarter|year)s?"
+
+# Relative date phrases rewritten to a single canonical token, applied in order
+_RELATIVE_DATES = [
+    (re.compile(rf"\b(?:the )?(?:last|previous|past|prior) (\d+) {_PERIOD}\b"), r"last_\1_\2"),
+    (re.compile(rf"\b(?:the )?(?:last|previous|past|prior) {_PERIOD}\b"), r"last_1_\1"),
+    (re.compile(rf"\b(?:the )?(?:this|current) {_PERIOD}\b"), r"this_\1"),
+    (re.compile(r"\byear to date\b|\bytd\b"), "this_year"),
+    (re.compile(r"\byesterday\b"), "last_1_day"),
+    (re.compile(r"\btoday\b"), "this_day"),
+]
+
+def normalize_query(query: str) -> str:
+    """Normalize a query so that trivially different phrasings share a cache key.
+
+    The query is case-folded, punctuation is stripped, whitespace is collapsed and
+    relative date phrases ("the previous month", "last 3 months") are rewritten to
+    canonical tokens ("last_1_month", "last_3_month").
+
+    Args:
+        query: The user's natural language query
+
+    Returns:
+        str: The normalized query
+    """
+    text = query.casefold()
+    text = re.sub(r"[^\w\s]", " ", text)
+    words = [_NUMBER_WORDS.get(word, word) for word in text.split()]
+    text = " ".join(words)
+    for pattern, replacement in _RELATIVE_DATES:
+        text = pattern.sub(replacement, text)
+    return text
+
+class PlanCache:
+    """In-memory LRU cache of query plans with an optional on-disk TTL store.
+
+    Lookups check memory first, then the SQLite file at ``path`` if one was given.
+    Entries older than ``ttl_seconds`` are treated as misses and removed.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl_seconds: Optional[float] = None,
+        path: Optional[Union[str, Path]] = None
+    ):
+        """Initialize the cache.
+
+        Args:
+            max_size: Maximum number of plans kept in memory
+            ttl_seconds: Optional lifetime of an entry; None keeps entries forever
+            path: Optional SQLite file used to persist plans across processes
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.path = Path(path) if path else None
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, Tuple[QueryPlan, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._store = SQLiteStore(self.path, table="plans") if self.path else None
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, plan: QueryPlan, created_at: float) -> None:
+        self._entries[key] = (plan, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def get(self, query: str) -> Optional[QueryPlan]:
+        """Look up the cached plan for a query.
+
+        Args:
+            query: The user's natural language query
+
+        Returns:
+            Optional[QueryPlan]: The cached plan, or None on a miss
+        """
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                plan, created_at = entry
+                if not self._expired(created_at):
+                    self._entries.move_to_end(key)
+                    self.stats.hits += 1
+                    return plan
+                del self._entries[key]
+                self.stats.expirations += 1
+
+            if self._store is not None:
+                row = self._store.get(key)
+                if row is not None:
+                    if not self._expired(row[1]):
+                        plan = QueryPlan.model_validate_json(row[0])
+                        self._remember(key, plan, row[1])
+                        self.stats.hits += 1
+                        self.stats.disk_hits += 1
+                        return plan
+                    self._store.delete(key)
+                    self.stats.expirations += 1
+
+            self.stats.misses += 1
+            return None
+
+    def put(self, query: str, plan: QueryPlan) -> None:
+        """Store the plan for a query.
+
+        Args:
+            query: The user's natural language query
+            plan: The plan to cache
+        """
+        key = normalize_query(query)
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, plan, created_at)
+            if self._store is not None:
+                self._store.put(key, plan.model_dump_json(), created_at)
+
+    def clear(self) -> None:
+        """Remove every entry from memory and disk."""
+        with self._lock:
+            self._entries.clear()
+            if self._store is not None:
+                self._store.clear()
+
+    def close(self) -> None:
+        """Close the on-disk store, if any."""
+        with self._lock:
+            if self._store is not None:
+                self._store.close()
+                self._store = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
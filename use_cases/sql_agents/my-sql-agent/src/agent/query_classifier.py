@@ -1,16 +1,19 @@
 """
 Query planning module to determine the sequence of operations needed for a query.
 """
+import re
 from enum import Enum
-from typing import List, Optional, Dict, Literal
+from typing import TYPE_CHECKING, List, Optional, Dict, Literal
 from pydantic import BaseModel, Field, ConfigDict
 
-from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
-from langchain_openai import ChatOpenAI
 
-from ..config.llm_config import LLMConfig, create_llm, OpenAISettings
+from ..config.llm_config import LLMConfig, get_llm, resolve_api_key, OpenAISettings
+from shared.observability import annotate, record_tokens
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+    from langchain_core.prompts import ChatPromptTemplate
+    from .plan_cache import PlanCache
 
 class OperationType(str, Enum):
     """Types of operations that can be performed on data."""
@@ -45,11 +48,147 @@ class QueryPlan(BaseModel):
         description="Ordered list of steps needed"
     )
 
-def create_planner_prompt() -> ChatPromptTemplate:
-    """Create the prompt template for query planning."""
-    system_message = """You are a query planner that classifies and breaks down data operations into steps.
+class RuleMatch(BaseModel):
+    """Result of classifying a query with the local planning rules."""
+    plan: QueryPlan = Field(
+        description="The plan produced by the rules"
+    )
+    confidence: float = Field(
+        ge=0.0, le=1.0,
+        description="How unambiguously the rules applied to the query"
+    )
+    matched_operations: List[OperationType] = Field(
+        default_factory=list,
+        description="Every operation type whose rule fired"
+    )
+
+# Leading words that make a query a data retrieval (rule 1 of the planner prompt)
+RETRIEVAL_VERBS = frozenset({"show", "get", "fetch", "list", "display"})
+
+# Keywords that make a query a data analysis (rule 2 of the planner prompt)
+ANALYSIS_KEYWORDS = frozenset({
+    "average", "averages", "mean", "sum", "sums", "total", "totals",
+    "calculate", "calculates", "calculation",
+})
+
+# Keywords that make a query a data visualization (rule 3 of the planner prompt)
+VISUALIZATION_KEYWORDS = frozenset({
+    "chart", "charts", "plot", "plots", "plotting", "graph", "graphs",
+    "visualize", "visualise", "visualization", "visualisation",
+})
+
+# Words mapped onto the canonical field names required by the planner prompt
+FIELD_ALIASES: Dict[str, str] = {
+    "sales": "sales_amount",
+    "sale": "sales_amount",
+    "amount": "sales_amount",
+    "amounts": "sales_amount",
+    "customer": "customer_id",
+    "customers": "customer_id",
+    "revenue": "revenue",
+    "revenues": "revenue",
+    "earnings": "revenue",
+    "income": "revenue",
+    "date": "date",
+    "dates": "date",
+    "time": "date",
+    "period": "date",
+    "day": "date",
+    "daily": "date",
+    "week": "date",
+    "weekly": "date",
+    "month": "date",
+    "monthly": "date",
+    "year": "date",
+    "yearly": "date",
+}
+
+# Filler words skipped when looking for the leading verb
+_LEADING_FILLERS = frozenset({"please", "can", "could", "you", "me"})
+
+# Step shapes required by the planner prompt, keyed by primary operation
+_STEP_SEQUENCES: Dict[OperationType, List[OperationType]] = {
+    OperationType.DATA_RETRIEVAL: [OperationType.DATA_RETRIEVAL],
+    OperationType.DATA_ANALYSIS: [OperationType.DATA_RETRIEVAL, OperationType.DATA_ANALYSIS],
+    OperationType.DATA_VISUALIZATION: [OperationType.DATA_RETRIEVAL, OperationType.DATA_VISUALIZATION],
+}
+
+_STEP_DESCRIPTIONS: Dict[OperationType, str] = {
+    OperationType.DATA_RETRIEVAL: "Retrieve the data needed for: {query}",
+    OperationType.DATA_ANALYSIS: "Analyze the retrieved data to answer: {query}",
+    OperationType.DATA_VISUALIZATION: "Visualize the retrieved data for: {query}",
+}
+
+def _tokenize(query: str) -> List[str]:
+    """Split a query into lowercase word tokens."""
+    return re.findall(r"[a-z0-9_]+", query.lower())
+
+def match_rules(query: str) -> RuleMatch:
+    """Classify a query with the deterministic rules from the planner prompt.
+    
+    The confidence is 1.0 when exactly one operation rule fires and at least one
+    known field is mentioned. It drops when several rules fire (the prompt does not
+    say which wins), when no field can be recognised, and is 0.0 when no rule fires.
+    
+    Args:
+        query: The user's natural language query
+        
+    Returns:
+        RuleMatch: The rule-derived plan and its confidence
+    """
+    tokens = _tokenize(query)
+    
+    leading = next((t for t in tokens if t not in _LEADING_FILLERS), None)
+    matched: List[OperationType] = []
+    if leading in RETRIEVAL_VERBS:
+        matched.append(OperationType.DATA_RETRIEVAL)
+    if any(t in ANALYSIS_KEYWORDS for t in tokens):
+        matched.append(OperationType.DATA_ANALYSIS)
+    if any(t in VISUALIZATION_KEYWORDS for t in tokens):
+        matched.append(OperationType.DATA_VISUALIZATION)
+    
+    fields: List[str] = []
+    for token in tokens:
+        field = FIELD_ALIASES.get(token)
+        if field and field not in fields:
+            fields.append(field)
+    
+    if not matched:
+        return RuleMatch(
+            plan=QueryPlan(
+                primary_operation=OperationType.UNKNOWN,
+                operations=[QueryStep(
+                    operation_type=OperationType.UNKNOWN,
+                    description="No planning rule matched the query"
+                )]
+            ),
+            confidence=0.0
+        )
+    
+    # The most specific operation wins when several rules fire, at reduced confidence
+    primary = matched[-1]
+    confidence = 1.0
+    if len(matched) > 1:
+        confidence -= 0.4
+    if not fields:
+        confidence -= 0.3
+    
+    operations = [
+        QueryStep(
+            operation_type=op,
+            description=_STEP_DESCRIPTIONS[op].format(query=query.strip()),
+            required_fields=list(fields) or None
+        )
+        for op in _STEP_SEQUENCES[primary]
+    ]
+    return RuleMatch(
+        plan=QueryPlan(primary_operation=primary, operations=operations),
+        confidence=round(confidence, 2),
+        matched_operations=matched
+    )
 
-CRITICAL: You MUST follow these rules EXACTLY for operation type selection:
+# Planning rules shared by the planner prompt and the single-call agent prompt
+PLANNER_RULES = """CRITICAL: You MUST follow these rules EXACTLY for operation type selection:
 
 1. IF query STARTS WITH any of these words:
    - "show"
@@ -97,23 +236,45 @@ CRITICAL: You MUST follow these rules EXACTLY for step sequences:
    - EXACTLY TWO steps in this order:
      Step 1: type "data_retrieval"
      Step 2: type "data_visualization"
+"""
 
-Analyze this query following the above rules EXACTLY: {query}"""
+def create_planner_prompt() -> "ChatPromptTemplate":
+    """Create the prompt template for query planning."""
+    from langchain_core.prompts import ChatPromptTemplate
+    
+    system_message = f"""You are a query planner that classifies and breaks down data operations into steps.
+
+{PLANNER_RULES}
+Analyze this query following the above rules EXACTLY: {{query}}"""
     
     return ChatPromptTemplate.from_messages([
-        SystemMessage(content=system_message)
+        ("system", system_message)
     ])
 
 class QueryPlanner:
     """Plans the execution of natural language queries by breaking them into ordered steps."""
 
-    def __init__(self, config: Optional[LLMConfig] = None):
+    def __init__(
+        self,
+        config: Optional[LLMConfig] = None,
+        use_rules: bool = True,
+        min_rule_confidence: float = 0.75,
+        cache: Optional["PlanCache"] = None,
+        llm: Optional["BaseChatModel"] = None
+    ):
         """Initialize the planner with a language model.
         
         Args:
             config: Optional LLM configuration. If not provided, loads from environment.
+            use_rules: Whether to try the local planning rules before calling the LLM
+            min_rule_confidence: Minimum rule confidence needed to skip the LLM
+            cache: Optional plan cache consulted before calling the LLM
+            llm: Optional chat model used instead of one built from the config
         """
         self.config = config or LLMConfig.from_env()
+        self.use_rules = use_rules
+        self.min_rule_confidence = min_rule_confidence
+        self.cache = cache
         
         # Define the function schema for query planning
         self.planning_function = {
@@ -168,12 +329,13 @@ class QueryPlanner:
             }
         }
         
-        # Create LLM with function calling
-        if isinstance(self.config.settings, OpenAISettings):
-            self.llm = ChatOpenAI(
-                model_name=self.config.settings.model_name,
+        # Create LLM with function calling; instances are shared between planners
+        if llm is not None:
+            self.llm = llm
+        elif isinstance(self.config.settings, OpenAISettings):
+            self.llm = get_llm(
+                resolve_api_key(self.config),
                 temperature=0.0,  # Force deterministic output
-                openai_api_key=self.config.settings.api_key,
                 model_kwargs={
                     "functions": [self.planning_function],
                     "function_call": {"name": "plan_query"}
@@ -181,7 +343,7 @@ class QueryPlanner:
             )
         else:
             # Fallback to regular LLM for non-OpenAI models
-            self.llm = create_llm(self.config)
+            self.llm = get_llm(self.config)
         
         # Create planning chain
         self.prompt = create_planner_prompt()
@@ -261,6 +423,25 @@ class QueryPlanner:
                 ]
             )
     
+    def plan_locally(self, query: str) -> Optional[QueryPlan]:
+        """Plan a query without calling the LLM, if possible.
+        
+        Args:
+            query: The user's natural language query
+            
+        Returns:
+            Optional[QueryPlan]: A confident rule-based or cached plan, or None
+        """
+        # Unambiguous queries are planned locally without an LLM round trip
+        if self.use_rules:
+            match = match_rules(query)
+            if match.confidence >= self.min_rule_confidence:
+                return match.plan
+        
+        if self.cache is not None:
+            return self.cache.get(query)
+        return None
+    
     async def plan(self, query: str) -> QueryPlan:
         """Create an execution plan for a natural language query.
         
@@ -270,17 +451,29 @@ class QueryPlanner:
         Returns:
             QueryPlan: Complete execution plan for the query
         """
+        local_plan = self.plan_locally(query)
+        # Marks the caller's plan stage, if it is timing one
+        annotate(cache_hit=local_plan is not None)
+        if local_plan is not None:
+            return local_plan
+        
         try:
             # Get response from LLM
             response = await self.chain.ainvoke({"query": query})
+            record_tokens(response)
             
             if hasattr(response, "additional_kwargs") and "function_call" in response.additional_kwargs:
                 # Parse function call response
                 result = response.additional_kwargs["function_call"]["arguments"]
-                return QueryPlan.model_validate_json(result)
+                plan = QueryPlan.model_validate_json(result)
             else:
                 # Fallback to text parsing for non-OpenAI models
-                return self._parse_response(str(response))
+                plan = self._parse_response(str(response))
+            
+            # Only successful plans are worth reusing
+            if self.cache is not None and plan.primary_operation != OperationType.UNKNOWN:
+                self.cache.put(query, plan)
+            return plan
                 
         except Exception as e:
             print(f"Error planning query: {str(e)}")
@@ -1,18 +1,28 @@
 """
 SQL query generation and execution agent using LangChain patterns.
 """
-from typing import Optional, Dict, List, Any, Union
+import asyncio
+import json
+from typing import TYPE_CHECKING, AsyncIterator, Literal, Optional, Dict, Iterator, List, Any, Tuple, Union
 from typing_extensions import Annotated, TypedDict
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_core.language_models import BaseLanguageModel
-from langchain_community.utilities import SQLDatabase
-from langchain_openai import ChatOpenAI
-from langchain import hub
-from datetime import datetime
+from pydantic import BaseModel, ConfigDict, Field
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
+from contextlib import asynccontextmanager, contextmanager
+from sqlalchemy import Connection, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
 
-from ..db.config import engine
-from ..config.llm_config import LLMConfig
+from ..db.columnar import ColumnarResult
+from .example_index import ExampleIndex
+from .sql_cache import GeneratedSQL, SQLCache
+from ..db.result_cache import ResultCache
+from ..db.schema_cache import SchemaCache, SchemaSnapshot
+from ..config.llm_config import LLMConfig, get_llm, resolve_api_key
+from shared.observability import annotate, record_tokens, stage
+
+if TYPE_CHECKING:
+    from langchain_community.utilities import SQLDatabase
+    from langchain_core.language_models import BaseLanguageModel
+    from shared.db.guard import QueryGuard
 
 SQL_AGENT_SYSTEM_PROMPT = """You are a helpful SQL assistant that translates natural language questions into SQL queries.
 
@@ -43,21 +53,59 @@ class QueryOutput(TypedDict):
     query: Annotated[str, "Syntactically valid SQL query that starts with SELECT"]
     parameters: Annotated[List[Any], "List of parameters for the query"]
 
+class SQLStreamEvent(BaseModel):
+    """A single event emitted while streaming a query's rows."""
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    kind: Literal["rows", "done"] = Field(
+        description="A batch of rows, or the end of the stream"
+    )
+    rows: Optional[ColumnarResult] = None
+    row_count: int = Field(
+        default=0, description="Rows in the batch, or in the whole stream when done"
+    )
+    truncated: bool = Field(
+        default=False, description="Whether the stream stopped before the last row"
+    )
+
 class SQLQueryAgent:
     """Agent for translating natural language to SQL queries."""
     
-    def __init__(self, llm: BaseLanguageModel | LLMConfig, db: SQLDatabase):
+    def __init__(
+        self,
+        llm: Union["BaseLanguageModel", LLMConfig],
+        db: "SQLDatabase",
+        schema_cache: Optional[SchemaCache] = None,
+        schema_top_k: Optional[int] = 8,
+        result_cache: Optional[ResultCache] = None,
+        sql_cache: Optional[SQLCache] = None,
+        async_engine: Optional[AsyncEngine] = None,
+        guard: Optional["QueryGuard"] = None,
+        examples: Optional[ExampleIndex] = None,
+        few_shot_k: int = 3
+    ):
         """Initialize the agent.
         
         Args:
             llm: Language model to use
             db: Database to query
+            schema_cache: Optional schema cache; one is created for db if not provided
+            schema_top_k: Number of most relevant tables (plus their foreign key
+                neighbours) described in each prompt; None always sends every table
+            result_cache: Optional cache of result sets for repeated SQL
+            sql_cache: Optional cache of SQL generated for repeated questions
+            async_engine: Optional async engine for the same database; generated
+                queries then run on it instead of on worker threads
+            guard: Optional pre-execution check that limits, plans and rejects
+                generated queries and runs them read-only with a timeout
+            examples: Optional index of vetted question/SQL pairs; near-exact
+                matches are served without the LLM, the rest get similar
+                examples as few-shots
+            few_shot_k: Number of similar examples included in each prompt
         """
         if isinstance(llm, LLMConfig):
-            self.llm = ChatOpenAI(
-                model=llm.settings.model_name,
-                temperature=llm.settings.temperature,
-                api_key=llm.settings.api_key,
+            self.llm = get_llm(
+                resolve_api_key(llm),
                 model_kwargs={
                     "functions": [{
                         "name": "generate_sql",
@@ -84,64 +132,439 @@ class SQLQueryAgent:
             self.llm = llm
             
         self.db = db
+        self.schema_cache = schema_cache or SchemaCache(db)
+        self.schema_top_k = schema_top_k
+        self.result_cache = result_cache
+        self.sql_cache = sql_cache
+        self.async_engine = async_engine
+        self.guard = guard
+        self.examples = examples
+        self.few_shot_k = few_shot_k
+        
+    def get_table_info(
+        self,
+        query_text: Optional[str] = None,
+        schema: Optional[SchemaSnapshot] = None
+    ) -> str:
+        """Get information about tables in the database.
+        
+        Args:
+            query_text: Optional question used to keep only the relevant tables
+            schema: Snapshot already taken for the question; probed if omitted
+        """
+        if schema is None:
+            schema = self._schema()
+        if query_text is None or schema.index is None or len(schema.table_info) <= self.schema_top_k:
+            return schema.get_table_info()
+        return schema.get_table_info(schema.index.select(query_text, self.schema_top_k))
+    
+    def _schema(self) -> SchemaSnapshot:
+        """Probe the catalog once, with the relevance index if tables are selected."""
+        return self.schema_cache.snapshot(with_index=self.schema_top_k is not None)
+    
+    def prewarm(self) -> None:
+        """Build the schema cache ahead of the first question."""
+        self.schema_cache.prewarm()
         
-    def get_table_info(self) -> str:
-        """Get information about tables in the database."""
-        return self.db.get_table_info()
+    def _check_question(self, query_text: str) -> None:
+        """Reject questions that ask for modifying statements.
         
-    async def run(self, query_text: str) -> List[Dict[str, Any]]:
-        """Run a natural language query against the database."""
-        # First check if the input query contains any unsafe keywords
+        Raises:
+            ValueError: If the question contains an unsafe keyword
+        """
         query_upper = query_text.upper()
         if any(keyword in query_upper for keyword in 
             ["INSERT", "UPDATE", "DELETE", "DROP", "CREATE", "ALTER", "TRUNCATE"]
         ):
             raise ValueError("Only SELECT queries are allowed")
-            
-        # Get table info for context
-        table_info = self.get_table_info()
-
-        # Create messages for the chat
-        messages = [
+    
+    def _few_shots(self, query_text: str) -> str:
+        """Format the examples most similar to a question for the prompt."""
+        if self.examples is None or self.few_shot_k <= 0:
+            return ""
+        matches = self.examples.search(query_text, top_k=self.few_shot_k)
+        if not matches:
+            return ""
+        shots = "\n\n".join(
+            f"Question: {match.example.question}\nSQL: {match.example.query}" for match in matches
+        )
+        return f"Vetted examples of similar questions:\n{shots}\n\n"
+    
+    def _build_messages(self, query_text: str, table_info: str) -> List[BaseMessage]:
+        """Build the chat messages asking the LLM to write SQL for a question."""
+        return [
             SystemMessage(content=SQL_AGENT_SYSTEM_PROMPT),
             HumanMessage(content=f"""
             Given the following SQL tables:
             {table_info}
             
-            Create a SQL query to answer this question: {query_text}
+            {self._few_shots(query_text)}Create a SQL query to answer this question: {query_text}
             """)
         ]
-
-        # Get response from LLM
-        response = await self.llm.ainvoke(messages)
-        print(f"LLM Response: {response}")  # Debug logging
+    
+    def _parse_response(self, response: Any) -> Tuple[str, Dict[str, Any]]:
+        """Extract the SQL query and its parameters from an LLM response.
         
+        Raises:
+            ValueError: If the generated query is not a SELECT
+        """
         # Extract query from function call response
         if hasattr(response, "additional_kwargs") and "function_call" in response.additional_kwargs:
             # Parse function call response
-            function_args = eval(response.additional_kwargs["function_call"]["arguments"])
+            function_args = json.loads(response.additional_kwargs["function_call"]["arguments"])
             query = function_args["query"]
-            parameters = function_args.get("parameters", {})
+            parameters = function_args.get("parameters") or {}
         else:
             # Fallback to direct response
-            query = response.content
+            query = getattr(response, "content", response)
             parameters = {}
 
         # Validate generated query is SELECT only
         if not query.strip().upper().startswith("SELECT"):
             raise ValueError("Only SELECT queries are allowed")
-
-        # Execute query
-        result = self.db._execute(
-            command=query,
-            parameters=parameters,
-            fetch="all"
+        return query, parameters
+    
+    def _execute(self, query: str, parameters: Dict[str, Any]) -> ColumnarResult:
+        """Execute a generated query, or serve it from the result cache."""
+        if self.result_cache is None:
+            return self._fetch(query, parameters)
+        return self.result_cache.get_or_execute(
+            query, parameters, lambda: self._fetch(query, parameters)
+        )
+    
+    @contextmanager
+    def _connect(self) -> Iterator[Connection]:
+        """Open a connection with the database's schema on the search path."""
+        with self.db._engine.connect() as conn:
+            if self.db._schema is not None and self.db.dialect == "postgresql":
+                conn.exec_driver_sql("SET search_path TO %s", (self.db._schema,))
+            yield conn
+    
+    def _guarded(
+        self,
+        conn: Connection,
+        query: str,
+        parameters: Dict[str, Any],
+        stream: bool = False
+    ) -> str:
+        """Check a query with the guard, if any, and return the SQL to run on conn.
+        
+        Streamed queries get no default LIMIT; ``astream`` applies its own caps.
+        
+        Raises:
+            QueryRejected: If the guard rejects the query
+        """
+        if self.guard is None:
+            return query
+        return self.guard.prepare(conn, query, parameters, stream=stream).query
+    
+    def _fetch(self, query: str, parameters: Dict[str, Any]) -> ColumnarResult:
+        """Execute a generated query and return its rows column by column."""
+        # Reaching the database means the result cache, if any, missed
+        annotate(cache_hit=False)
+        with self._connect() as conn:
+            query = self._guarded(conn, query, parameters)
+            result = conn.execute(text(query), parameters)
+            return ColumnarResult.from_rows(list(result.keys()), result.fetchall())
+    
+    @asynccontextmanager
+    async def _aconnect(self) -> AsyncIterator[AsyncConnection]:
+        """Open an async connection with the database's schema on the search path."""
+        async with self.async_engine.connect() as conn:
+            if self.db._schema is not None and self.db.dialect == "postgresql":
+                await conn.execute(
+                    text("SELECT set_config('search_path', :schema, false)"),
+                    {"schema": self.db._schema}
+                )
+            yield conn
+    
+    async def _afetch(self, query: str, parameters: Dict[str, Any]) -> ColumnarResult:
+        """Execute a generated query on the async engine."""
+        annotate(cache_hit=False)
+        async with self._aconnect() as conn:
+            query = await conn.run_sync(self._guarded, query, parameters)
+            result = await conn.execute(text(query), parameters)
+            return ColumnarResult.from_rows(list(result.keys()), result.fetchall())
+    
+    async def _aexecute(self, query: str, parameters: Dict[str, Any]) -> ColumnarResult:
+        """Execute a generated query without blocking the event loop.
+        
+        Queries run on the async engine when the agent has one, and on a worker
+        thread through the synchronous engine otherwise.
+        """
+        if self.async_engine is None:
+            return await asyncio.to_thread(self._execute, query, parameters)
+        if self.result_cache is None:
+            return await self._afetch(query, parameters)
+        return await self.result_cache.aget_or_execute(
+            query, parameters, lambda: self._afetch(query, parameters)
         )
         
-        # Convert datetime objects to ISO format strings for consistent comparison
-        for row in result:
-            for key, value in row.items():
-                if isinstance(value, datetime):
-                    row[key] = value.isoformat()
-                    
-        return result
\ No newline at end of file
+    def _cached_sql(self, query_text: str, fingerprint: str) -> Optional[GeneratedSQL]:
+        """Look up SQL previously generated for a question, if caching is on."""
+        if self.sql_cache is None:
+            return None
+        return self.sql_cache.get(query_text, fingerprint)
+    
+    def _reusable_sql(self, query_text: str, fingerprint: str) -> Optional[GeneratedSQL]:
+        """Find SQL that answers a question without the LLM: cached or a vetted example."""
+        cached = self._cached_sql(query_text, fingerprint)
+        if cached is not None:
+            return cached
+        if self.examples is not None:
+            example = self.examples.match(query_text)
+            if example is not None:
+                return GeneratedSQL(query=example.query)
+        return None
+    
+    def _remember_sql(
+        self,
+        query_text: str,
+        query: str,
+        parameters: Dict[str, Any],
+        fingerprint: str
+    ) -> None:
+        """Store SQL generated for a question once it ran, if caching is on."""
+        if self.sql_cache is not None:
+            self.sql_cache.put(query_text, fingerprint, GeneratedSQL(query=query, parameters=parameters))
+    
+    async def _execute_generated(
+        self,
+        query_text: str,
+        query: str,
+        parameters: Dict[str, Any],
+        fingerprint: str,
+        from_cache: bool = False
+    ) -> ColumnarResult:
+        """Execute SQL generated for a question and remember it once it ran."""
+        with stage("sql_agent.db_execution", cache_hit=self.result_cache is not None) as span:
+            result = await self._aexecute(query, parameters)
+            span.set(rows=len(result))
+        with stage("sql_agent.post_processing"):
+            if not from_cache:
+                # The SQL cache may write to its SQLite file
+                await asyncio.to_thread(self._remember_sql, query_text, query, parameters, fingerprint)
+        return result
+        
+    async def _generate_sql(self, query_text: str) -> Tuple[str, Dict[str, Any], str, bool]:
+        """Produce the SQL for a question from the caches, the examples or the LLM.
+        
+        The catalog is probed once; the cache lookup, the schema description and
+        storing the generated SQL all use that snapshot. The lookup, schema fetch
+        and LLM call are timed as ``sql_agent.plan``, ``sql_agent.schema`` and
+        ``sql_agent.sql_generation`` stages.
+        
+        Returns:
+            The query, its parameters, the schema fingerprint they belong to and
+            whether they were reused rather than generated
+        """
+        with stage("sql_agent.plan") as span:
+            # First check if the input query contains any unsafe keywords
+            self._check_question(query_text)
+            
+            # Repeated and curated questions skip SQL generation entirely; the catalog probe and
+            # the SQL cache file hit the disk or database, so they run off the event loop
+            rebuilds = self.schema_cache.rebuilds
+            schema = await asyncio.to_thread(self._schema)
+            cached = await asyncio.to_thread(self._reusable_sql, query_text, schema.fingerprint)
+            span.set(cache_hit=cached is not None)
+        if cached is not None:
+            return cached.query, cached.parameters, schema.fingerprint, True
+            
+        # Get info for the tables relevant to the question
+        with stage("sql_agent.schema", cache_hit=self.schema_cache.rebuilds == rebuilds):
+            table_info = self.get_table_info(query_text, schema)
+
+        # Get response from LLM
+        with stage("sql_agent.sql_generation"):
+            response = await self.llm.ainvoke(self._build_messages(query_text, table_info))
+            record_tokens(response)
+            query, parameters = self._parse_response(response)
+        return query, parameters, schema.fingerprint, False
+        
+    async def run(self, query_text: str) -> ColumnarResult:
+        """Run a natural language query against the database.
+        
+        The rows come back column by column; the result still iterates and
+        indexes as row dicts, and ``to_pylist()`` gives a plain list.
+        """
+        query, parameters, fingerprint, from_cache = await self._generate_sql(query_text)
+        return await self._execute_generated(query_text, query, parameters, fingerprint, from_cache)
+    
+    def _iter_batches(
+        self,
+        query: str,
+        parameters: Dict[str, Any],
+        batch_size: int
+    ) -> Iterator[ColumnarResult]:
+        """Execute a query on a server-side cursor and yield converted row batches."""
+        with self._connect() as conn:
+            query = self._guarded(conn, query, parameters, stream=True)
+            result = conn.execution_options(
+                stream_results=True, max_row_buffer=batch_size
+            ).execute(text(query), parameters)
+            columns = list(result.keys())
+            for rows in result.partitions(batch_size):
+                yield ColumnarResult.from_rows(columns, rows)
+    
+    async def _abatches(
+        self,
+        query: str,
+        parameters: Dict[str, Any],
+        batch_size: int
+    ) -> AsyncIterator[ColumnarResult]:
+        """Stream row batches from the async engine, or from a worker thread without one."""
+        if self.async_engine is not None:
+            async with self._aconnect() as conn:
+                query = await conn.run_sync(self._guarded, query, parameters, True)
+                result = await conn.stream(
+                    text(query), parameters, execution_options={"max_row_buffer": batch_size}
+                )
+                columns = list(result.keys())
+                async for rows in result.partitions(batch_size):
+                    yield ColumnarResult.from_rows(columns, rows)
+            return
+        
+        batches = self._iter_batches(query, parameters, batch_size)
+        try:
+            while True:
+                batch = await asyncio.to_thread(next, batches, None)
+                if batch is None:
+                    break
+                yield batch
+        finally:
+            await asyncio.to_thread(batches.close)
+    
+    async def astream(
+        self,
+        query_text: str,
+        batch_size: int = 1000,
+        max_rows: Optional[int] = None,
+        max_bytes: Optional[int] = None
+    ) -> AsyncIterator[SQLStreamEvent]:
+        """Run a natural language query and stream its rows in fixed-size batches.
+        
+        Rows are fetched through a server-side cursor, so at most one batch is held
+        in memory. The stream stops early once ``max_rows`` rows or roughly
+        ``max_bytes`` bytes of JSON have been yielded; the final "done" event
+        tells whether rows were left unread. Streamed results bypass the
+        result cache and the guard's default LIMIT and row cap, so only
+        ``max_rows`` and ``max_bytes`` bound them.
+        
+        Args:
+            query_text: The natural language question
+            batch_size: Number of rows per batch
+            max_rows: Optional cap on the total number of rows
+            max_bytes: Optional cap on the total JSON size of the rows
+            
+        Yields:
+            SQLStreamEvent: A "rows" event per batch, then a final "done" event
+        """
+        query, parameters, fingerprint, from_cache = await self._generate_sql(query_text)
+        truncated = False
+        rows_sent = 0
+        bytes_sent = 0
+        remembered = from_cache or self.sql_cache is None
+        batches = self._abatches(query, parameters, batch_size)
+        try:
+            async for batch in batches:
+                if not remembered:
+                    # The query ran, so it is worth reusing
+                    remembered = True
+                    await asyncio.to_thread(self._remember_sql, query_text, query, parameters, fingerprint)
+                if max_rows is not None and rows_sent + len(batch) > max_rows:
+                    batch = batch[:max_rows - rows_sent]
+                    truncated = True
+                if max_bytes is not None:
+                    size = len(json.dumps(batch.to_pylist(), default=str))
+                    if bytes_sent + size > max_bytes:
+                        truncated = True
+                        break
+                    bytes_sent += size
+                if batch:
+                    rows_sent += len(batch)
+                    yield SQLStreamEvent(kind="rows", rows=batch, row_count=len(batch))
+                if truncated:
+                    break
+        finally:
+            await batches.aclose()
+        yield SQLStreamEvent(kind="done", row_count=rows_sent, truncated=truncated)
+    
+    async def run_many(
+        self,
+        query_texts: List[str],
+        max_concurrency: int = 8
+    ) -> List[Union[ColumnarResult, Exception]]:
+        """Run many natural language queries with bounded concurrency.
+        
+        Questions without cached SQL are sent through the LLM's batch API and the
+        generated queries are executed concurrently.
+        
+        Args:
+            query_texts: Natural language questions to answer
+            max_concurrency: Maximum number of LLM calls or queries in flight
+            
+        Returns:
+            List with, in input order, the rows for each question or the
+            exception that question raised
+        """
+        results: List[Union[ColumnarResult, Exception, None]] = [None] * len(query_texts)
+        generated: Dict[int, Tuple[str, Dict[str, Any], bool]] = {}
+        to_generate = []
+        # One catalog probe serves the whole batch
+        rebuilds = self.schema_cache.rebuilds
+        schema = await asyncio.to_thread(self._schema)
+        for index, query_text in enumerate(query_texts):
+            with stage("sql_agent.plan") as span:
+                try:
+                    self._check_question(query_text)
+                except ValueError as e:
+                    results[index] = e
+                    continue
+                cached = await asyncio.to_thread(self._reusable_sql, query_text, schema.fingerprint)
+                span.set(cache_hit=cached is not None)
+            if cached is not None:
+                generated[index] = (cached.query, cached.parameters, True)
+            else:
+                to_generate.append(index)
+        
+        if to_generate:
+            with stage(
+                "sql_agent.schema",
+                batch_size=len(to_generate),
+                cache_hit=self.schema_cache.rebuilds == rebuilds
+            ):
+                table_infos = [self.get_table_info(query_texts[index], schema) for index in to_generate]
+            with stage("sql_agent.sql_generation", batch_size=len(to_generate)):
+                responses = await self.llm.abatch(
+                    [
+                        self._build_messages(query_texts[index], table_info)
+                        for index, table_info in zip(to_generate, table_infos)
+                    ],
+                    config={"max_concurrency": max_concurrency},
+                    return_exceptions=True
+                )
+                record_tokens(*responses)
+            for index, response in zip(to_generate, responses):
+                try:
+                    if isinstance(response, Exception):
+                        raise response
+                    query, parameters = self._parse_response(response)
+                    generated[index] = (query, parameters, False)
+                except Exception as e:
+                    results[index] = e
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def execute(index: int) -> None:
+            query, parameters, from_cache = generated[index]
+            try:
+                async with semaphore:
+                    results[index] = await self._execute_generated(
+                        query_texts[index], query, parameters, schema.fingerprint, from_cache
+                    )
+            except Exception as e:
+                results[index] = e
+        
+        await asyncio.gather(*(execute(index) for index in generated))
+        return results
@@ -0,0 +1,123 @@
+"""
+Cache of generated SQL keyed on the normalized question and the schema fingerprint.
+"""
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from pydantic import BaseModel, Field
+
+from ..utils.cache import CacheStats, LRUCache, SQLiteStore
+
+def normalize_question(question: str) -> str:
+    """Normalize a question for the SQL cache key.
+
+    Only whitespace and trailing punctuation are normalized. Unlike the plan
+    cache key, case, comparison operators and numbers are kept, since any of
+    them can change the SQL (``amount > 100`` vs ``amount < 100``, ``'Smith'``
+    vs ``'smith'``).
+
+    Args:
+        question: The natural language question
+
+    Returns:
+        str: The normalized question
+    """
+    return re.sub(r"[\s?!.;,]+$", "", " ".join(question.split()))
+
+class GeneratedSQL(BaseModel):
+    """SQL generated for a question, ready to execute."""
+    query: str = Field(
+        description="The SQL query"
+    )
+    parameters: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="Parameters bound into the query"
+    )
+
+class SQLCache:
+    """Maps (normalized question, schema fingerprint) to previously generated SQL.
+
+    Entries live in an in-memory LRU and optionally in a SQLite file shared across
+    processes. Seeing a new schema fingerprint drops every entry generated for a
+    different schema.
+    """
+
+    def __init__(self, max_size: int = 4096, path: Optional[Union[str, Path]] = None):
+        """Initialize the cache.
+
+        Args:
+            max_size: Maximum number of entries kept in memory
+            path: Optional SQLite file used to persist entries across processes
+        """
+        self._entries: LRUCache[GeneratedSQL] = LRUCache(max_size=max_size)
+        self._store = SQLiteStore(path, table="generated_sql") if path else None
+        self._fingerprint: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self) -> CacheStats:
+        """Hit and miss counters."""
+        return self._entries.stats
+
+    def _check_fingerprint(self, fingerprint: str) -> None:
+        """Drop the entries of other schemas when the fingerprint changes."""
+        with self._lock:
+            if fingerprint == self._fingerprint:
+                return
+            if self._fingerprint is not None:
+                self.stats.invalidations += len(self._entries)
+                self._entries.clear()
+            if self._store is not None:
+                self.stats.invalidations += self._store.retain_prefix(f"{fingerprint}:")
+            self._fingerprint = fingerprint
+
+    def get(self, question: str, fingerprint: str) -> Optional[GeneratedSQL]:
+        """Look up the SQL generated for a question against a schema.
+
+        Args:
+            question: The natural language question
+            fingerprint: Fingerprint of the current schema
+
+        Returns:
+            Optional[GeneratedSQL]: The cached SQL, or None on a miss
+        """
+        self._check_fingerprint(fingerprint)
+        key = f"{fingerprint}:{normalize_question(question)}"
+        generated = self._entries.get(key)
+        if generated is None and self._store is not None:
+            row = self._store.get(key)
+            if row is not None:
+                generated = GeneratedSQL.model_validate_json(row[0])
+                self._entries.put(key, generated)
+                self.stats.misses -= 1
+                self.stats.hits += 1
+                self.stats.disk_hits += 1
+        return generated
+
+    def put(self, question: str, fingerprint: str, generated: GeneratedSQL) -> None:
+        """Store the SQL generated for a question.
+
+        Args:
+            question: The natural language question
+            fingerprint: Fingerprint of the schema the SQL was generated for
+            generated: The generated SQL and parameters
+        """
+        self._check_fingerprint(fingerprint)
+        key = f"{fingerprint}:{normalize_question(question)}"
+        self._entries.put(key, generated)
+        if self._store is not None:
+            self._store.put(key, generated.model_dump_json())
+
+    def clear(self) -> None:
+        """Remove every entry from memory and disk."""
+        self._entries.clear()
+        if self._store is not None:
+            self._store.clear()
+
+    def close(self) -> None:
+        """Close the on-disk store, if any."""
+        if self._store is not None:
+            self._store.close()
+            self._store = None
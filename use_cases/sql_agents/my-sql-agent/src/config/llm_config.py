@@ -2,15 +2,18 @@
 Configuration for Language Model providers and settings.
 """
 from enum import Enum
-from typing import Optional, Dict, Any, Union
+from functools import lru_cache
+from typing import Optional, Dict, Any, Tuple, Union
 from pathlib import Path
+import json
 import os
-import tomli
+import threading
 from pydantic import BaseModel, Field
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+# Connection limits of the HTTP client shared by every OpenAI model
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+HTTP_KEEPALIVE_EXPIRY = 60.0
 
 class LLMProvider(str, Enum):
     """Supported LLM providers."""
@@ -72,13 +75,18 @@ class LLMConfig(BaseModel):
         Raises:
             ValueError: If required settings are missing
         """
-        # Load config.toml
+        from shared.utils.config import load_toml
+        from shared.utils.env import load_env
+        
+        # Load environment variables, once per process
+        load_env()
+        
+        # Load config.toml; it is only parsed again after it changes
         config_path = Path("config.toml")
         if not config_path.exists():
             raise FileNotFoundError("config.toml not found")
             
-        with open(config_path, "rb") as f:
-            config = tomli.load(f)
+        config = load_toml(config_path)
             
         # Get provider from environment or config
         provider = os.getenv("LLM_PROVIDER", config["llm"]["default_provider"])
@@ -102,11 +110,34 @@ class LLMConfig(BaseModel):
             
         raise ValueError(f"Unsupported LLM provider: {provider}")
 
-def create_llm(config: LLMConfig):
+def _http_limits() -> Any:
+    import httpx
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+    )
+
+@lru_cache(maxsize=None)
+def get_http_client() -> Any:
+    """Get the process-wide keep-alive HTTP client used for sync LLM calls.
+
+    There is no shared async client: an ``httpx.AsyncClient`` is bound to the
+    event loop it first runs on, so ChatOpenAI creates its own.
+    """
+    import httpx
+    return httpx.Client(limits=_http_limits(), timeout=None)
+
+def create_llm(config: LLMConfig, **overrides: Any):
     """Create a LangChain LLM instance based on configuration.
     
+    OpenAI models send their sync requests through the shared HTTP client, so
+    new instances reuse open connections instead of starting new TLS sessions.
+    
     Args:
         config: LLM configuration
+        **overrides: Constructor arguments replacing those derived from config,
+            e.g. ``model_kwargs`` for function calling
         
     Returns:
         A LangChain LLM instance
@@ -116,11 +147,13 @@ def create_llm(config: LLMConfig):
     """
     if config.provider == LLMProvider.OLLAMA:
         from langchain_ollama import OllamaLLM
-        return OllamaLLM(
-            model=config.settings.model_name,
-            temperature=config.settings.temperature,
+        kwargs = {
+            "model": config.settings.model_name,
+            "temperature": config.settings.temperature,
             **config.settings.additional_kwargs
-        )
+        }
+        kwargs.update(overrides)
+        return OllamaLLM(**kwargs)
     
     elif config.provider == LLMProvider.OPENAI:
         from langchain_openai import ChatOpenAI
@@ -128,11 +161,74 @@ def create_llm(config: LLMConfig):
         if not isinstance(settings, OpenAISettings) or not settings.api_key:
             raise ValueError("OpenAI API key is required")
             
-        return ChatOpenAI(
-            model_name=settings.model_name,
-            temperature=settings.temperature,
-            openai_api_key=settings.api_key,
+        kwargs = {
+            "model_name": settings.model_name,
+            "temperature": settings.temperature,
+            "openai_api_key": settings.api_key,
+            "http_client": get_http_client(),
             **settings.additional_kwargs
-        )
+        }
+        kwargs.update(overrides)
+        return ChatOpenAI(**kwargs)
+    
+    raise ValueError(f"Unsupported LLM provider: {config.provider}")
+
+def resolve_api_key(config: LLMConfig) -> LLMConfig:
+    """Fill a missing OpenAI API key from OPENAI_API_KEY, as ChatOpenAI itself would.
+    
+    Args:
+        config: LLM configuration
+        
+    Returns:
+        LLMConfig: The configuration, copied if the key was filled in
+    """
+    settings = config.settings
+    if not isinstance(settings, OpenAISettings) or settings.api_key or not os.getenv("OPENAI_API_KEY"):
+        return config
+    return config.model_copy(update={
+        "settings": settings.model_copy(update={"api_key": os.getenv("OPENAI_API_KEY")})
+    })
+
+_LLM_CACHE: Dict[Tuple[str, str], Any] = {}
+_LLM_CACHE_LOCK = threading.Lock()
+
+def get_llm(config: LLMConfig, **overrides: Any):
+    """Get a shared LangChain LLM instance for a configuration.
+    
+    Instances are created once per configuration and set of overrides and then
+    reused, so building agents per request does not create new clients.
+    
+    Args:
+        config: LLM configuration
+        **overrides: Constructor arguments passed on to create_llm
+        
+    Returns:
+        A LangChain LLM instance
     
-    raise ValueError(f"Unsupported LLM provider: {config.provider}") 
\ No newline at end of file
+    Raises:
+        ValueError: If provider is not supported
+    """
+    key = (config.model_dump_json(), json.dumps(overrides, sort_keys=True, default=str))
+    with _LLM_CACHE_LOCK:
+        llm = _LLM_CACHE.get(key)
+        if llm is None:
+            llm = _LLM_CACHE[key] = create_llm(config, **overrides)
+    return llm
+
+def clear_llm_cache() -> None:
+    """Forget the shared LLM instances, e.g. after rotating API keys."""
+    with _LLM_CACHE_LOCK:
+        _LLM_CACHE.clear()
+
+def _reset_after_fork() -> None:
+    """Drop the parent's HTTP client and LLM instances in a forked child.
+
+    Nothing is closed, since the connections still belong to the parent.
+    """
+    global _LLM_CACHE_LOCK
+    _LLM_CACHE_LOCK = threading.Lock()
+    _LLM_CACHE.clear()
+    get_http_client.cache_clear()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork) 
@@ -1,37 +1,45 @@
 """
 Configuration management for the application.
 Combines settings from .env and config.toml files.
+
+Nothing is read at import time: .env files are loaded and config.toml is parsed
+on first use, and the module-level constants below are resolved lazily from the
+shared settings snapshot (see ``shared.utils.get_settings``). config.toml is
+parsed again whenever it changes on disk.
 """
 import os
 from pathlib import Path
-from typing import Optional
-import tomli
-import sys
-
-# Import shared environment utilities
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../..')))
-from shared.utils.env import load_env
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
 from .llm_config import LLMConfig, LLMProvider
 
-# Load environment variables from both root and local .env files
-load_env()
+if TYPE_CHECKING:
+    from shared.utils.settings import Settings
+
+def ensure_env() -> None:
+    """Load environment variables from both root and local .env files, once."""
+    from shared.utils.env import load_env
+    load_env()
+
+def get_settings() -> "Settings":
+    """Get the shared, immutable settings snapshot."""
+    from shared.utils.settings import get_settings as get_shared_settings
+    return get_shared_settings()
 
 # Get project root directory (where pyproject.toml or .git is)
 def find_project_root() -> Path:
-    """Find the project root directory."""
-    current = Path.cwd()
-    while current != current.parent:
-        if (current / ".git").exists() or (current / "pyproject.toml").exists():
-            return current
-        current = current.parent
-    return current
+    """Find the project root directory; the filesystem walk is cached."""
+    from shared.utils.env import find_project_root as find_root
+    return find_root(markers=(".git", "pyproject.toml"))
 
-# Load config.toml
-PROJECT_ROOT = find_project_root()
-CONFIG_PATH = PROJECT_ROOT / "config.toml"
-with open(CONFIG_PATH, "rb") as f:
-    TOML_CONFIG = tomli.load(f)
+def get_toml_config() -> Dict[str, Any]:
+    """Load config.toml from the project root, parsing it only when it changed.
+    
+    Returns:
+        Dict[str, Any]: The parsed configuration
+    """
+    from shared.utils.config import load_toml
+    return load_toml(find_project_root() / "config.toml")
 
 def get_llm_config() -> LLMConfig:
     """Get LLM configuration based on environment and config files.
@@ -39,8 +47,11 @@ def get_llm_config() -> LLMConfig:
     Returns:
         LLMConfig: Configuration for the language model
     """
+    ensure_env()
+    toml_config = get_toml_config()
+    
     # Get provider from environment or fall back to config.toml
-    provider = os.getenv("LLM_PROVIDER", TOML_CONFIG["llm"]["default_provider"])
+    provider = os.getenv("LLM_PROVIDER", toml_config["llm"]["default_provider"])
     
     if provider == "openai":
         api_key = os.getenv("OPENAI_API_KEY")
@@ -48,26 +59,43 @@ def get_llm_config() -> LLMConfig:
             raise ValueError("OPENAI_API_KEY environment variable is required when using OpenAI")
             
         return LLMConfig.openai(
-            model_name=TOML_CONFIG["llm"]["openai"]["model_name"],
-            temperature=TOML_CONFIG["llm"]["openai"]["temperature"],
+            model_name=toml_config["llm"]["openai"]["model_name"],
+            temperature=toml_config["llm"]["openai"]["temperature"],
             api_key=api_key
         )
     
     elif provider == "ollama":
         return LLMConfig.ollama(
-            model_name=TOML_CONFIG["llm"]["ollama"]["model_name"],
-            temperature=TOML_CONFIG["llm"]["ollama"]["temperature"]
+            model_name=toml_config["llm"]["ollama"]["model_name"],
+            temperature=toml_config["llm"]["ollama"]["temperature"]
         )
     
     raise ValueError(f"Unsupported LLM provider: {provider}")
 
-# Environment
-APP_ENV = os.getenv("APP_ENV", "development")
-IS_DEVELOPMENT = APP_ENV == "development"
+# Lazily resolved settings: environment and database settings from the shared
+# snapshot, agent-specific settings from the environment after the .env files
+# are loaded, and the config.toml location. They are not cached here, so they
+# follow shared.utils.reload().
+_LAZY_SETTINGS = {
+    "APP_ENV": lambda: get_settings().app_env,
+    "IS_DEVELOPMENT": lambda: get_settings().is_development,
+    "DB_HOST": lambda: get_settings().db_host,
+    "DB_PORT": lambda: get_settings().db_port,
+    "DB_NAME": lambda: get_settings().db_name,
+    "DB_USER": lambda: get_settings().db_user,
+    "DB_PASSWORD": lambda: get_settings().db_password,
+    # Adaptive pool sizing, off by default; the budget is shared by all workers on the host
+    "DB_POOL_AUTOTUNE": lambda: os.getenv("DB_POOL_AUTOTUNE", "false").lower() in ("1", "true", "yes"),
+    "DB_POOL_MAX_SIZE": lambda: int(os.getenv("DB_POOL_MAX_SIZE", "20")),
+    "DB_CONNECTION_BUDGET": lambda: int(os.environ["DB_CONNECTION_BUDGET"]) if os.getenv("DB_CONNECTION_BUDGET") else None,
+    "PROJECT_ROOT": find_project_root,
+    "CONFIG_PATH": lambda: find_project_root() / "config.toml",
+    "TOML_CONFIG": get_toml_config,
+}
 
-# Database settings (for future use)
-DB_HOST = os.getenv("DB_HOST", "localhost")
-DB_PORT = int(os.getenv("DB_PORT", "5432"))
-DB_NAME = os.getenv("DB_NAME", "ai_query_assistant")
-DB_USER = os.getenv("DB_USER", "postgres")
-DB_PASSWORD = os.getenv("DB_PASSWORD", "postgres") 
\ No newline at end of file
+def __getattr__(name: str) -> Any:
+    """Resolve the lazy module-level settings on first access."""
+    if name not in _LAZY_SETTINGS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    ensure_env()
+    return _LAZY_SETTINGS[name]() 
\ No newline at end of file
@@ -0,0 +1,190 @@
+"""
+Columnar result sets for executed SQL, stored as one array per column.
+"""
+from collections.abc import Sequence as SequenceABC
+from datetime import datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Union
+
+@lru_cache(maxsize=None)
+def _numpy() -> Any:
+    """Import numpy on first use; without it columns are tuples of Python values."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+def _sample(values: Sequence[Any]) -> Any:
+    """Return the first non-null value of a column."""
+    return next((value for value in values if value is not None), None)
+
+def _to_column(values: Sequence[Any], decimals_as_float: bool = False) -> Any:
+    """Store one column of Python values as compactly as its type allows.
+
+    Numbers without nulls become native numpy arrays. Anything else, datetimes
+    and Decimals from NUMERIC columns included, is kept as an object array, or
+    as a tuple when numpy is not installed.
+
+    Args:
+        values: The column's values
+        decimals_as_float: Convert Decimals to floats, and so to float64 arrays;
+            values beyond float precision are rounded
+    """
+    if decimals_as_float and isinstance(_sample(values), Decimal):
+        values = [None if value is None else float(value) for value in values]
+    np = _numpy()
+    if np is None:
+        return tuple(values)
+
+    array = None
+    if isinstance(_sample(values), (bool, int, float)):
+        try:
+            array = np.asarray(values)
+        except (OverflowError, TypeError, ValueError):
+            array = None
+        if array is not None and array.dtype.kind not in "biuf":
+            array = None
+    if array is None:
+        # fromiter keeps list and tuple values (e.g. Postgres arrays) as single cells
+        array = np.fromiter(values, dtype=object, count=len(values))
+    array.flags.writeable = False
+    return array
+
+def _to_python_value(value: Any) -> Any:
+    """Convert one stored value to a JSON-friendly Python value."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    # numpy scalars, e.g. one cell of an int64 column
+    return value.item() if hasattr(value, "item") and hasattr(value, "dtype") else value
+
+def _to_python(column: Any) -> List[Any]:
+    """Convert a stored column to JSON-friendly Python values in one pass.
+
+    Numeric arrays are converted by numpy; datetime columns become ISO strings.
+    """
+    if not isinstance(column, tuple) and column.dtype != object:
+        return column.tolist()
+    values = list(column)
+    if isinstance(_sample(values), datetime):
+        values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return values
+
+class ColumnarResult(SequenceABC):
+    """Read-only query result stored column by column.
+
+    Column names are kept once instead of in every row, numeric columns are
+    native numpy arrays and type conversion is done per column. For backward
+    compatibility the result also behaves as a sequence of row dicts: rows are
+    built on access, with datetimes as ISO strings. The converted values are
+    not kept, so the result holds a single copy of the data.
+    """
+
+    def __init__(self, columns: Dict[str, Any]):
+        """Initialize the result.
+
+        Args:
+            columns: Stored column values keyed by column name, all the same length
+        """
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("All columns must have the same length")
+        self._columns = columns
+        self._length = lengths.pop() if lengths else 0
+
+    @classmethod
+    def from_rows(
+        cls,
+        column_names: Sequence[str],
+        rows: Iterable[Sequence[Any]],
+        decimals_as_float: bool = False
+    ) -> "ColumnarResult":
+        """Build a result from row tuples, e.g. the rows of a SQLAlchemy result.
+
+        Args:
+            column_names: Names of the columns in row order
+            rows: Row tuples
+            decimals_as_float: Store NUMERIC (Decimal) columns as float64 arrays
+                instead of keeping the exact Decimal values; off by default so
+                rows read the same as plain query results
+
+        Returns:
+            ColumnarResult: The result
+        """
+        rows = list(rows)
+        values = list(zip(*rows)) if rows else [() for _ in column_names]
+        return cls({
+            name: _to_column(column, decimals_as_float)
+            for name, column in zip(column_names, values)
+        })
+
+    @classmethod
+    def from_dicts(cls, rows: Sequence[Dict[str, Any]]) -> "ColumnarResult":
+        """Build a result from row dicts sharing the keys of the first row."""
+        if not rows:
+            return cls({})
+        column_names = list(rows[0])
+        return cls.from_rows(column_names, ([row[name] for name in column_names] for row in rows))
+
+    @property
+    def columns(self) -> List[str]:
+        """Column names in result order."""
+        return list(self._columns)
+
+    def column(self, name: str) -> Any:
+        """Get the stored values of one column, a read-only numpy array when available."""
+        return self._columns[name]
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the stored arrays; object columns count their pointers only."""
+        return sum(getattr(values, "nbytes", 0) for values in self._columns.values())
+
+    def _python_columns(self) -> Dict[str, List[Any]]:
+        return {name: _to_python(values) for name, values in self._columns.items()}
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict[str, Any], "ColumnarResult"]:
+        if isinstance(index, slice):
+            return ColumnarResult({name: values[index] for name, values in self._columns.items()})
+        return {name: _to_python_value(values[index]) for name, values in self._columns.items()}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        columns = self._python_columns()
+        names = list(columns)
+        for row in zip(*columns.values()):
+            yield dict(zip(names, row))
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, SequenceABC) and not isinstance(other, (str, bytes)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ColumnarResult(columns={self.columns}, rows={len(self)})"
+
+    def to_pylist(self) -> List[Dict[str, Any]]:
+        """Materialize the rows as a list of dicts, e.g. for JSON serialization."""
+        return list(self)
+
+    def to_pandas(self) -> Any:
+        """Convert to a pandas DataFrame without copying the numpy column arrays.
+
+        Returns:
+            pandas.DataFrame: The result as a data frame
+
+        Raises:
+            ImportError: If pandas is not installed
+        """
+        try:
+            import pandas as pd
+        except ImportError as e:
+            raise ImportError("to_pandas() requires pandas: pip install pandas") from e
+        return pd.DataFrame(
+            {name: list(values) if isinstance(values, tuple) else values for name, values in self._columns.items()},
+            columns=self.columns,
+            copy=False
+        )
@@ -1,46 +1,133 @@
 """
 Database configuration and session management.
+
+Engines and session factories are created on first use through the get_*
+accessors; the module-level names ``engine``, ``async_engine``, ``SessionLocal``
+and ``AsyncSessionLocal`` resolve to them lazily.
 """
-from typing import Generator
-from contextlib import contextmanager
-from sqlalchemy import create_engine
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, AsyncGenerator, Generator
+from contextlib import asynccontextmanager, contextmanager
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 
-from ..config.settings import (
-    DB_USER,
-    DB_PASSWORD,
-    DB_HOST,
-    DB_PORT,
-    DB_NAME,
-    IS_DEVELOPMENT
-)
+from ..config import settings
+
+if TYPE_CHECKING:
+    from shared.db import PoolAutotuner
 
-def create_database_url() -> str:
-    """Create database URL from configuration."""
-    return f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+def create_database_url(driver: str = "") -> str:
+    """Create database URL from configuration.
+    
+    Args:
+        driver: Optional DBAPI driver, e.g. "asyncpg"; the dialect default if empty
+    """
+    scheme = f"postgresql+{driver}" if driver else "postgresql"
+    return (
+        f"{scheme}://{settings.DB_USER}:{settings.DB_PASSWORD}"
+        f"@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+    )
 
 def create_db_engine() -> Engine:
-    """Create SQLAlchemy engine instance with connection pooling."""
-    database_url = create_database_url()
-    return create_engine(
-        database_url,
-        echo=False,  # Disable SQL logging
+    """Get the pooled SQLAlchemy engine for the configured database.
+
+    Engines come from the shared registry, so every caller using the same URL
+    and pool options shares one pool. The pool is an ``AdaptiveQueuePool``,
+    which times its checkouts, and its metrics are recorded through
+    ``shared.observability``. With ``DB_POOL_AUTOTUNE`` set the pool grows
+    toward ``DB_POOL_MAX_SIZE`` under load and shrinks when idle, within the
+    optional ``DB_CONNECTION_BUDGET``.
+    """
+    from shared.db import AdaptiveQueuePool, get_connection
+    from shared.observability import instrument_pool
+
+    engine = get_connection(
+        create_database_url(),
+        echo=False,           # Disable SQL logging
         pool_pre_ping=True,   # Enable connection health checks
         pool_size=5,          # Connection pool size
-        max_overflow=10       # Max additional connections
+        max_overflow=10,      # Max additional connections
+        poolclass=AdaptiveQueuePool
+    )
+    instrument_pool(engine)
+    if settings.DB_POOL_AUTOTUNE:
+        start_pool_autotuner(engine)
+    return engine
+
+@lru_cache(maxsize=None)
+def start_pool_autotuner(engine: Engine) -> "PoolAutotuner":
+    """Start resizing an engine's adaptive pool in the background, once per engine."""
+    from shared.db import ConnectionBudget, PoolAutotuner
+
+    budget = settings.DB_CONNECTION_BUDGET
+    return PoolAutotuner(
+        engine,
+        max_size=settings.DB_POOL_MAX_SIZE,
+        budget=ConnectionBudget(budget) if budget else None
+    ).start()
+
+def create_async_db_engine() -> AsyncEngine:
+    """Get the pooled asyncpg-backed async engine, with pool metrics.
+
+    Like ``create_db_engine`` the engine comes from the shared registry, so
+    ``shared.db.dispose_all`` and the after-fork hook dispose its pool too.
+    """
+    from shared.db import AsyncAdaptiveQueuePool, get_async_connection
+    from shared.observability import instrument_pool
+
+    engine = get_async_connection(
+        create_database_url(driver="asyncpg"),
+        echo=False,
+        pool_pre_ping=True,
+        pool_size=5,
+        max_overflow=10,
+        poolclass=AsyncAdaptiveQueuePool
     )
+    instrument_pool(engine)
+    return engine
 
-# Create engine instance
-engine = create_db_engine()
+@lru_cache(maxsize=None)
+def get_engine() -> Engine:
+    """Get the process-wide engine, creating it on first use."""
+    return create_db_engine()
 
-# Create session factory
-SessionLocal = sessionmaker(
-    bind=engine,
-    autocommit=False,
-    autoflush=False
-)
+@lru_cache(maxsize=None)
+def get_async_engine() -> AsyncEngine:
+    """Get the process-wide async engine, creating it on first use."""
+    return create_async_db_engine()
+
+@lru_cache(maxsize=None)
+def get_session_factory() -> sessionmaker:
+    """Get the session factory bound to the process-wide engine."""
+    return sessionmaker(
+        bind=get_engine(),
+        autocommit=False,
+        autoflush=False
+    )
+
+@lru_cache(maxsize=None)
+def get_async_session_factory() -> async_sessionmaker:
+    """Get the async session factory bound to the process-wide async engine."""
+    return async_sessionmaker(
+        bind=get_async_engine(),
+        autoflush=False,
+        expire_on_commit=False
+    )
+
+_LAZY_ATTRIBUTES = {
+    "engine": get_engine,
+    "async_engine": get_async_engine,
+    "SessionLocal": get_session_factory,
+    "AsyncSessionLocal": get_async_session_factory,
+}
+
+def __getattr__(name: str) -> Any:
+    """Resolve the lazy module-level engines and session factories."""
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return _LAZY_ATTRIBUTES[name]()
 
 @contextmanager
 def get_db_session() -> Generator[Session, None, None]:
@@ -55,7 +142,7 @@ def get_db_session() -> Generator[Session, None, None]:
             results = session.query(Customer).all()
         ```
     """
-    session = SessionLocal()
+    session = get_session_factory()()
     try:
         yield session
         session.commit()
@@ -63,4 +150,25 @@ def get_db_session() -> Generator[Session, None, None]:
         session.rollback()
         raise e
     finally:
-        session.close() 
\ No newline at end of file
+        session.close()
+
+@asynccontextmanager
+async def get_async_db_session() -> AsyncGenerator[AsyncSession, None]:
+    """Get async database session from the async connection pool.
+    
+    Yields:
+        AsyncSession: Async database session
+        
+    Example:
+        ```python
+        async with get_async_db_session() as session:
+            result = await session.execute(select(Customer))
+        ```
+    """
+    async with get_async_session_factory()() as session:
+        try:
+            yield session
+            await session.commit()
+        except SQLAlchemyError as e:
+            await session.rollback()
+            raise e
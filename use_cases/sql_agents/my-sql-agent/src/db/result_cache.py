@@ -0,0 +1,363 @@
+"""
+Result-set cache for executed SQL, invalidated when the tables it read change.
+"""
+import asyncio
+import json
+import re
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple, Union
+
+from langchain_community.utilities import SQLDatabase
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import bindparam, inspect, text
+
+from .columnar import ColumnarResult
+from ..utils.cache import CacheStats, LRUCache
+
+# Trigger-fed table of per-table write counters, see sql/init.sql
+CHANGE_COUNTER_TABLE = "table_change_counters"
+
+# Trigger function bumping the counters on PostgreSQL, see sql/init.sql
+CHANGE_COUNTER_FUNCTION = "bump_table_change_counter"
+
+# Tables with a trigger feeding the counters, per dialect
+COUNTED_TABLES_SQL = {
+    "postgresql": (
+        "SELECT DISTINCT event_object_table FROM information_schema.triggers "
+        "WHERE event_object_schema = coalesce(:schema, current_schema()) "
+        f"AND action_statement LIKE '%{CHANGE_COUNTER_FUNCTION}%'"
+    ),
+    "sqlite": (
+        "SELECT DISTINCT tbl_name FROM sqlite_master "
+        f"WHERE type = 'trigger' AND sql LIKE '%{CHANGE_COUNTER_TABLE}%'"
+    ),
+}
+
+_LITERAL = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+
+def normalize_sql(query: str) -> str:
+    """Normalize SQL so that formatting differences share a cache key.
+
+    Comments and a trailing semicolon are removed, whitespace is collapsed and
+    everything outside string literals and quoted identifiers is lowercased.
+
+    Args:
+        query: SQL text
+
+    Returns:
+        str: The normalized SQL
+    """
+    query = re.sub(r"/\*.*?\*/", " ", query, flags=re.S)
+    query = re.sub(r"--[^\n]*", " ", query)
+    parts = _LITERAL.split(query)
+    # Odd indexes are the quoted parts kept by the capturing split
+    parts = [part if i % 2 else " ".join(part.lower().split()) for i, part in enumerate(parts)]
+    return "".join(parts).strip().rstrip(";").strip()
+
+def referenced_tables(query: str, table_names: Iterable[str]) -> List[str]:
+    """Find the known tables that a query mentions.
+
+    Args:
+        query: SQL text
+        table_names: Names of the tables in the database
+
+    Returns:
+        List[str]: The mentioned tables, sorted
+    """
+    words = set(re.findall(r"[a-z_][a-z0-9_$]*", normalize_sql(query)))
+    return sorted(name for name in table_names if name.lower() in words)
+
+_IDENTIFIER = r'"(?:[^"]|"")*"|[a-z_][a-z0-9_$]*'
+_RELATION = re.compile(rf"\s*((?:(?:{_IDENTIFIER})\s*\.\s*)*(?:{_IDENTIFIER}))")
+_CTE_NAME = re.compile(rf"(?:\bwith(?:\s+recursive)?|,)\s*({_IDENTIFIER})\s+as\s*\(")
+# Tokens of a FROM clause: nesting, item separators and the keywords ending the clause
+_FROM_TOKEN = re.compile(
+    r'"(?:[^"]|"")*"|[(),;]|\bjoin\b'
+    r"|\b(?:where|group|order|having|limit|offset|union|intersect|except|window|fetch|for|returning)\b"
+)
+
+def _unquote(identifier: str) -> str:
+    if identifier.startswith('"'):
+        return identifier[1:-1].replace('""', '"').lower()
+    return identifier
+
+def source_tables(query: str) -> List[str]:
+    """Find every relation a query reads in a FROM or JOIN clause.
+
+    Every FROM clause is scanned, subqueries included, and CTE names are left out. Names are lowercased
+    and stripped of quotes and schema prefixes. Functions taking ``FROM`` in
+    their arguments, such as ``extract``, add their argument, which only makes
+    callers more cautious.
+
+    Args:
+        query: SQL text
+
+    Returns:
+        List[str]: The relation names in order of appearance
+    """
+    # Blank out literals but keep quoted identifiers, which may name tables
+    sql = re.sub(r"'(?:[^']|'')*'", "''", normalize_sql(query))
+    ctes = {_unquote(name) for name in _CTE_NAME.findall(sql)}
+    names: List[str] = []
+    for clause in re.finditer(r"\bfrom\b", sql):
+        # Relations start the clause and follow each top-level comma or JOIN
+        starts = [clause.end()]
+        depth = 0
+        for token in _FROM_TOKEN.finditer(sql, clause.end()):
+            value = token.group(0)
+            if value == "(":
+                depth += 1
+            elif value == ")":
+                depth -= 1
+                if depth < 0:
+                    break
+            elif value.startswith('"') or depth:
+                continue
+            elif value in (",", "join"):
+                starts.append(token.end())
+            else:
+                break
+        for position in starts:
+            relation = _RELATION.match(sql, position)
+            if relation is None:
+                continue
+            name = _unquote(re.findall(_IDENTIFIER, relation.group(1))[-1])
+            if name not in ctes:
+                names.append(name)
+    return names
+
+class TableVersionProbe:
+    """Reads the trigger-maintained write counter of each table.
+
+    Versions come from ``table_change_counters`` for the tables a trigger keeps
+    it up to date for. Other tables, and every table when the counter table does
+    not exist, have no version: their changes cannot be detected cheaply, so
+    results reading them are not cached.
+    """
+
+    def __init__(self, db: SQLDatabase):
+        """Initialize the probe.
+
+        Args:
+            db: Database whose tables are versioned
+        """
+        self.db = db
+        self._counted: Optional[FrozenSet[str]] = None
+
+    @property
+    def counted_tables(self) -> FrozenSet[str]:
+        """Tables whose writes bump a change counter; read once from the catalog."""
+        if self._counted is None:
+            engine = self.db._engine
+            query = COUNTED_TABLES_SQL.get(engine.dialect.name)
+            if query is None or not inspect(engine).has_table(CHANGE_COUNTER_TABLE, schema=self.db._schema):
+                self._counted = frozenset()
+            else:
+                with engine.connect() as conn:
+                    statement = text(query)
+                    if ":schema" in query:
+                        statement = statement.bindparams(schema=self.db._schema)
+                    self._counted = frozenset(row[0] for row in conn.execute(statement))
+        return self._counted
+
+    def versions(self, tables: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Read the current version of each table.
+
+        Args:
+            tables: Table names
+
+        Returns:
+            Dict[str, Optional[str]]: Version per table, None for tables without a counter
+        """
+        tables = list(tables)
+        counted = [name for name in tables if name in self.counted_tables]
+        versions: Dict[str, Optional[str]] = {name: None for name in tables}
+        if not counted:
+            return versions
+
+        statement = text(
+            f"SELECT table_name, version FROM {CHANGE_COUNTER_TABLE} "
+            "WHERE table_name IN :names"
+        ).bindparams(bindparam("names", expanding=True))
+        # A table that was never written has no counter row yet
+        versions.update({name: "0" for name in counted})
+        with self.db._engine.connect() as conn:
+            for name, version in conn.execute(statement, {"names": counted}):
+                versions[name] = str(version)
+        return versions
+
+Rows = Union[ColumnarResult, List[Dict[str, Any]]]
+
+def _copy_rows(rows: Sequence[Dict[str, Any]]) -> Rows:
+    """Copy rows so callers cannot modify a cached entry; columnar results are read-only."""
+    if isinstance(rows, ColumnarResult):
+        return rows
+    return [dict(row) for row in rows]
+
+class CachedResult(BaseModel):
+    """A cached result set and the table versions it was read at."""
+    model_config = ConfigDict(frozen=True, arbitrary_types_allowed=True)
+
+    rows: Rows
+    tables: Tuple[str, ...]
+    versions: Dict[str, Optional[str]]
+
+class ResultCache:
+    """Caches query results keyed on normalized SQL and parameters.
+
+    Each entry records the tables its query read and their versions at execution
+    time. A lookup re-reads those versions and drops the entry if any table has
+    changed since; entries also expire after their TTL. Results reading no
+    table, or any relation without a change counter, are never cached.
+    """
+
+    def __init__(
+        self,
+        db: SQLDatabase,
+        default_ttl: float = 300.0,
+        max_size: int = 256,
+        probe: Optional[TableVersionProbe] = None
+    ):
+        """Initialize the cache.
+
+        Args:
+            db: Database the cached queries run against
+            default_ttl: Lifetime in seconds of entries stored without their own TTL
+            max_size: Maximum number of result sets kept
+            probe: Optional table version probe; one is created for db if not provided
+        """
+        self.db = db
+        self.probe = probe or TableVersionProbe(db)
+        self._entries: LRUCache[CachedResult] = LRUCache(max_size=max_size, default_ttl=default_ttl)
+
+    @property
+    def stats(self) -> CacheStats:
+        """Hit and miss counters."""
+        return self._entries.stats
+
+    @staticmethod
+    def make_key(query: str, parameters: Optional[Dict[str, Any]] = None) -> Tuple[str, str]:
+        """Build the cache key for a query and its parameters."""
+        return normalize_sql(query), json.dumps(parameters or {}, sort_keys=True, default=str)
+
+    def _lookup(
+        self,
+        key: Tuple[str, str],
+        query: str
+    ) -> Tuple[Optional[Rows], List[str], Dict[str, Optional[str]]]:
+        """Return fresh cached rows, or the tables and versions to store new rows under."""
+        # A hit only counts once the entry is known to be fresh
+        cached = self._entries.get(key, count_hit=False)
+        if cached is not None:
+            versions = self.probe.versions(cached.tables)
+            if versions == cached.versions:
+                self.stats.hits += 1
+                return _copy_rows(cached.rows), list(cached.tables), versions
+            self._entries.pop(key)
+            self.stats.misses += 1
+            self.stats.invalidations += 1
+            tables = list(cached.tables)
+        else:
+            tables = self._versioned_tables(query)
+            versions = self.probe.versions(tables)
+        return None, tables, versions
+
+    def _versioned_tables(self, query: str) -> List[str]:
+        """Tables whose versions decide whether a query's result is fresh.
+
+        Empty when the query reads no table, or any relation without a change
+        counter, e.g. an ignored table, a catalog view or only functions such
+        as ``now()``; such results are not cached.
+        """
+        counted = {name.lower(): name for name in self.probe.counted_tables}
+        sources = source_tables(query)
+        if not sources or any(name not in counted for name in sources):
+            return []
+        tables = set(referenced_tables(query, self.db.get_usable_table_names()))
+        return sorted(tables.union(counted[name] for name in sources))
+
+    def _store(
+        self,
+        key: Tuple[str, str],
+        rows: Rows,
+        tables: List[str],
+        versions: Dict[str, Optional[str]],
+        ttl: Optional[float]
+    ) -> None:
+        if not tables or any(version is None for version in versions.values()):
+            return
+        self._entries.put(
+            key,
+            CachedResult(rows=_copy_rows(rows), tables=tuple(tables), versions=versions),
+            ttl=ttl
+        )
+
+    def get_or_execute(
+        self,
+        query: str,
+        parameters: Optional[Dict[str, Any]],
+        execute: Callable[[], Rows],
+        ttl: Optional[float] = None
+    ) -> Rows:
+        """Return cached rows for a query, or execute it and cache the rows.
+
+        Table versions are read before executing so a write racing the query can
+        only make the entry look stale, never fresh.
+
+        Args:
+            query: SQL text
+            parameters: Query parameters
+            execute: Callable running the query and returning its rows
+            ttl: Optional lifetime in seconds for a new entry
+
+        Returns:
+            The rows, as copies safe to modify unless they are a read-only ColumnarResult
+        """
+        key = self.make_key(query, parameters)
+        rows, tables, versions = self._lookup(key, query)
+        if rows is not None:
+            return rows
+        rows = execute()
+        self._store(key, rows, tables, versions, ttl)
+        return rows
+
+    async def aget_or_execute(
+        self,
+        query: str,
+        parameters: Optional[Dict[str, Any]],
+        execute: Callable[[], Awaitable[Rows]],
+        ttl: Optional[float] = None
+    ) -> Rows:
+        """Async variant of get_or_execute for queries run on an async engine.
+
+        The table version probe still uses the synchronous engine, so it runs on
+        a worker thread to keep the event loop free.
+        """
+        key = self.make_key(query, parameters)
+        rows, tables, versions = await asyncio.to_thread(self._lookup, key, query)
+        if rows is not None:
+            return rows
+        rows = await execute()
+        self._store(key, rows, tables, versions, ttl)
+        return rows
+
+    def invalidate_tables(self, tables: Iterable[str]) -> int:
+        """Drop every entry that read one of the given tables.
+
+        Args:
+            tables: Names of tables that were written
+
+        Returns:
+            int: Number of entries dropped
+        """
+        written = set(tables)
+        dropped = 0
+        for key, entry in self._entries.items():
+            if written.intersection(entry.tables):
+                self._entries.pop(key)
+                dropped += 1
+        self.stats.invalidations += dropped
+        return dropped
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        self._entries.clear()
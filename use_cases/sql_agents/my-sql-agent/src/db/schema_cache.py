@@ -0,0 +1,225 @@
+"""
+Schema introspection cache that is rebuilt only when the database catalog changes.
+"""
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from langchain_community.utilities import SQLDatabase
+from sqlalchemy import text
+
+from .schema_index import SchemaIndex
+
+# Fingerprint of every column and constraint in the schema; any DDL changes it
+POSTGRES_CATALOG_PROBE = """
+SELECT md5(
+    coalesce(string_agg(
+        c.relname || '.' || a.attname || ':' || a.atttypid::text || ':'
+        || a.attnum::text || ':' || a.attnotnull::text,
+        ',' ORDER BY c.relname, a.attnum
+    ), '')
+    || (SELECT coalesce(string_agg(con.conname || ':' || con.contype::text, ',' ORDER BY con.conname), '')
+        FROM pg_constraint con
+        JOIN pg_namespace cn ON cn.oid = con.connamespace
+        WHERE cn.nspname = coalesce(:schema, current_schema()))
+)
+FROM pg_attribute a
+JOIN pg_class c ON c.oid = a.attrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = coalesce(:schema, current_schema())
+  AND c.relkind IN ('r', 'v', 'm', 'p', 'f')
+  AND a.attnum > 0
+  AND NOT a.attisdropped
+"""
+
+# SQLite bumps this counter on every schema change
+SQLITE_CATALOG_PROBE = "PRAGMA schema_version"
+
+def reload_database(db: SQLDatabase) -> SQLDatabase:
+    """Reflect a database again with the same options as the given instance.
+
+    Args:
+        db: The database whose reflection is stale
+
+    Returns:
+        SQLDatabase: A freshly reflected database on the same engine
+    """
+    return SQLDatabase(
+        engine=db._engine,
+        schema=db._schema,
+        include_tables=sorted(db._include_tables) or None,
+        ignore_tables=sorted(db._ignore_tables) or None,
+        sample_rows_in_table_info=db._sample_rows_in_table_info,
+        indexes_in_table_info=db._indexes_in_table_info,
+        custom_table_info=db._custom_table_info,
+        view_support=db._view_support,
+        max_string_length=db._max_string_length
+    )
+
+@dataclass(frozen=True)
+class SchemaSnapshot:
+    """The schema as the cache saw it after one catalog probe.
+
+    Taking a snapshot once per question gives the SQL cache lookup, the schema
+    description and storing the generated SQL the same fingerprint without
+    probing the catalog for each of them.
+    """
+    fingerprint: str
+    table_info: Dict[str, str]
+    index: Optional[SchemaIndex] = None
+
+    def get_table_info(self, table_names: Optional[List[str]] = None) -> str:
+        """Get the schema description for some or all tables, as SchemaCache.get_table_info."""
+        names = table_names if table_names is not None else list(self.table_info)
+        return "\n\n".join(self.table_info[name] for name in names if name in self.table_info)
+
+class SchemaCache:
+    """Caches per-table schema descriptions until the catalog version changes.
+
+    Each lookup runs a cheap catalog probe (at most once per ``probe_interval``
+    seconds) and only reflects the database and samples rows again when the probe
+    result differs from the one the cache was built with. Dialects without a probe
+    are built once and refreshed only through ``invalidate()``. Sample rows in the
+    descriptions are therefore as old as the last catalog change.
+    """
+
+    def __init__(self, db: SQLDatabase, probe_interval: float = 0.0):
+        """Initialize the cache.
+
+        Args:
+            db: Database to describe
+            probe_interval: Minimum seconds between catalog probes
+        """
+        self.db = db
+        self.probe_interval = probe_interval
+        self.hits = 0
+        self.rebuilds = 0
+        self._table_info: Dict[str, str] = {}
+        self._index: Optional[SchemaIndex] = None
+        self._fingerprint = ""
+        self._version: Optional[str] = None
+        self._built = False
+        self._probed_at = 0.0
+        self._lock = threading.Lock()
+
+    def catalog_version(self) -> Optional[str]:
+        """Probe the current catalog version.
+
+        Returns:
+            Optional[str]: A value that changes with every DDL change, or None if
+            the dialect has no supported probe
+        """
+        dialect = self.db.dialect
+        with self.db._engine.connect() as conn:
+            if dialect == "postgresql":
+                return conn.execute(text(POSTGRES_CATALOG_PROBE), {"schema": self.db._schema}).scalar()
+            if dialect == "sqlite":
+                return str(conn.exec_driver_sql(SQLITE_CATALOG_PROBE).scalar())
+        return None
+
+    def _rebuild(self, version: Optional[str]) -> None:
+        if self._built:
+            # The reflected metadata is stale too, not just the descriptions
+            self.db = reload_database(self.db)
+        self._table_info = {
+            name: self.db.get_table_info([name])
+            for name in sorted(self.db.get_usable_table_names())
+        }
+        self._index = None
+        self._fingerprint = self._compute_fingerprint()
+        self._version = version
+        self._built = True
+        self.rebuilds += 1
+
+    def _compute_fingerprint(self) -> str:
+        """Hash the reflected tables, columns and column types."""
+        digest = hashlib.sha256(self.db.dialect.encode())
+        for table in sorted(self.db._metadata.tables.values(), key=lambda t: t.name):
+            if table.name not in self._table_info:
+                continue
+            for column in table.columns:
+                digest.update(f"{table.name}.{column.name}:{column.type!r}\n".encode())
+        return digest.hexdigest()
+
+    def _refresh(self) -> None:
+        now = time.monotonic()
+        if self._built and now - self._probed_at < self.probe_interval:
+            self.hits += 1
+            return
+        version = self.catalog_version()
+        self._probed_at = now
+        if self._built and version == self._version:
+            self.hits += 1
+            return
+        self._rebuild(version)
+
+    def prewarm(self) -> None:
+        """Build the cache now, e.g. at application startup."""
+        with self._lock:
+            self._rebuild(self.catalog_version())
+            self._probed_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        """Force a rebuild on the next lookup."""
+        with self._lock:
+            self._version = None
+            self._probed_at = 0.0
+            if self._built:
+                self.db = reload_database(self.db)
+                self._built = False
+
+    @property
+    def table_names(self) -> List[str]:
+        """Names of the tables currently described by the cache."""
+        with self._lock:
+            self._refresh()
+            return list(self._table_info)
+
+    @property
+    def fingerprint(self) -> str:
+        """Content hash of the current schema, stable across processes."""
+        with self._lock:
+            self._refresh()
+            return self._fingerprint
+
+    def _get_index(self) -> SchemaIndex:
+        if self._index is None:
+            self._index = SchemaIndex.from_metadata(self.db._metadata, self._table_info)
+        return self._index
+
+    @property
+    def index(self) -> SchemaIndex:
+        """Relevance index over the tables currently described by the cache."""
+        with self._lock:
+            self._refresh()
+            return self._get_index()
+
+    def snapshot(self, with_index: bool = False) -> SchemaSnapshot:
+        """Probe the catalog once and capture the current schema.
+
+        Args:
+            with_index: Whether to include the relevance index
+
+        Returns:
+            SchemaSnapshot: Fingerprint, table descriptions and optionally the index
+        """
+        with self._lock:
+            self._refresh()
+            return SchemaSnapshot(
+                fingerprint=self._fingerprint,
+                table_info=self._table_info,
+                index=self._get_index() if with_index else None
+            )
+
+    def get_table_info(self, table_names: Optional[List[str]] = None) -> str:
+        """Get the schema description for some or all tables.
+
+        Args:
+            table_names: Optional tables to describe; defaults to all usable tables
+
+        Returns:
+            str: Table descriptions in the format of SQLDatabase.get_table_info
+        """
+        return self.snapshot().get_table_info(table_names)
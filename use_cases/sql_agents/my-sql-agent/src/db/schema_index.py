@@ -0,0 +1,175 @@
+"""
+BM25 index over table names, column names and comments for schema pruning.
+"""
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import MetaData, Table
+
+# Repetitions of each source in a table's document, i.e. its relative weight
+TABLE_NAME_WEIGHT = 3
+COLUMN_NAME_WEIGHT = 2
+COMMENT_WEIGHT = 1
+
+def tokenize(text: str) -> List[str]:
+    """Split text and identifiers into lowercase, singular word tokens.
+
+    Args:
+        text: Free text or an identifier such as ``customerOrders`` or ``order_items``
+
+    Returns:
+        List[str]: The tokens
+    """
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text or "")
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if len(word) > 3 and word.endswith("ies"):
+            word = word[:-3] + "y"
+        elif len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+class SchemaIndex:
+    """Ranks tables by BM25 relevance to a question and expands them with FK neighbours."""
+
+    def __init__(
+        self,
+        documents: Dict[str, List[str]],
+        neighbours: Dict[str, Set[str]],
+        k1: float = 1.5,
+        b: float = 0.75
+    ):
+        """Initialize the index.
+
+        Args:
+            documents: Tokens describing each table, keyed by table name
+            neighbours: Tables linked to each table by a foreign key in either direction
+            k1: BM25 term frequency saturation
+            b: BM25 document length normalization
+        """
+        self.neighbours = neighbours
+        self.k1 = k1
+        self.b = b
+        self._term_counts = {name: Counter(tokens) for name, tokens in documents.items()}
+        self._lengths = {name: len(tokens) for name, tokens in documents.items()}
+        self._avg_length = (sum(self._lengths.values()) / len(documents)) if documents else 0.0
+        document_frequency = Counter(
+            term for counts in self._term_counts.values() for term in counts
+        )
+        total = len(documents)
+        self._idf = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+
+    @classmethod
+    def from_metadata(cls, metadata: MetaData, table_names: Iterable[str]) -> "SchemaIndex":
+        """Build an index from reflected SQLAlchemy metadata.
+
+        Args:
+            metadata: Reflected metadata containing the tables
+            table_names: Names of the tables to index
+
+        Returns:
+            SchemaIndex: The index
+        """
+        wanted = set(table_names)
+        tables: Dict[str, Table] = {
+            table.name: table for table in metadata.tables.values() if table.name in wanted
+        }
+        documents: Dict[str, List[str]] = {}
+        neighbours: Dict[str, Set[str]] = {name: set() for name in tables}
+        for name, table in tables.items():
+            tokens = tokenize(name) * TABLE_NAME_WEIGHT
+            tokens += tokenize(table.comment or "") * COMMENT_WEIGHT
+            for column in table.columns:
+                tokens += tokenize(column.name) * COLUMN_NAME_WEIGHT
+                tokens += tokenize(column.comment or "") * COMMENT_WEIGHT
+            documents[name] = tokens
+
+            for foreign_key in table.foreign_keys:
+                referred = foreign_key.column.table.name
+                if referred in tables and referred != name:
+                    neighbours[name].add(referred)
+                    neighbours[referred].add(name)
+        return cls(documents, neighbours)
+
+    @property
+    def table_names(self) -> List[str]:
+        """Names of the indexed tables."""
+        return list(self._term_counts)
+
+    def score(self, question: str) -> Dict[str, float]:
+        """Score every table against a question.
+
+        Args:
+            question: The natural language question
+
+        Returns:
+            Dict[str, float]: BM25 score per table, zero for unrelated tables
+        """
+        terms = set(tokenize(question))
+        scores = {}
+        for name, counts in self._term_counts.items():
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[name] / (self._avg_length or 1))
+            scores[name] = sum(
+                self._idf[term] * counts[term] * (self.k1 + 1) / (counts[term] + norm)
+                for term in terms if term in counts
+            )
+        return scores
+
+    def select(
+        self,
+        question: str,
+        top_k: int = 8,
+        include_neighbours: bool = True,
+        max_neighbours: int = 3,
+        max_tables: Optional[int] = None
+    ) -> List[str]:
+        """Pick the tables relevant to a question.
+
+        The ``top_k`` best scoring tables are kept and, optionally, up to
+        ``max_neighbours`` tables one foreign key away from each of them, best
+        scoring neighbours first. If no table matches the question at all, the
+        ``top_k`` most connected tables are returned without neighbours, as a
+        hub's neighbours can be most of the schema.
+
+        Args:
+            question: The natural language question
+            top_k: Number of tables to keep before adding neighbours
+            include_neighbours: Whether to add the FK neighbours of the kept tables
+            max_neighbours: Most neighbours added for each kept table
+            max_tables: Most tables returned in total; without it at most
+                ``top_k * (1 + max_neighbours)``
+
+        Returns:
+            List[str]: The selected table names, best match first
+        """
+        if max_tables is None:
+            max_tables = top_k * (1 + max_neighbours)
+        scores = self.score(question)
+        ranked = sorted(
+            (name for name, score in scores.items() if score > 0),
+            key=lambda name: (-scores[name], name)
+        )[:top_k]
+        if not ranked:
+            include_neighbours = False
+            ranked = sorted(
+                self._term_counts, key=lambda name: (-len(self.neighbours[name]), name)
+            )[:top_k]
+
+        selected = ranked[:max_tables]
+        if include_neighbours:
+            for name in ranked:
+                neighbours = sorted(
+                    (neighbour for neighbour in self.neighbours[name] if neighbour not in selected),
+                    key=lambda neighbour: (-scores[neighbour], neighbour)
+                )
+                for neighbour in neighbours[:max_neighbours]:
+                    if len(selected) >= max_tables:
+                        return selected
+                    selected.append(neighbour)
+        return selected
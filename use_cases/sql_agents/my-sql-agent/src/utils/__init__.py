@@ -0,0 +1,3 @@
+"""
+Helper utilities shared by the agent and database modules.
+"""
@@ -0,0 +1,185 @@
+"""
+Generic in-memory cache building blocks.
+"""
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Generic, Hashable, Optional, Tuple, TypeVar, Union
+
+from pydantic import BaseModel
+
+V = TypeVar("V")
+
+class CacheStats(BaseModel):
+    """Hit and miss counters for a cache."""
+    hits: int = 0
+    misses: int = 0
+    disk_hits: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+class LRUCache(Generic[V]):
+    """Thread-safe LRU cache whose entries may each carry their own TTL."""
+
+    def __init__(self, max_size: int = 1024, default_ttl: Optional[float] = None):
+        """Initialize the cache.
+
+        Args:
+            max_size: Maximum number of entries kept
+            default_ttl: Lifetime in seconds of entries stored without a TTL;
+                None keeps them until evicted
+        """
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[Hashable, Tuple[V, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, count_hit: bool = True) -> Optional[V]:
+        """Return the live value for a key, or None on a miss.
+
+        Args:
+            key: Cache key
+            count_hit: Whether to count a found value as a hit; callers that
+                validate the value first count the hit themselves
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or time.monotonic() < expires_at:
+                    self._entries.move_to_end(key)
+                    if count_hit:
+                        self.stats.hits += 1
+                    return value
+                del self._entries[key]
+                self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: V, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entries if full."""
+        ttl = ttl if ttl is not None else self.default_ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def pop(self, key: Hashable) -> Optional[V]:
+        """Remove a key and return its value, if present."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[0] if entry is not None else None
+
+    def items(self):
+        """Snapshot of the cached keys and values."""
+        with self._lock:
+            return [(key, value) for key, (value, _) in self._entries.items()]
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class SQLiteStore:
+    """Persistent string key/value store in a SQLite file, with per-read TTLs.
+
+    Tables from older releases that named the value column after its content
+    (``plan`` in PlanCache files) are migrated in place on open; tables in any
+    other layout are dropped and rebuilt, since they only hold cached data.
+    """
+
+    def __init__(self, path: Union[str, Path], table: str):
+        """Open or create the store.
+
+        Args:
+            path: SQLite file to store entries in
+            table: Name of the table holding the entries
+        """
+        self.path = Path(path)
+        self.table = table
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = sqlite3.connect(
+            str(self.path), check_same_thread=False
+        )
+        self._migrate()
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _migrate(self) -> None:
+        """Bring an existing table written by an older layout to (key, value, created_at)."""
+        columns = [row[1] for row in self._conn.execute(f"PRAGMA table_info({self.table})")]
+        if not columns or "value" in columns:
+            return
+        others = [column for column in columns if column not in ("key", "created_at")]
+        if len(columns) == 3 and len(others) == 1:
+            self._conn.execute(f"ALTER TABLE {self.table} RENAME COLUMN {others[0]} TO value")
+        else:
+            self._conn.execute(f"DROP TABLE {self.table}")
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """Return the stored value and its creation time, if present."""
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+
+    def put(self, key: str, value: str, created_at: Optional[float] = None) -> None:
+        """Store a value, replacing any previous one."""
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at) VALUES (?, ?, ?)",
+                (key, value, created_at if created_at is not None else time.time())
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        """Remove a key."""
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def retain_prefix(self, prefix: str) -> int:
+        """Remove every key not starting with a prefix.
+
+        Returns:
+            int: Number of entries removed
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE substr(key, 1, ?) != ?", (len(prefix), prefix)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the underlying connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -2,8 +2,14 @@
 Test configuration and fixtures.
 """
 import os
+from typing import List
+
 import pytest
 from dotenv import load_dotenv
+from langchain_community.utilities import SQLDatabase
+from sqlalchemy import Connection, create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import StaticPool
 
 @pytest.fixture(autouse=True)
 def setup_test_env():
@@ -18,4 +24,71 @@ def setup_test_env():
         "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "test-key")
     })
     
-    yield 
\ No newline at end of file
+    yield 
+
+def create_change_counters(conn: Connection, tables: List[str]) -> None:
+    """Create the trigger-fed write counters of sql/init.sql for SQLite tables."""
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS table_change_counters "
+        "(table_name TEXT PRIMARY KEY, version BIGINT NOT NULL DEFAULT 0)"
+    )
+    for table in tables:
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            conn.exec_driver_sql(
+                f"CREATE TRIGGER {table}_{event.lower()}_change_counter AFTER {event} ON {table} "
+                f"BEGIN INSERT INTO table_change_counters (table_name, version) VALUES ('{table}', 1) "
+                "ON CONFLICT (table_name) DO UPDATE SET version = version + 1; END"
+            )
+
+def create_sales_tables(engine: Engine) -> None:
+    """Create and seed the sales tables on a SQLite engine."""
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE customers (customer_id INTEGER PRIMARY KEY, name TEXT NOT NULL, "
+            "email TEXT NOT NULL UNIQUE, created_at TIMESTAMP, updated_at TIMESTAMP)"
+        )
+        conn.exec_driver_sql(
+            "CREATE TABLE products (product_id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, "
+            "description TEXT, price REAL NOT NULL, created_at TIMESTAMP, updated_at TIMESTAMP)"
+        )
+        conn.exec_driver_sql(
+            "CREATE TABLE sales (sale_id INTEGER PRIMARY KEY, "
+            "customer_id INTEGER NOT NULL REFERENCES customers(customer_id), "
+            "date TIMESTAMP NOT NULL, sales_amount REAL NOT NULL, revenue REAL NOT NULL, "
+            "product_name TEXT NOT NULL REFERENCES products(name), created_at TIMESTAMP)"
+        )
+        create_change_counters(conn, ["customers", "products", "sales"])
+        conn.exec_driver_sql(
+            "INSERT INTO customers (name, email) VALUES "
+            "('John Doe', 'john@example.com'), ('Jane Smith', 'jane@example.com'), "
+            "('Bob Wilson', 'bob@example.com')"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO products (name, description, price) VALUES "
+            "('Product A', 'High quality product A', 100.0), "
+            "('Product B', 'Premium product B', 200.0)"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO sales (customer_id, date, sales_amount, revenue, product_name) VALUES "
+            "(1, '2024-01-05 00:00:00', 100.0, 20.0, 'Product A'), "
+            "(2, '2024-02-10 00:00:00', 200.0, 50.0, 'Product B'), "
+            "(1, '2024-03-15 00:00:00', 100.0, 25.0, 'Product A')"
+        )
+
+@pytest.fixture
+def sqlite_db() -> SQLDatabase:
+    """Create an in-memory SQLite stand-in for the sales database."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    create_sales_tables(engine)
+    return SQLDatabase(engine, ignore_tables=["table_change_counters"])
+
+@pytest.fixture
+def sqlite_file_db(tmp_path) -> SQLDatabase:
+    """Create a file-backed SQLite stand-in that an async engine can open too."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'sales.db'}")
+    create_sales_tables(engine)
+    return SQLDatabase(engine, ignore_tables=["table_change_counters"])
@@ -8,13 +8,19 @@ from pathlib import Path
 
 pytestmark = pytest.mark.asyncio
 
-from src.agent.base import QueryAgent
+from src.agent.base import QueryAgent, QueryResult
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
 from src.agent.query_classifier import (
     OperationType,
     QueryPlanner,
     QueryStep,
-    QueryPlan
+    QueryPlan,
+    match_rules
 )
+from src.agent.plan_cache import PlanCache
 from src.config.llm_config import LLMConfig, LLMProvider, OpenAISettings
 
 # Create test config
@@ -118,4 +124,131 @@ async def test_query_planner(query: str, expected_type: OperationType,
         # Data retrieval should always be first for multi-step operations
         assert result.operations[0].operation_type == OperationType.DATA_RETRIEVAL
         # The primary operation should be last
-        assert result.operations[-1].operation_type == expected_type
\ No newline at end of file
+        assert result.operations[-1].operation_type == expected_type
+
+@pytest.mark.parametrize("query,expected_type,expected_fields,expected_ops", TEST_QUERIES)
+async def test_rule_match(query: str, expected_type: OperationType,
+                          expected_fields: List[str], expected_ops: int):
+    """Test that the local rules plan unambiguous queries with full confidence."""
+    match = match_rules(query)
+    assert match.confidence == 1.0
+    assert match.plan.primary_operation == expected_type
+    assert len(match.plan.operations) == expected_ops
+    assert match.plan.operations[-1].operation_type == expected_type
+    for field in expected_fields:
+        assert field in match.plan.operations[0].required_fields
+
+async def test_rule_match_ambiguous():
+    """Test that conflicting or missing rules lower the confidence."""
+    assert match_rules("Show me a chart of sales by month").confidence < 0.75
+    assert match_rules("Who bought the most?").confidence == 0.0
+
+def fake_planner_llm(calls: List[int]) -> RunnableLambda:
+    """Create a runnable that answers like the function-calling planner LLM."""
+    def respond(_):
+        calls.append(1)
+        return AIMessage(content="", additional_kwargs={"function_call": {
+            "name": "plan_query",
+            "arguments": QueryPlan(
+                primary_operation=OperationType.DATA_VISUALIZATION,
+                operations=[
+                    QueryStep(operation_type=OperationType.DATA_RETRIEVAL,
+                              description="Get sales", required_fields=["sales_amount"]),
+                    QueryStep(operation_type=OperationType.DATA_VISUALIZATION,
+                              description="Chart sales", required_fields=["sales_amount"])
+                ]
+            ).model_dump_json()
+        }})
+    return RunnableLambda(respond)
+
+async def test_planner_skips_llm_for_rule_matches():
+    """Test that the planner only calls the LLM for ambiguous queries."""
+    calls = []
+    planner = QueryPlanner(config=TEST_CONFIG)
+    planner.chain = fake_planner_llm(calls)
+    
+    plan = await planner.plan("Get me all sales data from last month")
+    assert plan.primary_operation == OperationType.DATA_RETRIEVAL
+    assert calls == []
+    
+    plan = await planner.plan("Show me a chart of sales by month")
+    assert plan.primary_operation == OperationType.DATA_VISUALIZATION
+    assert calls == [1]
+
+async def test_planner_uses_cache():
+    """Test that repeated ambiguous queries are served from the plan cache."""
+    calls = []
+    planner = QueryPlanner(config=TEST_CONFIG, cache=PlanCache())
+    planner.chain = fake_planner_llm(calls)
+    
+    first = await planner.plan("Show me a chart of sales by month")
+    second = await planner.plan("show me a chart of sales by month!")
+    assert first == second
+    assert calls == [1]
+    assert planner.cache.stats.hits == 1
+
+async def test_single_call_mode():
+    """Test that single-call mode plans and implements with one LLM call."""
+    calls = []
+    agent = QueryAgent(config=LLMConfig.openai(api_key="test-key"), single_call=True)
+    plan = match_rules("Create a bar chart of monthly sales").plan
+    
+    def combined(inputs):
+        calls.append("combined")
+        return QueryResult(plan=plan, implementation="plt.bar(df['date'], df['sales_amount'])")
+    
+    def implementation(inputs):
+        calls.append("implementation")
+        return AIMessage(content=f"code for {inputs['primary_operation']}")
+    
+    agent.single_call_chain = RunnableLambda(combined)
+    agent.chain = RunnableLambda(implementation)
+    
+    result = await agent.process_query_with_plan("Which customers spend the most?")
+    assert result.plan == plan
+    assert calls == ["combined"]
+    
+    # Locally planned queries skip straight to the implementation call
+    response = await agent.process_query("Get me all sales data from last month")
+    assert response == "code for DATA_RETRIEVAL"
+    assert calls == ["combined", "implementation"]
+
+async def test_astream_query():
+    """Test that the plan arrives first, followed by tokens and timings."""
+    agent = QueryAgent(config=LLMConfig.openai(api_key="test-key"))
+    agent.chain = agent.prompt | GenericFakeChatModel(
+        messages=iter([AIMessage(content="df = pd.read_sql(query, conn)")])
+    )
+    
+    events = [event async for event in agent.astream_query("Get me all sales data from last month")]
+    assert events[0].kind == "plan"
+    assert events[0].plan.primary_operation == OperationType.DATA_RETRIEVAL
+    assert events[-1].kind == "done"
+    
+    tokens = [event.token for event in events if event.kind == "token"]
+    assert len(tokens) > 1
+    assert "".join(tokens) == "df = pd.read_sql(query, conn)"
+    
+    timings = events[-1].timings
+    assert timings.token_count == len(tokens)
+    assert timings.plan_seconds <= timings.first_token_seconds <= timings.total_seconds
+
+async def test_process_queries():
+    """Test that batch processing keeps input order and isolates failures."""
+    agent = QueryAgent(config=LLMConfig.openai(api_key="test-key"))
+    
+    def implementation(inputs):
+        if "broken" in inputs["query"]:
+            raise RuntimeError("model unavailable")
+        return AIMessage(content=f"{inputs['primary_operation']}: {inputs['query']}")
+    
+    agent.chain = RunnableLambda(implementation)
+    responses = await agent.process_queries([
+        "Get me all sales data from last month",
+        "Get the broken sales report",
+        "Create a bar chart of monthly sales",
+    ], max_concurrency=2)
+    
+    assert responses[0] == "DATA_RETRIEVAL: Get me all sales data from last month"
+    assert responses[1] == "Error processing query: model unavailable"
+    assert responses[2] == "DATA_VISUALIZATION: Create a bar chart of monthly sales"
@@ -0,0 +1,47 @@
+"""
+Tests for the offline benchmark harness.
+"""
+import random
+
+import pytest
+
+from benchmarks.database import create_benchmark_engine, split_statements
+from benchmarks.fake_llm import LatencyModel
+from benchmarks.run import compare, run_benchmark
+
+def test_sqlite_stand_in_is_seeded_from_scripts():
+    """Test that the PostgreSQL seed scripts load into SQLite."""
+    assert len(split_statements("CREATE FUNCTION f() AS $$ BEGIN x; END; $$; SELECT 1;")) == 2
+    engine = create_benchmark_engine()
+    with engine.connect() as conn:
+        counts = {
+            table: conn.exec_driver_sql(f"SELECT COUNT(*) FROM {table}").scalar()
+            for table in ("customers", "products", "sales")
+        }
+    assert counts["customers"] == 3 and counts["products"] == 3
+    assert counts["sales"] > 0
+
+def test_latency_model():
+    """Test that latency specs parse and sample reproducibly."""
+    model = LatencyModel.from_spec("lognormal:0.1:0.25")
+    assert (model.distribution, model.median, model.spread) == ("lognormal", 0.1, 0.25)
+    assert model.sample(random.Random(1)) == model.sample(random.Random(1))
+    assert LatencyModel.from_spec("constant:0.05").sample(random.Random()) == 0.05
+    with pytest.raises(ValueError):
+        LatencyModel.from_spec("bimodal")
+
+@pytest.mark.asyncio
+async def test_run_benchmark():
+    """Test that both agents are measured at every level without errors."""
+    report = await run_benchmark(
+        concurrency=(1, 3), requests=6, latency=LatencyModel(distribution="constant", median=0.0)
+    )
+    assert [(result.agent, result.concurrency) for result in report.results] == [
+        ("query_agent", 1), ("query_agent", 3), ("sql_agent", 1), ("sql_agent", 3)
+    ]
+    for result in report.results:
+        assert result.errors == 0
+        assert result.latency.count == 6
+        assert result.latency.p50 <= result.latency.p99
+    assert "sql_agent.db_execution" in report.results[-1].stages
+    assert len(compare(report, report)) == 4
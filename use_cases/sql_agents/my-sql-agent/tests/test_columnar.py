@@ -0,0 +1,67 @@
+"""
+Tests for the columnar result representation.
+"""
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from src.db.columnar import ColumnarResult
+
+ROWS = [
+    (1, 10.5, datetime(2024, 1, 1), "John Doe"),
+    (2, None, datetime(2024, 1, 2, 3, 4, 5, 6, tzinfo=timezone.utc), None),
+]
+COLUMNS = ["customer_id", "revenue", "sale_date", "name"]
+
+def test_columns_are_typed_arrays():
+    """Test that numeric columns without nulls become native arrays."""
+    result = ColumnarResult.from_rows(COLUMNS, ROWS)
+    assert result.columns == COLUMNS
+    assert result.column("customer_id").dtype == np.int64
+    assert result.column("revenue").dtype == object
+    with pytest.raises(ValueError):
+        result.column("customer_id")[0] = 5
+
+def test_row_view_matches_dict_rows():
+    """Test that the result still reads like the old list of dict rows."""
+    result = ColumnarResult.from_rows(COLUMNS, ROWS)
+    expected = [
+        {"customer_id": 1, "revenue": 10.5, "sale_date": "2024-01-01T00:00:00", "name": "John Doe"},
+        {"customer_id": 2, "revenue": None, "sale_date": "2024-01-02T03:04:05.000006+00:00", "name": None},
+    ]
+    assert len(result) == 2
+    assert result == expected
+    assert result[1] == expected[1]
+    assert result[:1] == expected[:1]
+    assert result.to_pylist() == expected
+    assert type(result[0]["customer_id"]) is int
+
+def test_decimal_columns():
+    """Test that NUMERIC values stay exact unless float conversion is requested."""
+    rows = [(Decimal("19.99"), None), (Decimal("5"), Decimal("0.5"))]
+    result = ColumnarResult.from_rows(["amount", "discount"], rows)
+    assert result.column("amount").dtype == object
+    assert result[0] == {"amount": Decimal("19.99"), "discount": None}
+
+    floats = ColumnarResult.from_rows(["amount", "discount"], rows, decimals_as_float=True)
+    assert floats.column("amount").dtype == np.float64
+    assert floats == [{"amount": 19.99, "discount": None}, {"amount": 5.0, "discount": 0.5}]
+    assert type(floats[0]["amount"]) is float
+
+def test_empty_result():
+    """Test that a result without rows keeps its columns and equals an empty list."""
+    result = ColumnarResult.from_rows(COLUMNS, [])
+    assert result == []
+    assert result.columns == COLUMNS
+    assert ColumnarResult.from_dicts([]) == []
+
+def test_to_pandas_shares_numeric_columns():
+    """Test that exporting to pandas does not copy numeric arrays."""
+    pd = pytest.importorskip("pandas")
+    result = ColumnarResult.from_rows(COLUMNS, ROWS)
+    frame = result.to_pandas()
+    assert isinstance(frame, pd.DataFrame)
+    assert list(frame.columns) == COLUMNS
+    assert np.shares_memory(frame["customer_id"].to_numpy(), result.column("customer_id"))
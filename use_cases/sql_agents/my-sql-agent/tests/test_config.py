@@ -1,14 +1,20 @@
 """
 Tests for LLM configuration.
 """
+import os
+
 import pytest
 from src.config.llm_config import (
     LLMConfig, 
     LLMProvider, 
     create_llm,
+    get_llm,
+    clear_llm_cache,
+    get_http_client,
     OllamaSettings,
     OpenAISettings
 )
+from shared.utils import config as toml_config
 
 def test_ollama_config():
     """Test creating Ollama configuration."""
@@ -54,4 +60,82 @@ def test_create_llm_invalid_provider():
         LLMConfig(
             provider="invalid",
             settings=OllamaSettings(model_name="test")
-        ) 
\ No newline at end of file
+        ) 
+
+def test_get_llm_is_shared():
+    """Test that LLM instances are memoized per config and share one HTTP client."""
+    clear_llm_cache()
+    config = LLMConfig.openai(model_name="gpt-4", api_key="test-key")
+    llm = get_llm(config)
+    assert get_llm(LLMConfig.openai(model_name="gpt-4", api_key="test-key")) is llm
+    
+    functions = get_llm(config, model_kwargs={"functions": []})
+    assert functions is not llm
+    assert functions is get_llm(config, model_kwargs={"functions": []})
+    assert get_llm(LLMConfig.openai(model_name="gpt-4o", api_key="test-key")) is not llm
+    
+    # Separately created models still reuse the process-wide connection pool
+    assert create_llm(config).http_client is llm.http_client is get_http_client()
+    # Async clients are tied to an event loop, so each model owns its own
+    assert llm.http_async_client is None
+    
+    clear_llm_cache()
+    assert get_llm(config) is not llm
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_forked_child_gets_new_clients():
+    """Test that a forked process does not reuse the parent's HTTP client or models."""
+    config = LLMConfig.openai(model_name="gpt-4", api_key="test-key")
+    llm = get_llm(config)
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        fresh = get_llm(config) is not llm and get_http_client() is not llm.http_client
+        os.write(write_end, b"1" if fresh else b"0")
+        os._exit(0)
+    os.close(write_end)
+    os.waitpid(pid, 0)
+    assert os.read(read_end, 1) == b"1"
+    os.close(read_end)
+    assert get_llm(config) is llm
+
+CONFIG_TOML = """
+[llm]
+default_provider = "ollama"
+
+[llm.openai]
+model_name = "gpt-4"
+temperature = 0.0
+
+[llm.ollama]
+model_name = "{model}"
+temperature = 0.0
+"""
+
+def test_from_env_reloads_changed_config(tmp_path, monkeypatch):
+    """Test that config.toml is parsed once and again only after it changes."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("LLM_PROVIDER", raising=False)
+    config_path = tmp_path / "config.toml"
+    config_path.write_text(CONFIG_TOML.format(model="mistral"))
+    
+    parses = []
+    parse = toml_config._parse
+    monkeypatch.setattr(toml_config, "_parse", lambda path: parses.append(path) or parse(path))
+    changes = []
+    toml_config.watch_toml(config_path, lambda path, config: changes.append(config["llm"]["ollama"]["model_name"]))
+    
+    assert LLMConfig.from_env().settings.model_name == "mistral"
+    assert LLMConfig.from_env().settings.model_name == "mistral"
+    assert len(parses) == 1
+    
+    config_path.write_text(CONFIG_TOML.format(model="llama3"))
+    # Make sure the change is visible even on filesystems with coarse timestamps
+    os.utime(config_path, ns=(0, config_path.stat().st_mtime_ns + 10**9))
+    assert LLMConfig.from_env().settings.model_name == "llama3"
+    assert len(parses) == 2
+    assert changes == ["llama3"]
+    
+    toml_config.reload_toml(config_path)
+    assert LLMConfig.from_env().settings.model_name == "llama3"
+    assert len(parses) == 3
@@ -0,0 +1,180 @@
+"""
+Tests for the shared engine registry and pool metrics.
+"""
+import json
+import os
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.db import config as db_config
+from shared.db import (
+    AdaptiveQueuePool, ConnectionBudget, PoolAutotuner, adispose_all, dispose_all, get_connection,
+    registered_engines
+)
+from shared.db import connection as registry
+from shared.observability import MetricsRegistry, instrument_pool, pool_snapshot
+
+def test_get_connection_reuses_engine(tmp_path):
+    """Test that the same URL and options share one pooled engine."""
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    engine = get_connection(url)
+    assert get_connection(url) is engine
+    assert get_connection(url, pool_size=2) is not engine
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+    assert engine.pool.checkedin() == 1
+
+    dispose_all()
+    assert engine.pool.checkedin() == 0
+    assert get_connection(url) is engine
+
+def test_get_connection_from_environment(tmp_path, monkeypatch):
+    """Test the SQL_DB_CONNECTION fallback and in-memory SQLite support."""
+    monkeypatch.setenv("SQL_DB_CONNECTION", "sqlite://")
+    engine = get_connection()
+    assert get_connection(os.environ["SQL_DB_CONNECTION"]) is engine
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+
+def test_db_config_uses_registry(tmp_path, monkeypatch):
+    """Test that the agent's engine comes from the shared registry."""
+    url = f"sqlite:///{tmp_path / 'agent.db'}"
+    monkeypatch.setattr(db_config, "create_database_url", lambda driver="": url)
+    engine = db_config.create_db_engine()
+    assert engine is get_connection(url, echo=False, poolclass=AdaptiveQueuePool)
+    # The default pool times its checkouts for the pool metrics
+    with engine.connect():
+        pass
+    assert pool_snapshot(engine).checkout_wait_max is not None
+
+@pytest.mark.asyncio
+async def test_async_db_config_uses_registry(tmp_path, monkeypatch):
+    """Test that the agent's async engine is registered, so it is disposed with the others."""
+    url = f"sqlite+aiosqlite:///{tmp_path / 'agent.db'}"
+    monkeypatch.setattr(db_config, "create_database_url", lambda driver="": url)
+    engine = db_config.create_async_db_engine()
+    assert engine in registered_engines()
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    assert engine.sync_engine.pool.checkedin() == 1
+    await adispose_all()
+    assert engine.sync_engine.pool.checkedin() == 0
+
+def test_fork_hook_does_not_take_the_lock(tmp_path):
+    """Test that the after-fork reset works while the registry lock is held, as it may be at fork time."""
+    engine = get_connection(f"sqlite:///{tmp_path / 'fork.db'}")
+    with engine.connect():
+        pass
+    with registry._LOCK:
+        registry._reset_after_fork()
+    assert engine.pool.checkedin() == 0
+    assert get_connection(f"sqlite:///{tmp_path / 'fork.db'}") is engine
+
+def test_pool_metrics(tmp_path):
+    """Test checkout, wait, timeout and invalidation metrics of an instrumented pool."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'metrics.db'}",
+        poolclass=AdaptiveQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.2
+    )
+    metrics = instrument_pool(engine, name="test-pool", registry=MetricsRegistry())
+    assert instrument_pool(engine) is metrics
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        held = metrics.snapshot()
+        assert held.checked_out == 1
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+        conn.invalidate()
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    snapshot = metrics.snapshot()
+    assert snapshot.pool == "test-pool"
+    assert snapshot.pool_size == 1
+    assert snapshot.checked_out == 0
+    assert snapshot.max_checked_out == 1
+    assert snapshot.checkouts == 2
+    assert snapshot.timeouts == 1
+    assert snapshot.connects == 2
+    assert snapshot.invalidations == 1
+    assert snapshot.connect_latency_p50 is not None
+    # The timed out checkout waited for the pool timeout
+    assert snapshot.checkout_wait_max >= 0.2
+    assert metrics.registry.snapshot()["counters"]["db.pool.checkouts{pool=test-pool}"] == 2
+
+    # The replacement pool of a disposed engine is still timed
+    engine.dispose()
+    with engine.connect():
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+    assert metrics.snapshot().timeouts == 2
+
+@pytest.mark.asyncio
+async def test_async_pool_metrics(tmp_path):
+    """Test that async engines are instrumented through their sync engine."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.db'}")
+    metrics = instrument_pool(engine, registry=MetricsRegistry())
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    assert pool_snapshot(engine).checkouts == 1
+    # Plain pools report no checkout waits; only pools that time themselves do
+    assert pool_snapshot(engine).checkout_wait_max is None
+    assert metrics.snapshot().checked_out == 0
+    await engine.dispose()
+
+def test_autotuner_grows_and_shrinks(tmp_path):
+    """Test that checkout timeouts grow the pool and quiet periods shrink it."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'tuned.db'}",
+        poolclass=AdaptiveQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05
+    )
+    instrument_pool(engine, registry=MetricsRegistry())
+    tuner = PoolAutotuner(engine, max_size=3, step=2, idle_after=60, min_idle=0)
+    assert engine.pool.capacity() == 1
+
+    with engine.connect():
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+    assert tuner.tick(now=0) == 3
+    with engine.connect(), engine.connect(), engine.connect():
+        pass
+
+    # Not quiet for long enough yet, then one step down
+    assert tuner.tick(now=30) == 3
+    assert tuner.tick(now=61) == 1
+    assert engine.pool.checkedin() == 0
+    assert (tuner.grows, tuner.shrinks) == (1, 1)
+
+def test_autotuner_respects_budget(tmp_path):
+    """Test that growth stops at the budget shared with other processes."""
+    budget_file = tmp_path / "budget.json"
+    # Another live worker already holds most of the budget
+    budget_file.write_text(json.dumps({str(os.getppid()): 6}))
+    budget = ConnectionBudget(limit=8, path=budget_file)
+
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'budget.db'}",
+        poolclass=AdaptiveQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05
+    )
+    instrument_pool(engine, registry=MetricsRegistry())
+    tuner = PoolAutotuner(engine, max_size=10, step=4, budget=budget)
+
+    with engine.connect():
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+    assert tuner.tick(now=0) == 2
+    assert budget.claimed() == 8
+
+    tuner.stop()
+    assert budget.claimed() == 6
+
+def test_autotuner_requires_adaptive_pool(tmp_path):
+    """Test that plain QueuePool engines are rejected."""
+    with pytest.raises(TypeError, match="AdaptiveQueuePool"):
+        PoolAutotuner(create_engine(f"sqlite:///{tmp_path / 'plain.db'}"))
@@ -0,0 +1,58 @@
+"""
+Tests for the curated example index.
+"""
+from src.agent.example_index import ExampleIndex, ExampleQuery
+from src.agent.examples import EXAMPLE_QUERIES
+
+def test_exact_and_near_exact_match():
+    """Test that rephrasings match but changed numbers or topics do not."""
+    index = ExampleIndex.from_dict()
+    assert len(index) == len(EXAMPLE_QUERIES)
+    assert index.match("show me the top 5 products by sales amount?").question == (
+        "Show me the top 5 products by sales amount"
+    )
+    assert index.match("Get all sales from the previous month").question == "Get all sales from last month"
+    assert index.match("Show the top 5 products by sales amount") is not None
+    assert index.match("Show me the top 10 products by sales amount") is None
+    assert index.match("List all employees") is None
+
+def test_negated_questions_are_not_served():
+    """Test that questions adding a negation or other words never reuse an example's SQL."""
+    index = ExampleIndex.from_dict()
+    for question in [
+        "Get all sales not from last month",
+        "Get all sales except from last month",
+        "Get all sales excluding last month",
+        "Get all sales without last month",
+        "Get all sales that aren't from last month",
+        "Get all refunded sales from last month",
+    ]:
+        assert index.match(question) is None, question
+    assert index.match("Please get all sales from last month").question == "Get all sales from last month"
+
+def test_questions_dropping_words_are_not_served():
+    """Test that dropping a negation or another word from an example's question is not a match."""
+    index = ExampleIndex([ExampleQuery(
+        question="Which customers did not buy anything last month?",
+        query="SELECT name FROM customers WHERE customer_id NOT IN (SELECT customer_id FROM sales)"
+    )])
+    assert index.match("Which customers did buy anything last month?") is None
+    assert index.match("Which customers did not buy last month?") is None
+    assert index.match("Customers who did not buy anything last month") is None
+    assert index.match("Show which customers did not buy anything last month") is not None
+
+def test_search_ranks_similar_examples():
+    """Test that few-shot search returns the closest examples first."""
+    index = ExampleIndex.from_dict()
+    matches = index.search("average revenue of each customer", top_k=2)
+    assert matches[0].example.question == "What is the average revenue per customer?"
+    assert len(matches) == 2
+    assert matches[0].score >= matches[1].score
+    assert index.search("zebra") == []
+
+def test_add_replaces_same_question():
+    """Test that adding an example for a known question replaces its SQL."""
+    index = ExampleIndex([ExampleQuery(question="Count customers", query="SELECT 1")])
+    index.add(ExampleQuery(question="count customers?", query="SELECT COUNT(*) FROM customers"))
+    assert len(index) == 1
+    assert index.match("Count customers").query == "SELECT COUNT(*) FROM customers"
@@ -0,0 +1,42 @@
+"""
+Import-time budget for the agent package.
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Seconds a cold import of every agent module may take; CI machines can raise it
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_TIME_BUDGET", "1.5"))
+
+# Modules that must only be imported when an agent or engine is actually built
+DEFERRED_MODULES = ["langchain", "langchain_openai", "openai", "langsmith", "numpy", "asyncpg", "psycopg2"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import src.agent.base, src.agent.sql_agent, src.db.config, src.config.settings
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "elapsed": elapsed,
+    "loaded": [name for name in %r if name in sys.modules],
+    "engine_created": src.db.config.get_engine.cache_info().currsize > 0,
+    "config_read": bool(getattr(sys.modules.get("shared.utils.config"), "_CACHE", None)),
+}))
+""" % (DEFERRED_MODULES,)
+
+def test_cold_import_is_cheap():
+    """Test that importing the package builds nothing and stays within budget."""
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=Path(__file__).resolve().parents[1],
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    report = json.loads(output.strip().splitlines()[-1])
+    assert report["loaded"] == []
+    assert not report["engine_created"]
+    assert not report["config_read"]
+    assert report["elapsed"] < IMPORT_BUDGET_SECONDS, f"cold import took {report['elapsed']:.2f}s"
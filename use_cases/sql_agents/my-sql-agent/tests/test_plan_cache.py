@@ -0,0 +1,75 @@
+"""
+Tests for the query plan cache.
+"""
+import sqlite3
+import time
+
+from src.agent.plan_cache import PlanCache, normalize_query
+from src.agent.query_classifier import OperationType, QueryPlan, QueryStep
+
+PLAN = QueryPlan(
+    primary_operation=OperationType.DATA_RETRIEVAL,
+    operations=[QueryStep(
+        operation_type=OperationType.DATA_RETRIEVAL,
+        description="Get sales",
+        required_fields=["sales_amount", "date"]
+    )]
+)
+
+def test_normalize_query():
+    """Test that near-identical queries share a key."""
+    assert normalize_query("Get all sales from last month") == \
+        normalize_query("get all sales from last month?")
+    assert normalize_query("Sales for the previous month") == \
+        normalize_query("sales for last month")
+    assert normalize_query("Revenue over the past three months") == \
+        normalize_query("revenue over last 3 months")
+    assert normalize_query("sales this month") != normalize_query("sales last month")
+
+def test_lru_eviction():
+    """Test that the least recently used entry is evicted."""
+    cache = PlanCache(max_size=2)
+    cache.put("a", PLAN)
+    cache.put("b", PLAN)
+    assert cache.get("a") is not None
+    cache.put("c", PLAN)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats.evictions == 1
+    assert cache.stats.hits == 2
+    assert cache.stats.misses == 1
+
+def test_disk_persistence_and_ttl(tmp_path):
+    """Test that plans survive a new cache instance and expire after the TTL."""
+    path = tmp_path / "plans.sqlite"
+    cache = PlanCache(path=path, ttl_seconds=60)
+    cache.put("Get all sales from last month", PLAN)
+    cache.close()
+
+    reopened = PlanCache(path=path, ttl_seconds=60)
+    assert reopened.get("get all sales from last month?") == PLAN
+    assert reopened.stats.disk_hits == 1
+    reopened.close()
+
+    expired = PlanCache(path=path, ttl_seconds=0)
+    time.sleep(0.01)
+    assert expired.get("Get all sales from last month") is None
+    assert expired.stats.expirations == 1
+    expired.close()
+
+def test_opens_cache_file_of_older_layout(tmp_path):
+    """Test that a plan cache file with the older plan column keeps its entries."""
+    path = tmp_path / "plans.db"
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE plans (key TEXT PRIMARY KEY, plan TEXT NOT NULL, created_at REAL NOT NULL)")
+    conn.execute(
+        "INSERT INTO plans (key, plan, created_at) VALUES (?, ?, ?)",
+        (normalize_query("Get sales"), PLAN.model_dump_json(), time.time())
+    )
+    conn.commit()
+    conn.close()
+
+    cache = PlanCache(path=path)
+    assert cache.get("get sales") == PLAN
+    cache.put("Get customers", PLAN)
+    assert PlanCache(path=path).get("Get customers") == PLAN
@@ -0,0 +1,111 @@
+"""
+Tests for the executed-SQL result cache.
+"""
+from langchain_community.utilities import SQLDatabase
+
+from src.db.result_cache import ResultCache, normalize_sql, referenced_tables, source_tables
+
+QUERY = "SELECT customer_id, SUM(revenue) AS total FROM sales GROUP BY customer_id"
+
+def test_normalize_sql():
+    """Test that formatting differences share a key but literals do not."""
+    assert normalize_sql("SELECT *\n  FROM Sales -- all rows\n;") == "select * from sales"
+    assert normalize_sql("select * from sales where name = 'Bob'") != \
+        normalize_sql("select * from sales where name = 'BOB'")
+
+def test_referenced_tables():
+    """Test that only known tables are recorded."""
+    assert referenced_tables(
+        "SELECT c.name FROM customers c JOIN sales s ON s.customer_id = c.customer_id",
+        ["customers", "products", "sales"]
+    ) == ["customers", "sales"]
+
+def test_source_tables():
+    """Test that FROM and JOIN relations are found, without CTE names or schema prefixes."""
+    assert source_tables(
+        'WITH t AS (SELECT * FROM sales) SELECT * FROM t JOIN public."Customers" c ON true, products'
+    ) == ["sales", "customers", "products"]
+    assert source_tables("SELECT now()") == []
+
+def test_cache_invalidated_by_writes(sqlite_db: SQLDatabase):
+    """Test that a write to a table read by an entry invalidates it."""
+    cache = ResultCache(sqlite_db)
+    calls = []
+
+    def execute():
+        calls.append(1)
+        return sqlite_db._execute(QUERY)
+
+    first = cache.get_or_execute(QUERY, {}, execute)
+    assert cache.get_or_execute(QUERY.lower() + ";", {}, execute) == first
+    assert len(calls) == 1
+
+    # Writes to tables the query does not read keep the entry
+    sqlite_db._execute("INSERT INTO products (name, price, created_at) VALUES ('Product Z', 1.0, '2024-06-01')")
+    cache.get_or_execute(QUERY, {}, execute)
+    assert len(calls) == 1
+
+    sqlite_db._execute(
+        "INSERT INTO sales (customer_id, date, sales_amount, revenue, product_name, created_at) "
+        "VALUES (3, '2024-04-01', 10.0, 5.0, 'Product A', '2024-04-01')"
+    )
+    rows = cache.get_or_execute(QUERY, {}, execute)
+    assert len(calls) == 2
+    assert len(rows) == 3
+    assert cache.stats.invalidations == 1
+
+def test_per_entry_ttl_and_explicit_invalidation(sqlite_db: SQLDatabase):
+    """Test per-entry TTLs and dropping entries by table."""
+    cache = ResultCache(sqlite_db)
+    execute = lambda: sqlite_db._execute(QUERY)
+    cache.get_or_execute(QUERY, {}, execute, ttl=0)
+    cache.get_or_execute(QUERY, {}, execute)
+    assert cache.stats.expirations == 1
+
+    assert cache.invalidate_tables(["customers"]) == 0
+    assert cache.invalidate_tables(["sales"]) == 1
+
+def test_tables_without_counters_are_not_cached(sqlite_db: SQLDatabase):
+    """Test that results reading a table no trigger counts are never served from the cache."""
+    sqlite_db._execute("CREATE TABLE notes (note_id INTEGER PRIMARY KEY, body TEXT)")
+    db = SQLDatabase(sqlite_db._engine)
+    cache = ResultCache(db)
+    calls = []
+
+    def execute():
+        calls.append(1)
+        return db._execute("SELECT body FROM notes")
+
+    cache.get_or_execute("SELECT body FROM notes", {}, execute)
+    cache.get_or_execute("SELECT body FROM notes", {}, execute)
+    assert len(calls) == 2
+    assert cache.stats.hits == 0
+
+def test_untracked_relations_are_not_cached(sqlite_db: SQLDatabase):
+    """Test that queries reading no table or a table outside the database's tables are not cached."""
+    sqlite_db._execute("CREATE TABLE audit_log (entry_id INTEGER PRIMARY KEY, body TEXT)")
+    db = SQLDatabase(sqlite_db._engine, include_tables=["customers", "products", "sales"])
+    cache = ResultCache(db)
+    count = "SELECT COUNT(*) AS entries FROM audit_log"
+    assert cache.get_or_execute(count, {}, lambda: db._execute(count)) == [{"entries": 0}]
+    db._execute("INSERT INTO audit_log (body) VALUES ('login')")
+    assert cache.get_or_execute(count, {}, lambda: db._execute(count)) == [{"entries": 1}]
+    # Joining a tracked table does not make the untracked one safe to cache
+    joined = "SELECT COUNT(*) AS entries FROM sales JOIN audit_log ON 1 = 1"
+    cache.get_or_execute(joined, {}, lambda: db._execute(joined))
+    cache.get_or_execute("SELECT 1 AS one", {}, lambda: [{"one": 1}])
+    assert len(cache._entries) == 0
+
+def test_stale_entry_is_not_counted_as_hit(sqlite_db: SQLDatabase):
+    """Test that only validated entries count as hits."""
+    cache = ResultCache(sqlite_db)
+
+    def execute():
+        return sqlite_db._execute(QUERY)
+
+    cache.get_or_execute(QUERY, {}, execute)
+    sqlite_db._execute("UPDATE sales SET revenue = revenue + 1 WHERE sale_id = 1")
+    cache.get_or_execute(QUERY, {}, execute)
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.invalidations) == (0, 2, 1)
+    cache.get_or_execute(QUERY, {}, execute)
+    assert cache.stats.hits == 1
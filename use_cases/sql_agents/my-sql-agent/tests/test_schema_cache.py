@@ -0,0 +1,40 @@
+"""
+Tests for the schema introspection cache.
+"""
+from langchain_community.utilities import SQLDatabase
+
+from src.db.schema_cache import SchemaCache
+
+def test_table_info_cached_until_catalog_changes(sqlite_db: SQLDatabase):
+    """Test that reflection only reruns after DDL."""
+    cache = SchemaCache(sqlite_db)
+    cache.prewarm()
+    assert cache.table_names == ["customers", "products", "sales"]
+
+    first = cache.get_table_info()
+    assert cache.get_table_info() == first
+    assert cache.rebuilds == 1
+    assert "CREATE TABLE sales" in first
+
+    with sqlite_db._engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE regions (region_id INTEGER PRIMARY KEY, name TEXT)")
+
+    assert "CREATE TABLE regions" in cache.get_table_info()
+    assert cache.rebuilds == 2
+
+def test_table_info_subset(sqlite_db: SQLDatabase):
+    """Test describing a subset of tables."""
+    cache = SchemaCache(sqlite_db)
+    info = cache.get_table_info(["sales"])
+    assert "CREATE TABLE sales" in info
+    assert "CREATE TABLE customers" not in info
+
+def test_probe_interval(sqlite_db: SQLDatabase, monkeypatch):
+    """Test that the catalog is not probed again within the interval."""
+    cache = SchemaCache(sqlite_db, probe_interval=3600)
+    cache.prewarm()
+    probes = []
+    monkeypatch.setattr(cache, "catalog_version", lambda: probes.append(1))
+    cache.get_table_info()
+    assert probes == []
+    assert cache.hits == 1
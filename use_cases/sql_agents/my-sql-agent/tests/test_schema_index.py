@@ -0,0 +1,56 @@
+"""
+Tests for relevance-based schema pruning.
+"""
+from langchain_community.utilities import SQLDatabase
+from sqlalchemy import create_engine
+
+from src.db.schema_cache import SchemaCache
+from src.db.schema_index import tokenize
+
+def test_tokenize():
+    """Test identifier splitting and plural folding."""
+    assert tokenize("customerOrders") == ["customer", "order"]
+    assert tokenize("order_items categories") == ["order", "item", "category"]
+
+def test_select_with_neighbours(sqlite_db: SQLDatabase):
+    """Test that the best table is kept along with its foreign key neighbours."""
+    index = SchemaCache(sqlite_db).index
+    assert index.select("Which customer has the most revenue?", top_k=1, include_neighbours=False) == ["sales"]
+    assert index.select("List every customer email", top_k=1) == ["customers", "sales"]
+    assert set(index.select("total revenue per customer", top_k=1)) == {"sales", "customers", "products"}
+
+def test_prunes_large_schema():
+    """Test that only relevant tables are described for a wide schema."""
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        for i in range(200):
+            conn.exec_driver_sql(f"CREATE TABLE filler_{i} (id INTEGER PRIMARY KEY, value_{i} TEXT)")
+        conn.exec_driver_sql("CREATE TABLE warehouses (warehouse_id INTEGER PRIMARY KEY, city TEXT)")
+        conn.exec_driver_sql(
+            "CREATE TABLE inventory (item_id INTEGER PRIMARY KEY, quantity INTEGER, "
+            "warehouse_id INTEGER REFERENCES warehouses(warehouse_id))"
+        )
+    cache = SchemaCache(SQLDatabase(engine, sample_rows_in_table_info=0))
+
+    selected = cache.index.select("What quantity is in stock per inventory item?", top_k=1)
+    assert selected == ["inventory", "warehouses"]
+    info = cache.get_table_info(selected)
+    assert "filler_" not in info
+
+def test_neighbour_expansion_is_bounded():
+    """Test that a hub table does not pull its whole neighbourhood into the schema."""
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE accounts (account_id INTEGER PRIMARY KEY, name TEXT)")
+        for i in range(20):
+            conn.exec_driver_sql(
+                f"CREATE TABLE detail_{i} (id INTEGER PRIMARY KEY, "
+                "account_id INTEGER REFERENCES accounts(account_id))"
+            )
+    index = SchemaCache(SQLDatabase(engine, sample_rows_in_table_info=0)).index
+
+    assert len(index.select("account names", top_k=1)) == 4
+    budgeted = index.select("account names", top_k=1, max_neighbours=10, max_tables=5)
+    assert len(budgeted) == 5
+    # Nothing matches: the hub is picked alone rather than with every table it links to
+    assert index.select("weather forecast", top_k=1) == ["accounts"]
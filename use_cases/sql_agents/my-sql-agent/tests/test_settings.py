@@ -0,0 +1,69 @@
+"""
+Tests for cached environment loading and the shared settings snapshot.
+"""
+import pydantic
+import pytest
+
+import src  # noqa: F401  (puts the repo root on sys.path)
+from shared.utils import find_project_root, get_settings, load_env, reload
+from src.config import settings
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """A project with a root .env and a nested working directory."""
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".env").write_text("DB_NAME=from_root\nAPP_ENV=staging\n")
+    nested = tmp_path / "services" / "agent"
+    nested.mkdir(parents=True)
+    (nested / ".env").write_text("DB_NAME=from_local\n")
+    monkeypatch.chdir(nested)
+    for name in ("DB_NAME", "APP_ENV", "DB_PORT"):
+        # Setting first makes undo() remove values loaded from the test's .env files
+        monkeypatch.setenv(name, "")
+        monkeypatch.delenv(name)
+    # Start from a fresh snapshot, as if the process had just started here
+    reload()
+    yield tmp_path
+    monkeypatch.undo()
+    reload()
+
+def test_load_env_is_cached(project, monkeypatch):
+    """Test that .env files are read once and local values win over the root."""
+    assert settings.DB_NAME == "from_local"
+    assert settings.APP_ENV == "staging"
+    assert find_project_root() == project.resolve()
+    
+    (project / ".env").write_text("DB_NAME=from_root\nAPP_ENV=production\n")
+    load_env()
+    assert get_settings().app_env == "staging"
+    assert settings.APP_ENV == "staging"
+    
+    reload()
+    assert get_settings().app_env == "production"
+    assert settings.IS_DEVELOPMENT is False
+
+def test_nearest_env_file_is_found(project, monkeypatch):
+    """Test that without a local .env the nearest one up the tree is loaded, as load_dotenv() did."""
+    deeper = project / "services" / "agent" / "scripts"
+    deeper.mkdir()
+    monkeypatch.chdir(deeper)
+    reload()
+    assert get_settings().db_name == "from_local"
+
+def test_process_environment_wins(project, monkeypatch):
+    """Test that variables set by the process are never replaced by .env files."""
+    monkeypatch.setenv("DB_NAME", "from_process")
+    reload()
+    assert get_settings().db_name == "from_process"
+
+def test_settings_snapshot_is_immutable(project, monkeypatch):
+    """Test that the snapshot is typed, frozen and builds database URLs."""
+    monkeypatch.setenv("DB_PORT", "6543")
+    reload()
+    snapshot = get_settings()
+    assert snapshot is get_settings()
+    assert snapshot.db_port == 6543
+    assert snapshot.database_url("asyncpg").startswith("postgresql+asyncpg://")
+    assert snapshot.database_url().endswith(":6543/from_local")
+    with pytest.raises(pydantic.ValidationError):
+        snapshot.db_port = 1
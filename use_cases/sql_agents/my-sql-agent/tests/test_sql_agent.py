@@ -8,6 +8,7 @@ from langchain_community.utilities import SQLDatabase
 
 from src.agent.sql_agent import SQLQueryAgent
 from src.config.llm_config import LLMConfig, LLMProvider, OpenAISettings
+from src.db.columnar import ColumnarResult
 from src.db.config import engine
 
 # Mark all tests as async
@@ -34,14 +35,14 @@ def agent():
 async def test_simple_query(agent: SQLQueryAgent):
     """Test a simple SELECT query."""
     results = await agent.run("List all customers")
-    assert isinstance(results, list)
+    assert isinstance(results, ColumnarResult)
     assert len(results) > 0
     assert all(isinstance(row, dict) for row in results)
 
 async def test_complex_query(agent: SQLQueryAgent):
     """Test a complex query with aggregation."""
     results = await agent.run("What is the total revenue per customer?")
-    assert isinstance(results, list)
+    assert isinstance(results, ColumnarResult)
     assert len(results) > 0
     assert all(isinstance(row, dict) for row in results)
     assert "total_revenue" in results[0]
@@ -49,7 +50,7 @@ async def test_complex_query(agent: SQLQueryAgent):
 async def test_parameterized_query(agent: SQLQueryAgent):
     """Test query with parameters."""
     results = await agent.run("Find all sales after January 1st, 2024")
-    assert isinstance(results, list)
+    assert isinstance(results, ColumnarResult)
     assert all(isinstance(row, dict) for row in results)
     assert all(row["date"] > "2024-01-01" for row in results)
 
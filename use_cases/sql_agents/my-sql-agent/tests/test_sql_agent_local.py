@@ -0,0 +1,247 @@
+"""
+Tests for SQLQueryAgent against a local SQLite database with a stubbed LLM.
+"""
+import asyncio
+import json
+from typing import Dict, List, Tuple
+
+import pytest
+from langchain_community.utilities import SQLDatabase
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.agent.example_index import ExampleIndex, ExampleQuery
+from src.agent.sql_agent import SQLQueryAgent, SQLStreamEvent
+from src.agent.sql_cache import SQLCache
+from src.db.result_cache import ResultCache
+from shared.db.guard import QueryGuard, QueryRejected
+from shared.observability import collect_spans, stage_summary
+
+pytestmark = pytest.mark.asyncio
+
+# Canned SQL returned by the stub LLM, keyed on a phrase in the question
+CANNED_SQL: Dict[str, str] = {
+    "customers": "SELECT customer_id, name FROM customers ORDER BY customer_id",
+    "revenue": (
+        "SELECT customer_id, SUM(revenue) AS total_revenue "
+        "FROM sales GROUP BY customer_id"
+    ),
+    "broken": "SELECT missing_column FROM sales",
+}
+
+def stub_llm(calls: List[str]) -> RunnableLambda:
+    """Create a runnable that answers like the function-calling SQL LLM."""
+    def respond(messages):
+        question = messages[-1].content.rsplit("question:", 1)[1]
+        calls.append(question.strip())
+        sql = next(sql for phrase, sql in CANNED_SQL.items() if phrase in question)
+        return AIMessage(content="", additional_kwargs={"function_call": {
+            "name": "generate_sql",
+            "arguments": json.dumps({"query": sql, "parameters": {}})
+        }})
+    return RunnableLambda(respond)
+
+async def test_run(sqlite_db: SQLDatabase):
+    """Test that generated SQL is executed and returned as rows."""
+    agent = SQLQueryAgent(stub_llm([]), sqlite_db)
+    results = await agent.run("List all customers")
+    assert [row["name"] for row in results] == ["John Doe", "Jane Smith", "Bob Wilson"]
+
+async def test_run_many(sqlite_db: SQLDatabase):
+    """Test that batch results keep input order and failures stay isolated."""
+    calls = []
+    agent = SQLQueryAgent(stub_llm(calls), sqlite_db)
+    results = await agent.run_many([
+        "List all customers",
+        "Show the broken report",
+        "DELETE FROM customers",
+        "What is the total revenue per customer?",
+    ], max_concurrency=2)
+    
+    assert len(results[0]) == 3
+    assert isinstance(results[1], Exception)
+    assert isinstance(results[2], ValueError)
+    totals = {row["customer_id"]: row["total_revenue"] for row in results[3]}
+    assert totals == {1: 45.0, 2: 50.0}
+    # The unsafe question never reaches the LLM
+    assert len(calls) == 3
+
+async def test_prompt_schema_is_pruned(sqlite_db: SQLDatabase):
+    """Test that only the relevant tables are described in the prompt."""
+    agent = SQLQueryAgent(stub_llm([]), sqlite_db, schema_top_k=1)
+    table_info = agent.get_table_info("List every customer email")
+    assert "CREATE TABLE customers" in table_info
+    assert "CREATE TABLE products" not in table_info
+    # Without a question, or with pruning disabled, every table is described
+    assert "CREATE TABLE products" in agent.get_table_info()
+    assert "CREATE TABLE products" in SQLQueryAgent(
+        stub_llm([]), sqlite_db, schema_top_k=None
+    ).get_table_info("List every customer email")
+
+async def test_run_uses_result_cache(sqlite_db: SQLDatabase):
+    """Test that repeated SQL is served from the result cache."""
+    agent = SQLQueryAgent(stub_llm([]), sqlite_db, result_cache=ResultCache(sqlite_db))
+    first = await agent.run("What is the total revenue per customer?")
+    second = await agent.run("What is the total revenue per customer?")
+    assert first == second
+    assert agent.result_cache.stats.hits == 1
+
+async def test_stages_are_traced(sqlite_db: SQLDatabase):
+    """Test that each pipeline stage is recorded with tokens and cache hits."""
+    def with_usage(message: AIMessage) -> AIMessage:
+        message.usage_metadata = {
+            "input_tokens": 120, "output_tokens": 30, "total_tokens": 150
+        }
+        return message
+    agent = SQLQueryAgent(
+        stub_llm([]) | with_usage, sqlite_db, result_cache=ResultCache(sqlite_db)
+    )
+    with collect_spans() as spans:
+        await agent.run("What is the total revenue per customer?")
+        await agent.run("What is the total revenue per customer?")
+    
+    names = [span.name for span in spans]
+    assert names[:5] == [
+        "sql_agent.plan", "sql_agent.schema", "sql_agent.sql_generation",
+        "sql_agent.db_execution", "sql_agent.post_processing",
+    ]
+    generation = spans[2]
+    assert (generation.prompt_tokens, generation.completion_tokens) == (120, 30)
+    executions = [span for span in spans if span.name == "sql_agent.db_execution"]
+    assert [span.cache_hit for span in executions] == [False, True]
+    assert executions[0].attributes["rows"] == 2
+    
+    summary = stage_summary()
+    assert summary["sql_agent.sql_generation"]["prompt_tokens"] >= 240
+    assert summary["sql_agent.db_execution"]["duration"]["p99"] >= 0
+
+async def test_repeated_questions_skip_generation(sqlite_db: SQLDatabase):
+    """Test that cached SQL is reused until the schema changes."""
+    calls = []
+    agent = SQLQueryAgent(stub_llm(calls), sqlite_db, sql_cache=SQLCache())
+    first = await agent.run("List all customers")
+    assert await agent.run("List all  customers.") == first
+    results = await agent.run_many(
+        ["List all customers!", "What is the total revenue per customer?"]
+    )
+    assert results[0] == first
+    assert len(calls) == 2
+    
+    with sqlite_db._engine.begin() as conn:
+        conn.exec_driver_sql("ALTER TABLE customers ADD COLUMN phone TEXT")
+    await agent.run("List all customers")
+    assert len(calls) == 3
+
+async def test_catalog_is_probed_once_per_question(sqlite_db: SQLDatabase, monkeypatch):
+    """Test that the SQL cache and the schema description share one catalog probe."""
+    agent = SQLQueryAgent(stub_llm([]), sqlite_db, sql_cache=SQLCache(), schema_top_k=1)
+    agent.prewarm()
+    probes = []
+    catalog_version = agent.schema_cache.catalog_version
+    
+    def counted_catalog_version():
+        probes.append(1)
+        return catalog_version()
+    
+    monkeypatch.setattr(agent.schema_cache, "catalog_version", counted_catalog_version)
+    await agent.run("List all customers")
+    assert len(probes) == 1
+    await agent.run("List all customers")
+    assert len(probes) == 2
+
+async def collect(
+    agent: SQLQueryAgent, question: str, **kwargs
+) -> Tuple[List, SQLStreamEvent]:
+    """Gather a stream's row batches and its final event."""
+    events = [event async for event in agent.astream(question, **kwargs)]
+    assert [event.kind for event in events[-1:]] == ["done"]
+    return [event.rows for event in events[:-1]], events[-1]
+
+async def test_astream_batches_and_caps(sqlite_db: SQLDatabase):
+    """Test that streamed rows arrive in fixed-size batches and stop at the row cap."""
+    agent = SQLQueryAgent(stub_llm([]), sqlite_db)
+    batches, done = await collect(agent, "List all customers", batch_size=2)
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert (done.row_count, done.truncated) == (3, False)
+    
+    batches, done = await collect(agent, "List all customers", batch_size=1, max_rows=2)
+    names = [row["name"] for batch in batches for row in batch]
+    assert names == ["John Doe", "Jane Smith"]
+    assert (done.row_count, done.truncated) == (2, True)
+    
+    batches, done = await collect(agent, "List all customers", max_bytes=1)
+    assert batches == [] and done.truncated
+
+async def test_concurrent_streams_report_their_own_truncation(sqlite_db: SQLDatabase):
+    """Test that concurrent streams each report their own truncation."""
+    agent = SQLQueryAgent(stub_llm([]), sqlite_db)
+    capped, full = await asyncio.gather(
+        collect(agent, "List all customers", batch_size=1, max_rows=1),
+        collect(agent, "List all customers", batch_size=1)
+    )
+    assert capped[1].truncated and not full[1].truncated
+
+async def test_async_engine_execution(sqlite_file_db: SQLDatabase):
+    """Test that queries, cached results and streams run on the async engine."""
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{sqlite_file_db._engine.url.database}")
+    agent = SQLQueryAgent(
+        stub_llm([]), sqlite_file_db,
+        result_cache=ResultCache(sqlite_file_db), async_engine=async_engine
+    )
+    try:
+        first, second = await asyncio.gather(
+            agent.run("What is the total revenue per customer?"),
+            agent.run("List all customers")
+        )
+        totals = {row["customer_id"]: row["total_revenue"] for row in first}
+        assert totals == {1: 45.0, 2: 50.0}
+        assert len(second) == 3
+        assert await agent.run("What is the total revenue per customer?") == first
+        assert agent.result_cache.stats.hits == 1
+        
+        batches, _ = await collect(agent, "List all customers", batch_size=2)
+        assert [len(batch) for batch in batches] == [2, 1]
+    finally:
+        await async_engine.dispose()
+
+async def test_guard_limits_and_rejects(sqlite_db: SQLDatabase):
+    """Test that the guard adds a LIMIT and rejects costly plans with a reason."""
+    agent = SQLQueryAgent(stub_llm([]), sqlite_db, guard=QueryGuard(default_limit=2))
+    assert len(await agent.run("List all customers")) == 2
+    # Streams are capped by max_rows rather than the default LIMIT
+    batches, done = await collect(agent, "List all customers", batch_size=1)
+    assert len(batches) == 3 and not done.truncated
+    
+    def plan(cost: float, rows: float):
+        """Build an EXPLAIN stub returning a plan with the given estimates."""
+        def explain(statement: str) -> list:
+            return [{"Plan": {"Total Cost": cost, "Plan Rows": rows}}]
+        return explain
+    
+    guard = QueryGuard(max_cost=100.0, max_rows=50)
+    with pytest.raises(QueryRejected) as rejected:
+        guard.check("SELECT * FROM sales, customers", plan(5000.0, 1000.0))
+    assert "estimated cost 5000" in rejected.value.reason
+    capped = guard.check("SELECT * FROM sales LIMIT 500;", plan(10.0, 500.0))
+    assert not capped.limit_added
+    assert capped.query.endswith("AS guarded LIMIT 50")
+    streamed = guard.check("SELECT * FROM sales", plan(10.0, 500.0), stream=True)
+    assert streamed.query == "SELECT * FROM sales" and not streamed.limit_added
+    with pytest.raises(QueryRejected):
+        guard.check("SELECT 1; DROP TABLE sales")
+
+async def test_examples_serve_and_prompt(sqlite_db: SQLDatabase):
+    """Test that matching examples skip the LLM and similar ones become few-shots."""
+    calls = []
+    examples = ExampleIndex([ExampleQuery(
+        question="How many customers do we have?",
+        query="SELECT COUNT(*) AS customer_count FROM customers"
+    )])
+    agent = SQLQueryAgent(stub_llm(calls), sqlite_db, examples=examples)
+    assert await agent.run("how many customers do we have") == [{"customer_count": 3}]
+    assert calls == []
+    
+    messages = agent._build_messages("How many customers bought Product A?", "")
+    prompt = messages[-1].content
+    assert "SELECT COUNT(*) AS customer_count FROM customers" in prompt
@@ -0,0 +1,35 @@
+"""
+Tests for the question-to-SQL cache.
+"""
+from src.agent.sql_cache import GeneratedSQL, SQLCache, normalize_question
+
+SQL = GeneratedSQL(query="SELECT * FROM customers", parameters={})
+
+def test_lookup_by_normalized_question():
+    """Test that near-identical questions share generated SQL."""
+    cache = SQLCache()
+    cache.put("List all customers", "schema-a", SQL)
+    assert cache.get("List  all customers?", "schema-a") == SQL
+    assert cache.get("List all products", "schema-a") is None
+
+def test_key_keeps_operators_numbers_and_case():
+    """Test that questions differing in an operator, a number or a literal's case do not share SQL."""
+    assert normalize_question(" Sales with amount > 100 ? ") == "Sales with amount > 100"
+    assert normalize_question("Sales with amount > 100") != normalize_question("Sales with amount < 100")
+    assert normalize_question("Sales with amount > 100") != normalize_question("Sales with amount > 1000")
+    assert normalize_question("Orders by 'Smith'") != normalize_question("Orders by 'smith'")
+
+def test_schema_change_invalidates(tmp_path):
+    """Test that a new fingerprint drops entries for the old schema, on disk too."""
+    path = tmp_path / "sql.sqlite"
+    cache = SQLCache(path=path)
+    cache.put("List all customers", "schema-a", SQL)
+    cache.close()
+
+    reopened = SQLCache(path=path)
+    assert reopened.get("List all customers", "schema-a") == SQL
+    assert reopened.stats.disk_hits == 1
+    assert reopened.get("List all customers", "schema-b") is None
+    assert reopened.stats.invalidations == 2
+    assert reopened.get("List all customers", "schema-a") is None
+    reopened.close()